@@ -6,6 +6,8 @@ Professional Healthcare UI - Streamlit Native
 import streamlit as st
 from datetime import datetime
 
+from utils import warmup
+
 # Page configuration
 st.set_page_config(
     page_title="Medical Appointment AI",
@@ -14,6 +16,9 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Load and warm up the models in the background while the landing page renders
+warmup.start()
+
 # Custom CSS (simplified)
 st.markdown("""
 <style>
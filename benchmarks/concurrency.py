@@ -0,0 +1,100 @@
+"""
+Concurrency Benchmark
+Scoring throughput with several simultaneous users, with and without the thread budget
+
+Usage:
+    python benchmarks/concurrency.py [--users 1 2 4 8] [--rows 2000] [--calls 10]
+
+'unbudgeted' runs the classifier the way the notebooks pickled it (n_jobs=-1,
+no limits), so every call fans out to all cores. 'budgeted' uses ModelLoader's
+ThreadBudget (MODEL_THREADS per call, one slot per spare CPU).
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from benchmarks.fixtures import build_fixture
+from utils.model_loader import DEFAULT_THREADS, ModelLoader, ThreadBudget
+
+
+def make_loader(workdir, budget):
+    loader = ModelLoader(os.path.join(workdir, 'models'),
+                         os.path.join(workdir, 'data', 'processed', 'label_encoders.pkl'),
+                         thread_budget=budget)
+    assert loader.load_classifier() and loader.load_preprocessing()
+    if not budget.enabled:
+        loader.classifier.n_jobs = -1
+    return loader
+
+
+def run_users(loader, batch, users, calls):
+    """users threads each scoring batch calls times; throughput and latency summary"""
+    latencies = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(users + 1)
+
+    def user():
+        barrier.wait()
+        for _ in range(calls):
+            start = time.perf_counter()
+            loader.score_noshow(batch)
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=user) for _ in range(users)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies = np.array(latencies)
+    return {
+        'rows_per_s': users * calls * len(batch) / elapsed,
+        'p50_ms': float(np.median(latencies)) * 1000,
+        'p95_ms': float(np.quantile(latencies, 0.95)) * 1000
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, nargs='+', default=[1, 2, 4, 8], help='concurrent users to test')
+    parser.add_argument('--rows', type=int, default=2_000, help='rows per scoring call')
+    parser.add_argument('--calls', type=int, default=10, help='scoring calls per user')
+    parser.add_argument('--threads', type=int, default=DEFAULT_THREADS, help='budgeted threads per call')
+    parser.add_argument('--seed', type=int, default=42, help='seed for data and fixture models')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='noshow-concurrency-') as workdir:
+        print("Training fixture models on synthetic appointments...")
+        raw = build_fixture(workdir, seed=args.seed)
+
+        modes = {
+            'unbudgeted': make_loader(workdir, ThreadBudget(threads_per_call=None)),
+            'budgeted': make_loader(workdir, ThreadBudget(threads_per_call=args.threads))
+        }
+        batch = modes['budgeted'].prepare_classifier_input(raw.iloc[:args.rows])
+
+        print(f"\n{os.cpu_count()} CPUs, {args.rows:,} rows per call, {args.calls} calls per user")
+        print(f"{'users':>6}{'mode':>12}{'rows/s':>12}{'p50':>11}{'p95':>11}")
+        for users in args.users:
+            for mode, loader in modes.items():
+                loader.score_noshow(batch)
+                result = run_users(loader, batch, users, args.calls)
+                print(f"{users:>6}{mode:>12}{result['rows_per_s']:>12,.0f}"
+                      f"{result['p50_ms']:>9.1f}ms{result['p95_ms']:>9.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
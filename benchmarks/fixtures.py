@@ -0,0 +1,97 @@
+"""
+Benchmark Fixtures
+Small models trained offline on synthetic appointments, in the layout the app expects
+"""
+
+import os
+import joblib
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+from sklearn.preprocessing import LabelEncoder
+
+from utils.preprocessing import (
+    AGE_LABELS, FORECAST_FEATURES, LABEL_ENCODED_COLS, ONE_HOT_COLS, build_daily_series,
+    clean_appointments, encode_features, engineer_features, fit_noshow_rates
+)
+from utils.synthetic_data import generate_appointments
+
+# Size of the real raw file; the synthetic daily series gets the same volume per day
+RAW_ROWS = 109_593
+
+# Columns of the engineered frame that are not classifier inputs
+NON_FEATURE_COLS = ['appointment_date', 'appointment_date_continuous', 'no_show']
+
+
+def classifier_feature_names(engineered):
+    """
+    Notebook 02 column layout for an engineered training set
+
+    Numeric and label-encoded columns, the '_encoded' copies, then drop-first
+    dummies; age_group_noshow_rate dummies are named after the age group rates.
+    """
+    target = (engineered['no_show'] == 'yes').astype(int)
+    age_rates = target.groupby(engineered['age_group'].astype(str)).mean()
+
+    numeric = [c for c in engineered.columns if c not in ONE_HOT_COLS + NON_FEATURE_COLS]
+    features = numeric + [col + '_encoded' for col in LABEL_ENCODED_COLS]
+    for col in ONE_HOT_COLS:
+        if col == 'age_group_noshow_rate':
+            features += [f'{col}_{age_rates.get(label, 0.0)}' for label in AGE_LABELS[1:]]
+        else:
+            categories = sorted(engineered[col].astype(str).unique())
+            features += [f'{col}_{value}' for value in categories[1:]]
+    return features
+
+
+def build_fixture(workdir, classifier_rows=20_000, n_estimators=50, seed=42):
+    """
+    Write models/ and data/processed/label_encoders.pkl under workdir
+
+    Args:
+        workdir: directory to run the app and ModelLoader from
+        classifier_rows: appointments used to train the classifier
+        n_estimators: trees per forest
+        seed: random seed
+
+    Returns:
+        the synthetic raw appointments the fixture was trained on
+    """
+    models_dir = os.path.join(workdir, 'models')
+    processed_dir = os.path.join(workdir, 'data', 'processed')
+    os.makedirs(models_dir, exist_ok=True)
+    os.makedirs(processed_dir, exist_ok=True)
+
+    raw = generate_appointments(RAW_ROWS, seed=seed)
+
+    # Classifier
+    train = raw.sample(n=min(classifier_rows, len(raw)), random_state=seed)
+    cleaned = clean_appointments(train)
+    noshow_rates = fit_noshow_rates(cleaned)
+    engineered = engineer_features(cleaned, noshow_rates)
+    label_encoders = {col: LabelEncoder().fit(engineered[col].astype(str)) for col in LABEL_ENCODED_COLS}
+    features = classifier_feature_names(engineered)
+    X = encode_features(engineered, features, label_encoders)
+    y = (engineered['no_show'] == 'yes').astype(int)
+
+    classifier = RandomForestClassifier(n_estimators=n_estimators, max_depth=15, min_samples_split=10,
+                                        min_samples_leaf=5, class_weight='balanced',
+                                        random_state=seed, n_jobs=1).fit(X, y)
+    joblib.dump(classifier, os.path.join(models_dir, 'best_noshow_classifier.joblib'))
+    joblib.dump(features, os.path.join(models_dir, 'feature_names.joblib'))
+    joblib.dump({'model_name': 'Random Forest (synthetic fixture)', 'n_features': len(features),
+                 'training_date': pd.Timestamp.now().isoformat()},
+                os.path.join(models_dir, 'model_metadata.joblib'))
+    joblib.dump(noshow_rates, os.path.join(models_dir, 'noshow_rates.joblib'))
+    joblib.dump(label_encoders, os.path.join(processed_dir, 'label_encoders.pkl'))
+
+    # Demand forecaster
+    ts = build_daily_series(raw)
+    ts = ts[ts['lag_30'].notna()]
+    forecaster = RandomForestRegressor(n_estimators=n_estimators, max_depth=10, random_state=seed,
+                                       n_jobs=1).fit(ts[FORECAST_FEATURES].fillna(0), ts['daily_appointments'])
+    joblib.dump(forecaster, os.path.join(models_dir, 'best_demand_forecaster.joblib'))
+    joblib.dump(FORECAST_FEATURES, os.path.join(models_dir, 'forecasting_feature_names.joblib'))
+    joblib.dump({'model_name': 'Random Forest (synthetic fixture)', 'mae': 80.0},
+                os.path.join(models_dir, 'forecasting_metadata.joblib'))
+
+    return raw
@@ -0,0 +1,208 @@
+"""
+Benchmark Suite
+Times model loading, inference, feature engineering and page execution on synthetic data
+
+Usage:
+    python benchmarks/run_benchmarks.py [--repeat 7] [--skip-pages] [--check]
+
+Each run is appended to benchmarks/history.json and compared with the previous one.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from benchmarks.fixtures import build_fixture
+from utils.model_loader import ModelLoader
+from utils.preprocessing import FORECAST_FEATURES, build_daily_series
+
+DEFAULT_HISTORY = os.path.join(ROOT, 'benchmarks', 'history.json')
+
+# Slowdown vs. the previous run that counts as a regression
+DEFAULT_THRESHOLD = 0.20
+
+BATCH_ROWS = 10_000
+
+PAGES = {
+    'page_noshow_predictor': ('pages/1_NoShow_Predictor.py', '🔮 Generate Risk Assessment'),
+    'page_demand_forecaster': ('pages/2_Demand_Forecaster.py', '🔮 Generate Demand Forecast')
+}
+
+
+def measure(fn, repeat, warmup=1):
+    """Run fn warmup + repeat times; summary of the timed runs in seconds"""
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    times = np.array(times)
+    return {
+        'median_s': float(np.median(times)),
+        'min_s': float(times.min()),
+        'p90_s': float(np.quantile(times, 0.9)),
+        'repeat': repeat
+    }
+
+
+def benchmark_models(workdir, raw, repeat):
+    """Loader, inference and feature-engineering timings"""
+    results = {}
+    models_dir = os.path.join(workdir, 'models')
+    encoders_path = os.path.join(workdir, 'data', 'processed', 'label_encoders.pkl')
+
+    def load():
+        loader = ModelLoader(models_dir, encoders_path)
+        assert loader.load_classifier() and loader.load_forecaster() and loader.load_preprocessing()
+        return loader
+
+    results['loader_load'] = measure(load, repeat, warmup=0)
+    loader = load()
+
+    batch_raw = raw.iloc[:BATCH_ROWS]
+    results['feature_engineering_10k'] = measure(lambda: loader.prepare_classifier_input(batch_raw), repeat)
+    results['feature_engineering_10k']['rows'] = len(batch_raw)
+
+    batch = loader.prepare_classifier_input(batch_raw)
+    single = batch.iloc[:1]
+    results['predict_noshow_single'] = measure(lambda: loader.predict_noshow(single), repeat * 5)
+    results['predict_noshow_batch'] = measure(lambda: loader.score_noshow(batch), repeat)
+    results['predict_noshow_batch']['rows'] = len(batch)
+
+    ts = build_daily_series(raw)
+    X_ts = ts[FORECAST_FEATURES].ffill().fillna(0)
+    results['forecast_demand_single'] = measure(lambda: loader.forecast_demand(X_ts.iloc[-1:]), repeat * 5)
+    results['forecast_demand_batch'] = measure(lambda: loader.forecast_horizon(X_ts), repeat)
+    results['forecast_demand_batch']['rows'] = len(X_ts)
+
+    return results
+
+
+def benchmark_pages(workdir, repeat):
+    """Streamlit script execution time per page: first run, rerun and button click"""
+    from streamlit.testing.v1 import AppTest
+
+    results = {}
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        for name, (path, button_label) in PAGES.items():
+            script = os.path.join(ROOT, path)
+
+            def render():
+                app = AppTest.from_file(script, default_timeout=120)
+                app.run()
+                return app
+
+            start = time.perf_counter()
+            render()
+            results[f'{name}_cold'] = {'median_s': time.perf_counter() - start, 'repeat': 1}
+            results[name] = measure(render, repeat, warmup=0)
+
+            app = render()
+
+            def click():
+                next(b for b in app.button if b.label == button_label).click()
+                app.run()
+                if app.exception:
+                    raise RuntimeError(f"{path} raised: {app.exception[0].value}")
+
+            results[f'{name}_submit'] = measure(click, repeat)
+    finally:
+        os.chdir(cwd)
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def compare(results, previous, threshold):
+    """Print each benchmark against the previous run; names of regressions"""
+    regressions = []
+    print(f"\n{'benchmark':<34}{'median':>12}{'previous':>12}{'change':>10}")
+    for name, result in results.items():
+        old = (previous or {}).get(name, {}).get('median_s')
+        change = result['median_s'] / old - 1 if old else None
+        flag = ''
+        if change is not None and change > threshold:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print(f"{name:<34}{result['median_s'] * 1000:>10.2f}ms"
+              f"{(f'{old * 1000:.2f}ms' if old else '-'):>12}"
+              f"{(f'{change:+.0%}' if change is not None else '-'):>10}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=7, help='timed runs per benchmark')
+    parser.add_argument('--seed', type=int, default=42, help='seed for data and fixture models')
+    parser.add_argument('--skip-pages', action='store_true', help='skip the Streamlit page benchmarks')
+    parser.add_argument('--history', default=DEFAULT_HISTORY, help='JSON history file')
+    parser.add_argument('--no-save', action='store_true', help='do not append this run to the history')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='relative slowdown reported as a regression')
+    parser.add_argument('--check', action='store_true', help='exit with status 1 on regressions')
+    args = parser.parse_args()
+
+    # Pages must not start the model reload thread while being timed
+    os.environ['MODEL_RELOAD_INTERVAL'] = '0'
+
+    with tempfile.TemporaryDirectory(prefix='noshow-bench-') as workdir:
+        print("Training fixture models on synthetic appointments...")
+        raw = build_fixture(workdir, seed=args.seed)
+
+        results = benchmark_models(workdir, raw, args.repeat)
+        if not args.skip_pages:
+            results.update(benchmark_pages(workdir, args.repeat))
+
+    history = load_history(args.history)
+    regressions = compare(results, history[-1]['results'] if history else None, args.threshold)
+
+    if not args.no_save:
+        history.append({
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'seed': args.seed,
+            'results': results
+        })
+        with open(args.history, 'w', encoding='utf-8') as f:
+            json.dump(history, f, indent=2)
+        print(f"\nSaved run to {args.history}")
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+        if args.check:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+Startup Benchmark
+Import-time breakdown and cold-start budget for app.py and the pages
+
+Usage:
+    python benchmarks/startup.py [--runs 3] [--top 15] [--check] [--budget 1.0]
+
+Each script runs in a fresh interpreter under `python -X importtime`, in
+Streamlit's bare mode (no server), so the numbers are what a new worker pays
+before the first render. --check exits with status 1 when app.py's median
+cold start exceeds the budget.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCRIPTS = ['app.py', 'pages/1_NoShow_Predictor.py', 'pages/2_Demand_Forecaster.py',
+           'pages/3_Overbooking_Simulator.py']
+
+# Seconds for app.py's imports plus its first script run (about 0.65s on one CPU today)
+DEFAULT_BUDGET = 1.0
+
+# Runs a script once in bare mode and prints its wall time, imports included
+RUNNER = (
+    "import sys, time\n"
+    "t0 = time.perf_counter()\n"
+    "import runpy\n"
+    "runpy.run_path(sys.argv[1], run_name='__main__')\n"
+    "print(f'STARTUP_SECONDS={time.perf_counter() - t0:.6f}')\n"
+)
+
+
+def run_script(script):
+    """
+    Run one script cold under -X importtime
+
+    Returns:
+        (seconds for imports plus the first script run, {top-level package: self seconds})
+    """
+    env = dict(os.environ, MODEL_RELOAD_INTERVAL='0', PYTHONDONTWRITEBYTECODE='1')
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', RUNNER, os.path.join(ROOT, script)],
+                          cwd=ROOT, env=env, capture_output=True, text=True)
+    seconds = None
+    for line in proc.stdout.splitlines():
+        if line.startswith('STARTUP_SECONDS='):
+            seconds = float(line.split('=', 1)[1])
+    if seconds is None:
+        raise RuntimeError(f"{script} failed:\n{proc.stderr[-2000:]}")
+
+    # stderr lines look like "import time:   self [us] | cumulative | imported package"
+    packages = defaultdict(float)
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, _, name = line[len('import time:'):].split('|', 2)
+        packages[name.strip().split('.')[0]] += int(self_us) / 1e6
+    return seconds, dict(packages)
+
+
+def report(script, runs, top):
+    """Median cold start of script over runs; prints the slowest top-level imports"""
+    timings = []
+    packages = defaultdict(list)
+    for _ in range(runs):
+        seconds, imported = run_script(script)
+        timings.append(seconds)
+        for name, self_s in imported.items():
+            packages[name].append(self_s)
+
+    median = statistics.median(timings)
+    import_total = sum(statistics.median(v) for v in packages.values())
+    print(f"\n{script}: {median:.3f}s cold start (imports {import_total:.3f}s, median of {runs})")
+    slowest = sorted(packages.items(), key=lambda item: statistics.median(item[1]), reverse=True)[:top]
+    for name, values in slowest:
+        print(f"    {name:<28}{statistics.median(values) * 1000:>10.1f}ms")
+    return median
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=3, help='cold starts per script')
+    parser.add_argument('--top', type=int, default=15, help='top-level packages to list per script')
+    parser.add_argument('--budget', type=float, default=DEFAULT_BUDGET, help='app.py budget in seconds')
+    parser.add_argument('--check', action='store_true', help='exit with status 1 if app.py is over budget')
+    parser.add_argument('scripts', nargs='*', default=SCRIPTS, help='scripts relative to the repo root')
+    args = parser.parse_args()
+
+    results = {script: report(script, args.runs, args.top) for script in args.scripts}
+
+    app_seconds = results.get('app.py')
+    if app_seconds is not None:
+        status = 'OK' if app_seconds <= args.budget else 'OVER BUDGET'
+        print(f"\napp.py cold start {app_seconds:.3f}s vs budget {args.budget:.3f}s: {status}")
+        if args.check and app_seconds > args.budget:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
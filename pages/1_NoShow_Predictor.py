@@ -3,14 +3,15 @@ Interactive patient risk assessment
 """
 
 import streamlit as st
-import pandas as pd
-import numpy as np
 import sys
 import os
 
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from utils import warmup
+from utils.profiling import PageProfiler
+
 # Page config
 st.set_page_config(
     page_title="No-Show Risk Predictor",
@@ -18,6 +19,10 @@ st.set_page_config(
     layout="wide"
 )
 
+# Opt-in profiling (PAGE_PROFILE=1 or ?profile=1)
+profiler = PageProfiler('noshow_predictor')
+profiler.mark("CSS injection")
+
 # Enhanced CSS
 st.markdown("""
 <style>
@@ -156,6 +161,71 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+@st.cache_resource(show_spinner=False)
+def load_model():
+    """Trained classifier with its preprocessing artifacts, or None if unavailable"""
+    # Shared with the warm-up thread, so a warmed worker skips deserialization here
+    loader = warmup.shared_loader()
+    if loader.classifier is None or loader.label_encoders is None:
+        return None
+    return loader
+
+
+def describe_feature(name):
+    """Readable label for a model feature name"""
+    return name.replace('_encoded', '').replace('_', ' ').capitalize()
+
+
+def render_batch_jobs(job_ids):
+    """Progress, partial results and downloads of this session's batch jobs"""
+    from utils.jobs import job_manager, DONE
+    
+    manager = job_manager()
+    for job_id in reversed(job_ids):
+        job = manager.get(job_id)
+        if job is None:
+            continue
+        st.markdown(f"**{job.label}** · `{job.id}` · {job.state}")
+        st.progress(job.progress, text=f"{job.completed} of {job.total} chunks")
+        if job.error:
+            st.error(f"❌ {job.error}")
+        
+        partial = job.partial()
+        if partial is not None:
+            scored = partial[partial['valid']]
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("Scored", f"{len(scored):,}")
+            with col2:
+                st.metric("Rejected", f"{len(partial) - len(scored):,}")
+            with col3:
+                st.metric("Mean No-Show Risk", f"{scored['noshow_probability'].mean():.1%}" if len(scored) else "-")
+            st.dataframe(partial.head(20), use_container_width=True)
+        
+        if job.state == DONE:
+            st.download_button("⬇️ Download scores (CSV)", partial.to_csv().encode('utf-8'),
+                               file_name=f"noshow_scores_{job.id}.csv", mime="text/csv", key=f"download_{job.id}")
+        elif not job.finished:
+            if st.button("✖️ Cancel", key=f"cancel_{job.id}"):
+                manager.cancel(job.id)
+
+
+@st.fragment(run_every=1.0)
+def poll_batch_jobs(job_ids):
+    """Re-rendered every second while a job is running; hands back to a full run when all are done"""
+    from utils.jobs import job_manager
+    
+    render_batch_jobs(job_ids)
+    jobs = [job_manager().get(job_id) for job_id in job_ids]
+    if all(job is None or job.finished for job in jobs):
+        st.rerun()
+
+
+profiler.mark("Model load")
+model = load_model()
+
+profiler.mark("Header and banners")
+
 # Header
 st.title("🎯 No-Show Risk Predictor")
 st.markdown("*AI-powered patient attendance prediction for better appointment management*")
@@ -181,6 +251,8 @@ with st.expander("📊 Model Performance Metrics", expanded=False):
 
 st.markdown("---")
 
+profiler.mark("Input widgets")
+
 # Input Form - Enhanced with cards
 st.markdown("## 📋 Patient Information Form")
 st.markdown("*Fill in the details below to generate risk assessment*")
@@ -252,12 +324,23 @@ with col2:
     
     st.caption("*Expected conditions on appointment day*")
     
+    # Defaults from the daily weather file for today, when one is loaded
+    default_temp, default_rain = 22, 0
+    if model is not None and model.weather is not None:
+        import datetime
+        today_weather = model.weather.daily([datetime.date.today()]).iloc[0]
+        if today_weather.notna().all():
+            default_temp = int(min(max(round(today_weather['average_temp_day']), 10), 40))
+            default_rain = int(min(max(round(today_weather['average_rain_day']), 0), 50))
+            st.caption(f"*Prefilled from the weather file: {today_weather['average_temp_day']:.1f}°C, "
+                       f"{today_weather['average_rain_day']:.1f} mm*")
+    
     weather_col1, weather_col2 = st.columns(2)
     with weather_col1:
-        temp = st.slider("🌡️ Temperature (°C)", 10, 40, 22)
+        temp = st.slider("🌡️ Temperature (°C)", 10, 40, default_temp)
         st.caption(f"{'🥶 Cold' if temp < 15 else '🔥 Hot' if temp > 30 else '☀️ Normal'}")
     with weather_col2:
-        rain = st.slider("🌧️ Expected Rain (mm)", 0, 50, 0)
+        rain = st.slider("🌧️ Expected Rain (mm)", 0, 50, default_rain)
         st.caption(f"{'☂️ Rainy' if rain > 5 else '☀️ Clear'}")
     
     is_rainy = rain > 5
@@ -274,44 +357,84 @@ with col2:
                               type="primary", 
                               use_container_width=True)
 
+# Where the latest risk score came from ('table', 'student' or 'model'), for the footer
+score_source = None
+
 if predict_button:
     
     with st.spinner("🤖 AI analyzing patient data and calculating risk..."):
         
-        # Calculate risk (same logic as before)
-        risk_score = 0.32
-        
-        location_risks = {
-            "ITAJAÍ": 0.35, "BALNEÁRIO CAMBORIÚ": 0.28, "CAMBORIÚ": 0.33,
-            "NAVEGANTES": 0.30, "PENHA": 0.38, "BOMBINHAS": 0.25
-        }
-        risk_score = location_risks.get(place, 0.32)
-        
-        if sms == "Yes":
-            risk_score *= 0.90
-        if is_rainy:
-            risk_score *= 1.15
-        if is_hot:
-            risk_score *= 1.08
-        if age < 18:
-            risk_score *= 1.05
-        elif age > 60:
-            risk_score *= 0.95
-        
-        health_count = sum([hipertension, diabetes, alcoholism, handcap > 0])
-        if health_count >= 2:
-            risk_score *= 0.92
-        
-        if shift == "Afternoon":
-            risk_score *= 1.05
-        if disability != "None":
-            risk_score *= 1.08
+        profiler.mark("Model call")
+        drivers = None
+        
+        if model is not None:
+            from utils.risk_table import table_for
+            
+            form = dict(age=age, gender=gender, scholarship=scholarship, disability=disability,
+                        hipertension=hipertension, diabetes=diabetes, alcoholism=alcoholism,
+                        handcap=handcap, specialty=specialty, place=place, shift=shift,
+                        sms=sms, temp=temp, rain=rain)
+            active_model = model.pinned()
+            table = table_for(active_model)
+            
+            if table is not None:
+                # Precomputed for today's date and this model version (python -m utils.risk_table build)
+                risk_score = table.lookup(**form)
+                score_source = 'table'
+            else:
+                # Real model: raw form row -> engineered features -> forest, all on one model version
+                from utils.preprocessing import single_appointment
+                
+                features = active_model.prepare_classifier_input(single_appointment(**form))
+                risk_score = active_model.predict_noshow(features)['noshow_probability']
+                try:
+                    drivers = active_model.explain_noshow(features, top_k=5).iloc[0]
+                    score_source = 'model'
+                except ValueError:
+                    # Models without forest decision paths (e.g. distilled students) have no drivers
+                    drivers = None
+                    score_source = 'student'
+        else:
+            # Fallback: simplified risk calculation based on key factors
+            risk_score = 0.32
+        
+            location_risks = {
+                "ITAJAÍ": 0.35, "BALNEÁRIO CAMBORIÚ": 0.28, "CAMBORIÚ": 0.33,
+                "NAVEGANTES": 0.30, "PENHA": 0.38, "BOMBINHAS": 0.25
+            }
+            risk_score = location_risks.get(place, 0.32)
+        
+            if sms == "Yes":
+                risk_score *= 0.90
+            if is_rainy:
+                risk_score *= 1.15
+            if is_hot:
+                risk_score *= 1.08
+            if age < 18:
+                risk_score *= 1.05
+            elif age > 60:
+                risk_score *= 0.95
+        
+            health_count = sum([hipertension, diabetes, alcoholism, handcap > 0])
+            if health_count >= 2:
+                risk_score *= 0.92
+        
+            if shift == "Afternoon":
+                risk_score *= 1.05
+            if disability != "None":
+                risk_score *= 1.08
         
         risk_score = min(max(risk_score, 0.0), 1.0)
         show_score = 1 - risk_score
         
+        profiler.mark("Result cards")
+        
         # Success message
         st.success("✅ Risk Assessment Complete!")
+        if score_source == 'table':
+            st.caption("*Approximate score from the precomputed risk table (age, temperature and rain scored "
+                       "at one value per band); the risk factors below are general patterns rather than "
+                       "this model's drivers*")
         
         st.markdown("---")
         
@@ -386,6 +509,8 @@ if predict_button:
                      risk_level,
                      help="Overall risk classification")
         
+        profiler.mark("Risk factors")
+        
         # Risk Factors Analysis - Enhanced
         st.markdown("---")
         st.markdown("### 🔍 Key Risk Factors Identified")
@@ -393,33 +518,44 @@ if predict_button:
         factors = []
         factor_impacts = []
         
-        if place in ["PENHA", "ITAJAÍ", "CAMBORIÚ"]:
-            factors.append(f"📍 **High-Risk Location**: {place}")
-            factor_impacts.append("Historical data shows elevated no-show rates in this area")
+        if drivers is not None:
+            # Largest contributions from the forest's decision paths
+            for i in range(1, 6):
+                contribution = drivers[f'contribution_{i}']
+                if abs(contribution) < 0.005:
+                    continue
+                direction = "🔺 **Raises risk**" if contribution > 0 else "🔻 **Lowers risk**"
+                factors.append(f"{direction}: {describe_feature(drivers[f'driver_{i}'])}")
+                factor_impacts.append(f"{contribution*100:+.1f} percentage points vs. the model baseline "
+                                      f"of {drivers['bias']*100:.1f}% (value: {drivers[f'value_{i}']:g})")
+        else:
+            if place in ["PENHA", "ITAJAÍ", "CAMBORIÚ"]:
+                factors.append(f"📍 **High-Risk Location**: {place}")
+                factor_impacts.append("Historical data shows elevated no-show rates in this area")
         
-        if sms == "No":
-            factors.append("📱 **No SMS Reminder Sent**")
-            factor_impacts.append("Patients without reminders are 10% more likely to miss appointments")
+            if sms == "No":
+                factors.append("📱 **No SMS Reminder Sent**")
+                factor_impacts.append("Patients without reminders are 10% more likely to miss appointments")
         
-        if is_rainy:
-            factors.append("🌧️ **Rainy Weather Expected**")
-            factor_impacts.append("Rain increases no-show probability by 15%")
+            if is_rainy:
+                factors.append("🌧️ **Rainy Weather Expected**")
+                factor_impacts.append("Rain increases no-show probability by 15%")
         
-        if is_hot:
-            factors.append("🌡️ **Very Hot Weather**")
-            factor_impacts.append("Extreme heat correlates with 8% higher no-show rates")
+            if is_hot:
+                factors.append("🌡️ **Very Hot Weather**")
+                factor_impacts.append("Extreme heat correlates with 8% higher no-show rates")
         
-        if age < 18:
-            factors.append("👦 **Youth Patient**")
-            factor_impacts.append("Younger patients show slightly higher no-show tendency")
+            if age < 18:
+                factors.append("👦 **Youth Patient**")
+                factor_impacts.append("Younger patients show slightly higher no-show tendency")
         
-        if disability != "None":
-            factors.append(f"♿ **{disability} Disability**")
-            factor_impacts.append("Mobility or accessibility challenges may impact attendance")
+            if disability != "None":
+                factors.append(f"♿ **{disability} Disability**")
+                factor_impacts.append("Mobility or accessibility challenges may impact attendance")
         
-        if shift == "Afternoon":
-            factors.append("⏰ **Afternoon Appointment**")
-            factor_impacts.append("Afternoon slots have 5% higher no-show rates than morning")
+            if shift == "Afternoon":
+                factors.append("⏰ **Afternoon Appointment**")
+                factor_impacts.append("Afternoon slots have 5% higher no-show rates than morning")
         
         if factors:
             for i, (factor, impact) in enumerate(zip(factors, factor_impacts)):
@@ -432,6 +568,8 @@ if predict_button:
         else:
             st.success("✅ No significant risk factors identified - patient profile is optimal for attendance")
         
+        profiler.mark("Recommendations and impact")
+        
         # Recommendations - Enhanced
         st.markdown("---")
         st.markdown("### 💡 AI-Powered Recommendations")
@@ -520,7 +658,57 @@ if predict_button:
             Expected loss risk: ${appointment_value * risk_score:.2f} (very low)
             """)
 
+profiler.mark("Batch scoring")
+
+# Batch scoring runs on the shared job pool, so the page stays responsive while it works
+st.markdown("---")
+st.markdown("## 📦 Batch Scoring")
+
+if model is not None:
+    from utils.jobs import job_manager
+    
+    st.session_state.setdefault('job_owner', os.urandom(8).hex())
+    st.session_state.setdefault('batch_jobs', [])
+    
+    batch_file = st.file_uploader("Upload appointments (CSV in the raw appointment schema)", type=["csv"])
+    if batch_file is not None and st.button("📦 Score Uploaded Appointments"):
+        import pandas as pd
+        from utils.jobs import submit_scoring
+        
+        job = submit_scoring(model, pd.read_csv(batch_file), owner=st.session_state['job_owner'])
+        st.session_state['batch_jobs'].append(job.id)
+    
+    job_ids = st.session_state['batch_jobs']
+    if any(not job.finished for job in map(job_manager().get, job_ids) if job is not None):
+        poll_batch_jobs(job_ids)
+    else:
+        render_batch_jobs(job_ids)
+        
+        from utils.drift import drift_monitor
+        
+        # Everything scored by this worker since the model version went live
+        monitor = drift_monitor(model)
+        drift = monitor.report() if monitor is not None and job_ids else None
+        if drift is not None and len(drift):
+            with st.expander("🧭 Input Drift vs. Training Data", expanded=(drift['status'] != 'ok').any()):
+                st.dataframe(drift, use_container_width=True)
+else:
+    st.caption("*Batch scoring needs the trained model files*")
+
+profiler.mark("Footer")
+
 # Footer
 st.markdown("---")
 st.caption("🏥 No-Show Risk Predictor | Powered by Random Forest ML (F1: 0.7261, AUC: 0.8795)")
-st.caption("💡 This is a demo version using simplified risk calculation based on key factors from the trained model")
\ No newline at end of file
+if score_source == 'table':
+    st.caption("💡 Risk score from the trained model's precomputed risk table; risk factors are general patterns")
+elif score_source == 'student':
+    st.caption("💡 Risk score from the distilled model, which has no decision paths; risk factors are general patterns")
+elif score_source == 'model':
+    st.caption("💡 Risk score and risk factors come from the trained model's decision paths")
+elif model is not None:
+    st.caption("💡 Risk scores come from the trained model")
+else:
+    st.caption("💡 Model files not found - demo version using simplified risk calculation based on key factors from the trained model")
+
+profiler.finish()
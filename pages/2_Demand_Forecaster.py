@@ -3,10 +3,16 @@ Predict daily appointment volumes with beautiful visualizations
 """
 
 import streamlit as st
-import pandas as pd
-import numpy as np
-import plotly.graph_objects as go
+import math
 from datetime import datetime, timedelta
+import sys
+import os
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import warmup
+from utils.profiling import PageProfiler
 
 # Page config
 st.set_page_config(
@@ -15,6 +21,10 @@ st.set_page_config(
     layout="wide"
 )
 
+# Opt-in profiling (PAGE_PROFILE=1 or ?profile=1)
+profiler = PageProfiler('demand_forecaster')
+profiler.mark("CSS injection")
+
 # Enhanced CSS
 st.markdown("""
 <style>
@@ -177,6 +187,17 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+@st.cache_resource(show_spinner=False)
+def load_model():
+    """Trained demand forecaster, or None if unavailable"""
+    # Shared with the warm-up thread and the No-Show Predictor page
+    loader = warmup.shared_loader()
+    if loader.forecaster is None:
+        return None
+    return loader
+
+profiler.mark("Header and banners")
+
 # Header
 st.title("📈 Demand Forecaster")
 st.markdown("*AI-powered appointment volume prediction for optimal resource planning*")
@@ -202,6 +223,17 @@ with st.expander("📊 Model Performance Metrics", expanded=False):
 
 st.markdown("---")
 
+model = load_model()
+
+# Typical daily volumes by weekday (historical patterns): the fallback estimate,
+# and the recent demand the forecaster's lag features are built from
+day_averages = {
+    "Monday": 450, "Tuesday": 480, "Wednesday": 470,
+    "Thursday": 460, "Friday": 420, "Saturday": 280, "Sunday": 180
+}
+
+profiler.mark("Input widgets")
+
 # Input Form - Enhanced
 st.markdown("## 📅 Forecast Configuration")
 st.markdown("*Configure your forecast parameters below*")
@@ -238,6 +270,21 @@ with col1:
     if is_weekend:
         st.warning("⚠️ Weekend selected - expect significantly lower volumes")
     
+    from utils.calendar_features import calendar_table
+    calendar = calendar_table([forecast_date])
+    holiday_name = calendar.holiday_name(forecast_date)
+    # Only a forecaster trained on the calendar features adjusts for the day
+    model_features = set(model.forecaster_features) if model is not None else set()
+    if holiday_name:
+        adjusted = not model_features.isdisjoint({'is_holiday', 'is_state_holiday', 'is_optional_holiday'})
+        st.warning(f"🎉 {holiday_name} (holiday in Santa Catarina) - expect significantly lower volumes")
+        st.caption("*The forecast accounts for the holiday*" if adjusted
+                   else "*The forecast below does not adjust for holidays*")
+    elif calendar.take([forecast_date])['is_bridge_day'].iloc[0]:
+        st.warning("🌉 Bridge day between a holiday and the weekend - expect lower volumes")
+        st.caption("*The forecast accounts for bridge days*" if 'is_bridge_day' in model_features
+                   else "*The forecast below does not adjust for bridge days*")
+    
     st.markdown('</div>', unsafe_allow_html=True)
 
 with col2:
@@ -255,11 +302,42 @@ with col2:
     if specialty_filter != "All Specialties":
         st.caption(f"📊 Forecasting for: **{specialty_filter}** only")
     
+    weather_options = ["☀️ Normal/Clear", "🌧️ Rainy", "🔥 Very Hot (>30°C)", "🥶 Cold (<15°C)"]
+    
+    # Representative daily weather of each option, as the forecaster's weather input
+    weather_values = {
+        "☀️ Normal/Clear": {'average_temp_day': 22.0, 'average_rain_day': 0.0,
+                           'max_temp_day': 27.0, 'max_rain_day': 0.0},
+        "🌧️ Rainy": {'average_temp_day': 20.0, 'average_rain_day': 10.0,
+                     'max_temp_day': 24.0, 'max_rain_day': 25.0},
+        "🔥 Very Hot (>30°C)": {'average_temp_day': 28.0, 'average_rain_day': 0.0,
+                              'max_temp_day': 33.0, 'max_rain_day': 0.0},
+        "🥶 Cold (<15°C)": {'average_temp_day': 13.0, 'average_rain_day': 0.0,
+                          'max_temp_day': 17.0, 'max_rain_day': 0.0}
+    }
+    
+    # Preselect the condition from the daily weather file, when there is one for this date
+    from utils.weather import shared_weather
+    weather_source = shared_weather()
+    day_weather = weather_source.daily([forecast_date]).iloc[0] if weather_source is not None else None
+    weather_index = 0
+    if day_weather is not None and day_weather.notna().all():
+        if day_weather['average_rain_day'] > 5:
+            weather_index = 1
+        elif day_weather['max_temp_day'] > 30:
+            weather_index = 2
+        elif day_weather['average_temp_day'] < 15:
+            weather_index = 3
+    
     weather_forecast = st.selectbox(
         "🌤️ Expected Weather Conditions",
-        options=["☀️ Normal/Clear", "🌧️ Rainy", "🔥 Very Hot (>30°C)", "🥶 Cold (<15°C)"],
+        options=weather_options,
+        index=weather_index,
         help="Weather significantly impacts patient attendance"
     )
+    if day_weather is not None and day_weather.notna().all():
+        st.caption(f"🛰️ Weather file: {day_weather['average_temp_day']:.1f}°C "
+                   f"(max {day_weather['max_temp_day']:.1f}°C), {day_weather['average_rain_day']:.1f} mm rain")
     
     # Weather impact indicator
     weather_impact = {
@@ -288,37 +366,58 @@ if forecast_button:
     
     with st.spinner("🤖 AI analyzing historical patterns and generating forecast..."):
         
-        # Calculate forecast (same logic as before)
-        day_averages = {
-            "Monday": 450, "Tuesday": 480, "Wednesday": 470,
-            "Thursday": 460, "Friday": 420, "Saturday": 280, "Sunday": 180
-        }
-        
-        base_forecast = day_averages.get(day_of_week, 400)
+        profiler.mark("Forecast calculation")
         
+        # Typical share of the total volume for each specialty
         specialty_multipliers = {
             "All Specialties": 1.0, "physiotherapy": 0.35, "psychotherapy": 0.25,
             "speech therapy": 0.15, "occupational therapy": 0.12,
             "pedagogo": 0.08, "assist": 0.05
         }
+        specialty_share = specialty_multipliers.get(specialty_filter, 0.2)
         
-        if specialty_filter != "All Specialties":
-            base_forecast *= specialty_multipliers.get(specialty_filter, 0.2)
-        
-        weather_multipliers = {
-            "☀️ Normal/Clear": 1.0, "🌧️ Rainy": 0.88,
-            "🔥 Very Hot (>30°C)": 0.92, "🥶 Cold (<15°C)": 0.95
-        }
-        
-        weather_mult = weather_multipliers.get(weather_forecast, 1.0)
-        base_forecast *= weather_mult
+        if model is not None:
+            # Trained forecaster: the selected weather and clear weather in one call, with the
+            # 20th/80th percentiles of the forest's per-tree predictions as the bounds
+            import pandas as pd
+            from utils.preprocessing import forecast_days
+            
+            selected_weather = weather_values[weather_forecast]
+            if (day_weather is not None and day_weather.notna().all()
+                    and weather_forecast == weather_options[weather_index]):
+                selected_weather = day_weather.to_dict()
+            rows = forecast_days([forecast_date] * 2, list(day_averages.values()),
+                                 pd.DataFrame([selected_weather, weather_values["☀️ Normal/Clear"]]))
+            horizon = model.pinned().forecast_horizon(rows, quantiles=[0.2, 0.8]).clip(lower=0) * specialty_share
+            
+            forecast_value = int(round(horizon['predicted_appointments'].iloc[0]))
+            normal_volume = int(round(horizon['predicted_appointments'].iloc[1]))
+            lower_bound = int(round(horizon['q20'].iloc[0]))
+            upper_bound = int(round(horizon['q80'].iloc[0]))
+        else:
+            # Fallback: typical weekday volume with fixed weather multipliers, bounds of one MAE
+            base_forecast = day_averages.get(day_of_week, 400) * specialty_share
+            
+            weather_multipliers = {
+                "☀️ Normal/Clear": 1.0, "🌧️ Rainy": 0.88,
+                "🔥 Very Hot (>30°C)": 0.92, "🥶 Cold (<15°C)": 0.95
+            }
+            
+            normal_volume = int(round(base_forecast))
+            forecast_value = int(round(base_forecast * weather_multipliers.get(weather_forecast, 1.0)))
+            lower_bound = max(0, forecast_value - 80)
+            upper_bound = forecast_value + 80
         
-        forecast_value = int(round(base_forecast))
-        lower_bound = max(0, int(round(forecast_value - 80)))
-        upper_bound = int(round(forecast_value + 80))
+        profiler.mark("Result cards")
         
         # Display results
         st.success("✅ Forecast Generated Successfully!")
+        if model is None:
+            st.caption("*Demo estimate from typical weekday volumes and fixed weather adjustments "
+                       "(model files not found); the bounds are ± the model's mean error*")
+        if specialty_filter != "All Specialties":
+            st.caption(f"*Total forecast scaled by the typical {specialty_filter} share "
+                       f"({specialty_share:.0%} of appointments)*")
         
         st.markdown("---")
         
@@ -391,7 +490,8 @@ if forecast_button:
                 f"{lower_bound}",
                 delta="Conservative",
                 delta_color="off",
-                help="Minimum expected (20th percentile)"
+                help=("Minimum expected (20th percentile)" if model is not None
+                      else "Estimate minus the model's mean error (80 appointments)")
             )
         
         with col3:
@@ -400,7 +500,8 @@ if forecast_button:
                 f"{upper_bound}",
                 delta="Optimistic",
                 delta_color="off",
-                help="Maximum expected (80th percentile)"
+                help=("Maximum expected (80th percentile)" if model is not None
+                      else "Estimate plus the model's mean error (80 appointments)")
             )
         
         with col4:
@@ -411,7 +512,11 @@ if forecast_button:
                 help="Forecast reliability based on historical data"
             )
         
-        # Gauge Visualization
+        profiler.mark("Chart: forecast gauge")
+        
+        # Gauge Visualization (plotly is only imported once a chart is drawn)
+        import plotly.graph_objects as go
+        
         st.markdown("---")
         st.markdown("### 📈 Visual Forecast")
         
@@ -453,6 +558,8 @@ if forecast_button:
         
         st.plotly_chart(fig, use_container_width=True)
         
+        profiler.mark("Chart: weekly pattern")
+        
         # Weekly Pattern
         st.markdown("---")
         st.markdown("### 📊 Weekly Volume Context")
@@ -503,13 +610,15 @@ if forecast_button:
         
         st.plotly_chart(fig2, use_container_width=True)
         
+        profiler.mark("Staffing, weather and confidence")
+        
         # Staffing Recommendations
         st.markdown("---")
         st.markdown("### 👥 Staffing Recommendations")
         
-        staff_needed = max(1, int(np.ceil(forecast_value / 40)))
-        staff_min = max(1, int(np.ceil(lower_bound / 40)))
-        staff_max = int(np.ceil(upper_bound / 40))
+        staff_needed = max(1, int(math.ceil(forecast_value / 40)))
+        staff_min = max(1, int(math.ceil(lower_bound / 40)))
+        staff_max = int(math.ceil(upper_bound / 40))
         
         col1, col2 = st.columns(2, gap="large")
         
@@ -584,9 +693,8 @@ if forecast_button:
             st.markdown("---")
             st.markdown("### 🌦️ Weather Impact Analysis")
             
-            impact_pct = (1 - weather_mult) * 100
-            normal_volume = int(forecast_value / weather_mult)
-            volume_reduction = normal_volume - forecast_value
+            volume_change = forecast_value - normal_volume
+            change_pct = volume_change / normal_volume * 100 if normal_volume else 0.0
             
             st.markdown(f"""
             <div class="info-box">
@@ -601,9 +709,9 @@ if forecast_button:
                         <td style="text-align: right;"><strong>{forecast_value}</strong> appointments</td>
                     </tr>
                     <tr style="border-top: 2px solid #088395;">
-                        <td style="padding-top: 0.5rem;"><strong>Estimated Reduction:</strong></td>
+                        <td style="padding-top: 0.5rem;"><strong>Estimated Change:</strong></td>
                         <td style="text-align: right; padding-top: 0.5rem; color: #dc3545;">
-                            <strong>-{volume_reduction}</strong> ({impact_pct:.0f}%)
+                            <strong>{volume_change:+d}</strong> ({change_pct:+.0f}%)
                         </td>
                     </tr>
                 </table>
@@ -642,6 +750,10 @@ if forecast_button:
             """, unsafe_allow_html=True)
         
         with col2:
+            if model is not None:
+                range_note = "Between the 20th and 80th percentiles of the forest's per-tree predictions"
+            else:
+                range_note = "Demo estimate ± the model's mean error (not a prediction interval)"
             st.markdown(f"""
             <div class="info-box">
                 <strong>🎯 Model Performance</strong><br><br>
@@ -661,12 +773,19 @@ if forecast_button:
                 </table>
                 <hr style="border: none; height: 1px; background: #d1e9f0; margin: 1rem 0;">
                 <p style="font-size: 0.9rem; color: #6c757d;">
-                    80% of actual values fall within this range
+                    {range_note}
                 </p>
             </div>
             """, unsafe_allow_html=True)
 
+profiler.mark("Footer")
+
 # Footer
 st.markdown("---")
 st.caption("📈 Demand Forecaster | Random Forest Model (R²: 0.7534, MAE: ±80)")
-st.caption("💡 Demo version using historical patterns and key predictive features from the trained model")
\ No newline at end of file
+if model is not None:
+    st.caption("💡 Forecasts and bounds come from the trained model's per-tree predictions")
+else:
+    st.caption("💡 Model files not found - demo version using historical patterns and key predictive features from the trained model")
+
+profiler.finish()
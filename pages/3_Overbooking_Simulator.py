@@ -0,0 +1,171 @@
+"""
+Overbooking and standby planning from per-patient no-show risk
+"""
+
+import streamlit as st
+import pandas as pd
+import numpy as np
+import sys
+import os
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.overbooking import simulate_overbooking, recommend_extra_bookings, DEFAULT_SIMULATIONS
+
+# Page config
+st.set_page_config(
+    page_title="Overbooking Simulator",
+    page_icon="🔄",
+    layout="wide"
+)
+
+st.markdown("""
+<style>
+    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700&display=swap');
+
+    .stApp {
+        background: #f8f9fa;
+        font-family: 'Inter', sans-serif;
+    }
+
+    div[data-testid="stMetricValue"] {
+        font-size: 2.2rem;
+        font-weight: 700;
+        color: #0a4d68;
+    }
+</style>
+""", unsafe_allow_html=True)
+
+
+@st.cache_data(show_spinner=False)
+def example_schedule(n_appointments=420, seed=7):
+    """Synthetic scored clinic day (mean no-show risk ~32%, hourly slots)"""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'slot': [f"{h:02d}:00" for h in rng.integers(7, 18, n_appointments)],
+        'noshow_probability': rng.beta(2.0, 4.3, n_appointments).round(3)
+    })
+
+
+@st.cache_data(show_spinner=False)
+def run_simulation(noshow_proba, slots, max_extra, n_sims):
+    """Cached so that moving the risk target does not re-run the simulation"""
+    return simulate_overbooking(noshow_proba, slots, max_extra=max_extra, n_sims=n_sims)
+
+
+# Header
+st.title("🔄 Overbooking Simulator")
+st.markdown("*Monte Carlo backup planning for a clinic day's scored appointments*")
+st.divider()
+
+st.info(f"""
+💡 **How it works**: Each patient's attendance is simulated as an independent draw from their
+predicted no-show probability over **{DEFAULT_SIMULATIONS:,} simulated days**. For every slot the simulator
+finds how many extra bookings keep the chance of having more patients than seats under your target.
+""")
+
+# Schedule input
+st.markdown("## 📋 Clinic Day Schedule")
+uploaded = st.file_uploader(
+    "Upload scored appointments (CSV with `slot` and `noshow_probability` columns)",
+    type=["csv"]
+)
+
+if uploaded is not None:
+    schedule = pd.read_csv(uploaded)
+    missing = {'slot', 'noshow_probability'} - set(schedule.columns)
+    if missing:
+        st.error(f"❌ Missing columns: {', '.join(sorted(missing))}")
+        st.stop()
+else:
+    st.caption("*No file uploaded - using an example day of scored appointments*")
+    schedule = example_schedule()
+
+col1, col2, col3 = st.columns(3)
+with col1:
+    target_risk = st.slider("🎯 Max overflow risk per slot", 0.01, 0.30, 0.05, 0.01,
+                            help="Acceptable probability that more patients attend than the slot can see")
+with col2:
+    max_extra = st.slider("➕ Max extra bookings per slot", 1, 10, 5)
+with col3:
+    n_sims = st.select_slider("🎲 Simulated days", options=[10_000, 50_000, 100_000],
+                              value=DEFAULT_SIMULATIONS)
+
+simulation = run_simulation(
+    schedule['noshow_probability'].to_numpy(dtype=float),
+    schedule['slot'].astype(str).to_numpy(),
+    max_extra,
+    n_sims
+)
+summary = recommend_extra_bookings(simulation, target_risk)
+
+st.markdown("---")
+st.markdown("## 📊 Recommendations")
+
+col1, col2, col3, col4 = st.columns(4)
+with col1:
+    st.metric("Booked Appointments", f"{int(summary['booked'].sum())}")
+with col2:
+    st.metric("Expected No-Shows", f"{summary['booked'].sum() - summary['expected_attendance'].sum():.0f}")
+with col3:
+    st.metric("Recommended Extra Bookings", f"{int(summary['recommended_extra'].sum())}")
+with col4:
+    recovered = summary['idle_without_extra'].sum() - summary['expected_idle'].sum()
+    st.metric("Empty Seats Recovered", f"{recovered:.1f}", help="Expected per day")
+
+table = summary.rename(columns={
+    'booked': 'Booked',
+    'capacity': 'Capacity',
+    'expected_attendance': 'Expected Attendance',
+    'recommended_extra': 'Extra Bookings',
+    'overflow_risk': 'Overflow Risk',
+    'expected_idle': 'Idle Seats (with extras)',
+    'idle_without_extra': 'Idle Seats (no extras)'
+})
+st.dataframe(
+    table.style.format({
+        'Expected Attendance': '{:.1f}',
+        'Overflow Risk': '{:.1%}',
+        'Idle Seats (with extras)': '{:.2f}',
+        'Idle Seats (no extras)': '{:.2f}'
+    }),
+    use_container_width=True
+)
+
+# Risk curves (plotly is only imported once a chart is drawn)
+import plotly.graph_objects as go
+
+st.markdown("### 📈 Overflow Risk by Extra Bookings")
+fig = go.Figure()
+risk = simulation['overflow_risk']
+for slot, curve in risk.iterrows():
+    fig.add_trace(go.Scatter(
+        x=risk.columns,
+        y=curve.values,
+        mode='lines+markers',
+        name=str(slot),
+        hovertemplate='%{x} extra: %{y:.1%}<extra>' + str(slot) + '</extra>'
+    ))
+fig.add_hline(y=target_risk, line_dash="dash", line_color="#dc3545",
+              annotation_text=f"Target: {target_risk:.0%}")
+fig.update_layout(
+    xaxis_title="Extra bookings in slot",
+    yaxis_title="Probability of overflow",
+    yaxis_tickformat='.0%',
+    height=450,
+    plot_bgcolor='white',
+    paper_bgcolor='rgba(0,0,0,0)'
+)
+st.plotly_chart(fig, use_container_width=True)
+
+st.download_button(
+    "⬇️ Download recommendations (CSV)",
+    summary.to_csv().encode('utf-8'),
+    file_name="overbooking_recommendations.csv",
+    mime="text/csv"
+)
+
+# Footer
+st.markdown("---")
+st.caption("🔄 Overbooking Simulator | Independent Bernoulli attendance per patient, extra bookings modelled on the slot's average risk")
@@ -0,0 +1,38 @@
+"""
+Test Fixtures
+Small synthetic models in the notebooks' legacy layout, built once per session
+"""
+
+import os
+import sys
+import shutil
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fixtures import build_fixture
+
+
+@pytest.fixture(scope='session')
+def legacy_template(tmp_path_factory):
+    """(workdir, raw appointments) of a fixture shared by the session; do not modify"""
+    workdir = tmp_path_factory.mktemp('legacy')
+    raw = build_fixture(str(workdir), classifier_rows=3_000, n_estimators=5)
+    return workdir, raw
+
+
+@pytest.fixture
+def legacy_workdir(legacy_template, tmp_path):
+    """Private copy of the fixture's models/ and data/ for a test that publishes or overwrites"""
+    template, _ = legacy_template
+    workdir = tmp_path / 'site'
+    shutil.copytree(template, workdir)
+    return workdir
+
+
+@pytest.fixture
+def legacy_raw(legacy_template):
+    """Synthetic raw appointments the fixture models were trained on"""
+    return legacy_template[1]
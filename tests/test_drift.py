@@ -0,0 +1,40 @@
+import os
+
+import joblib
+
+from utils import drift
+from utils.model_loader import ModelLoader, current_version, publish_version, read_manifest
+
+
+def fit_reference(loader, raw):
+    scores = loader.score_noshow(loader.prepare_classifier_input(raw))
+    return drift.DriftProfile.fit(raw, scores['noshow_probability'][scores['valid']])
+
+
+def test_save_reference_on_legacy_layout_writes_the_artifact_file(legacy_workdir, legacy_raw):
+    models_dir = str(legacy_workdir / 'models')
+    loader = ModelLoader(models_dir, str(legacy_workdir / 'data' / 'processed' / 'label_encoders.pkl'))
+    assert loader.load_classifier() and loader.load_preprocessing()
+
+    assert drift.save_reference(loader, fit_reference(loader, legacy_raw.iloc[:2_000])) == 'legacy'
+    assert os.path.exists(os.path.join(models_dir, 'drift_reference.joblib'))
+    assert current_version(models_dir) is None
+
+
+def test_save_reference_republish_keeps_forecaster(legacy_workdir, legacy_raw):
+    models_dir = str(legacy_workdir / 'models')
+    encoders_path = str(legacy_workdir / 'data' / 'processed' / 'label_encoders.pkl')
+    # A classifier-only first publish, as in the README
+    publish_version(models_dir, classifier={
+        'model': joblib.load(os.path.join(models_dir, 'best_noshow_classifier.joblib')),
+        'features': joblib.load(os.path.join(models_dir, 'feature_names.joblib')), 'metadata': {}})
+    loader = ModelLoader(models_dir, encoders_path)
+    assert loader.load_classifier() and loader.load_preprocessing()
+
+    version = drift.save_reference(loader, fit_reference(loader, legacy_raw.iloc[:2_000]))
+
+    assert current_version(models_dir) == version
+    manifest = read_manifest(models_dir, version)
+    assert 'forecaster' in manifest
+    assert 'drift_reference' in manifest['classifier']['artifacts']
+    assert ModelLoader(models_dir, encoders_path).load_forecaster()
@@ -0,0 +1,45 @@
+import sqlite3
+
+import pandas as pd
+
+from utils.feature_store import PatientFeatureStore
+
+
+def outcomes(rows):
+    return pd.DataFrame(rows, columns=['patient_id', 'appointment_date_continuous', 'no_show'])
+
+
+def test_lookup_counts_only_visits_before_each_appointment(tmp_path):
+    store = PatientFeatureStore(str(tmp_path / 'store.sqlite'))
+    store.update(outcomes([('p1', '2020-01-01', 'yes'), ('p1', '2020-01-10', 'no'),
+                           ('p1', '2020-01-20', 'yes'), ('p2', '2020-01-05', 'no')]))
+
+    history = store.lookup(['p1', 'p1', 'p1', 'p2', 'p3', 'p1'],
+                           before=['2020-01-01', '2020-01-10', '2020-02-01', '2020-01-06', '2020-01-06', None])
+
+    assert history['visits'].tolist() == [0, 1, 3, 1, 0, 3]
+    assert history['noshows'].tolist() == [0, 1, 2, 0, 0, 2]
+    assert history['last_visit'].iloc[0] is pd.NaT
+    assert history['last_visit'].iloc[1] == pd.Timestamp('2020-01-01')
+    assert history['last_visit'].iloc[2] == pd.Timestamp('2020-01-20')
+    assert history['last_visit'].iloc[4] is pd.NaT
+    store.close()
+
+
+def test_totals_from_an_older_store_count_after_the_last_visit(tmp_path):
+    path = str(tmp_path / 'store.sqlite')
+    db = sqlite3.connect(path)
+    db.execute('CREATE TABLE patient_history (patient_id TEXT PRIMARY KEY, visits INTEGER NOT NULL, '
+               'noshows INTEGER NOT NULL, last_visit INTEGER)')
+    last_visit = (pd.Timestamp('2020-01-20') - pd.Timestamp('1970-01-01')).days
+    db.execute('INSERT INTO patient_history VALUES (?, ?, ?, ?)', ('p1', 3, 2, last_visit))
+    db.commit()
+    db.close()
+
+    store = PatientFeatureStore(path)
+    history = store.lookup(['p1', 'p1'], before=['2020-01-20', '2020-01-21'])
+
+    assert history['visits'].tolist() == [0, 3]
+    assert history['noshows'].tolist() == [0, 2]
+    assert len(store) == 1
+    store.close()
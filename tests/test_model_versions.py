@@ -0,0 +1,53 @@
+import os
+
+import joblib
+import pytest
+
+from utils.model_loader import ModelLoader, publish_version, read_manifest
+
+
+def load(workdir):
+    loader = ModelLoader(str(workdir / 'models'), str(workdir / 'data' / 'processed' / 'label_encoders.pkl'))
+    assert loader.load_classifier() and loader.load_forecaster() and loader.load_preprocessing()
+    return loader
+
+
+def test_first_publish_keeps_legacy_forecaster_and_rates(legacy_workdir):
+    models_dir = str(legacy_workdir / 'models')
+    classifier = joblib.load(os.path.join(models_dir, 'best_noshow_classifier.joblib'))
+    features = joblib.load(os.path.join(models_dir, 'feature_names.joblib'))
+
+    # The README's example: a classifier only, without artifacts
+    version = publish_version(models_dir, classifier={'model': classifier, 'features': features, 'metadata': {}})
+
+    manifest = read_manifest(models_dir, version)
+    assert 'forecaster' in manifest
+    assert 'noshow_rates' in manifest['classifier']['artifacts']
+
+    loader = load(legacy_workdir)
+    assert loader.version == version
+    assert loader.noshow_rates is not None
+
+
+def test_activate_refuses_a_version_without_a_forecaster(tmp_path, legacy_template):
+    template, _ = legacy_template
+    classifier = joblib.load(template / 'models' / 'best_noshow_classifier.joblib')
+    spec = {'model': classifier, 'features': joblib.load(template / 'models' / 'feature_names.joblib')}
+
+    models_dir = str(tmp_path / 'models')
+    with pytest.raises(ValueError, match='forecaster'):
+        publish_version(models_dir, classifier=spec)
+    assert not os.path.exists(os.path.join(models_dir, 'CURRENT'))
+
+    version = publish_version(models_dir, classifier=spec, activate=False)
+    assert 'forecaster' not in read_manifest(models_dir, version)
+
+
+def test_default_version_names_do_not_collide(tmp_path, legacy_template):
+    template, _ = legacy_template
+    spec = {'model': joblib.load(template / 'models' / 'best_noshow_classifier.joblib'),
+            'features': joblib.load(template / 'models' / 'feature_names.joblib')}
+    models_dir = str(tmp_path / 'models')
+
+    versions = [publish_version(models_dir, classifier=spec, activate=False) for _ in range(3)]
+    assert len(set(versions)) == 3
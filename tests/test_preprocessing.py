@@ -0,0 +1,27 @@
+import numpy as np
+import pandas as pd
+
+from utils.preprocessing import DATA_START_DATE, FeatureSchema, build_daily_series
+
+
+def test_daily_series_trend_has_a_fixed_origin(legacy_raw):
+    dates = pd.to_datetime(legacy_raw['appointment_date_continuous'])
+    recent = legacy_raw[dates >= dates.max() - pd.Timedelta(days=30)]
+
+    ts = build_daily_series(recent)
+
+    expected = (ts['appointment_date'] - DATA_START_DATE).dt.days
+    assert (ts['days_since_start'] == expected).all()
+    assert ts['days_since_start'].min() > 30
+
+
+def test_feature_schema_aligns_reordered_frames_with_extra_columns():
+    schema = FeatureSchema.compile(['age', 'gender_M', 'place_encoded'])
+    frame = pd.DataFrame({'note': ['a', 'b'], 'place_encoded': [3, -1], 'age': [40.0, 7.0],
+                          'when': pd.to_datetime(['2020-01-01', '2020-01-02']), 'gender_M': [1, 0]})
+
+    matrix, valid = schema.align(frame)
+
+    assert matrix.dtype == np.float32
+    assert np.array_equal(matrix, [[40, 1, 3], [7, 0, -1]])
+    assert valid.all()
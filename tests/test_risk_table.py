@@ -0,0 +1,20 @@
+import os
+
+import joblib
+
+from utils.model_loader import ModelLoader
+from utils.risk_table import model_fingerprint
+
+
+def test_legacy_fingerprint_changes_with_noshow_rates(legacy_workdir):
+    models_dir = str(legacy_workdir / 'models')
+    loader = ModelLoader(models_dir, str(legacy_workdir / 'data' / 'processed' / 'label_encoders.pkl'))
+    assert loader.load_classifier() and loader.load_preprocessing()
+    before = model_fingerprint(loader)
+
+    rates_path = os.path.join(models_dir, 'noshow_rates.joblib')
+    # Refit rates written back in place, as the notebook does
+    joblib.dump(joblib.load(rates_path), rates_path)
+    os.utime(rates_path, ns=(0, os.stat(rates_path).st_mtime_ns + 1_000_000_000))
+
+    assert model_fingerprint(loader) != before
@@ -0,0 +1,6 @@
+from benchmarks.startup import DEFAULT_BUDGET, report
+
+
+def test_app_cold_start_is_within_budget():
+    # Median of three fresh interpreters, as `python benchmarks/startup.py --check` measures it
+    assert report('app.py', runs=3, top=0) <= DEFAULT_BUDGET
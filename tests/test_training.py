@@ -0,0 +1,37 @@
+import joblib
+
+from utils.model_loader import ModelLoader, read_manifest
+from utils.training import append_outcomes, distill_and_publish, refresh_and_publish
+
+
+def test_refresh_on_legacy_layout_keeps_forecaster(legacy_workdir, legacy_raw, tmp_path):
+    models_dir = str(legacy_workdir / 'models')
+    encoders_path = str(legacy_workdir / 'data' / 'processed' / 'label_encoders.pkl')
+    outcomes_dir = str(tmp_path / 'outcomes')
+    append_outcomes(legacy_raw.iloc[:4_000], outcomes_dir)
+
+    # First publish over the notebooks' files, activated as in the nightly job
+    version, _ = refresh_and_publish(models_dir, encoders_path, outcomes_dir, add_trees=2, force=True)
+
+    manifest = read_manifest(models_dir, version)
+    assert 'forecaster' in manifest
+    assert joblib.load(legacy_workdir / 'models' / 'forecasting_feature_names.joblib') == \
+        manifest['forecaster']['features']
+    loader = ModelLoader(models_dir, encoders_path)
+    assert loader.load_forecaster() and loader.version == version
+
+
+def test_distill_activate_on_legacy_layout_keeps_forecaster(legacy_workdir, legacy_raw):
+    models_dir = str(legacy_workdir / 'models')
+    encoders_path = str(legacy_workdir / 'data' / 'processed' / 'label_encoders.pkl')
+    loader = ModelLoader(models_dir, encoders_path)
+    assert loader.load_classifier() and loader.load_preprocessing()
+    train, test = legacy_raw.iloc[:3_000], legacy_raw.iloc[3_000:4_000]
+    X_train, X_test = loader.prepare_classifier_input(train), loader.prepare_classifier_input(test)
+    y_test = (test['no_show'] == 'yes').astype(int).to_numpy()
+
+    version, _ = distill_and_publish(models_dir, X_train, X_test, y_test, student='logistic',
+                                     activate=True, force=True)
+
+    assert 'forecaster' in read_manifest(models_dir, version)
+    assert ModelLoader(models_dir, encoders_path).load_forecaster()
@@ -0,0 +1,244 @@
+"""
+Backfill Utilities
+Process-pool scoring of large Parquet appointment files into partitioned Parquet
+
+Usage:
+    python -m utils.backfill INPUT OUTPUT_DIR [--workers 8] [--version VERSION]
+
+INPUT is a Parquet file or a directory of them. Each row group is one task; the
+scores land in OUTPUT_DIR/appointment_month=YYYY-MM/ next to the input columns.
+"""
+
+import os
+import time
+import shutil
+import argparse
+import tempfile
+import multiprocessing
+from urllib.parse import quote
+from concurrent.futures import ProcessPoolExecutor
+
+from utils import metrics
+from utils.model_loader import ModelBundle, ModelLoader, ThreadBudget
+
+PARTITION_COL = 'appointment_month'
+
+# Markers of finished tasks (named after the task, holding the model version
+# that scored it), so an interrupted backfill can resume
+DONE_DIR = '_done'
+
+# Set in each worker process by _init_worker
+_worker_loader = None
+
+
+def parquet_tasks(input_path):
+    """(file, row group) pairs of a Parquet file or directory, in a stable order"""
+    import pyarrow.parquet as pq
+
+    if os.path.isdir(input_path):
+        files = sorted(os.path.join(root, name)
+                       for root, _, names in os.walk(input_path)
+                       for name in names if name.endswith(('.parquet', '.pq')))
+    else:
+        files = [input_path]
+    return [(path, group) for path in files for group in range(pq.ParquetFile(path).num_row_groups)]
+
+
+def _export_model(loader, version, directory):
+    """
+    Dump the pinned classifier and encoders uncompressed, for memory-mapped loading
+
+    Workers load this file instead of the (possibly compressed) published
+    artifact: numpy arrays inside it are memory-mapped rather than read, and
+    every worker gets exactly the same model version.
+    """
+    import joblib
+
+    bundle = loader.load_bundle('classifier', version)
+    path = os.path.join(directory, 'classifier.joblib')
+    # The bundle's caches hold per-thread buffers, so only its contents are exported
+    joblib.dump({'model': bundle.model, 'features': bundle.features, 'metadata': bundle.metadata,
+                 'version': bundle.version, 'artifacts': bundle.artifacts,
+                 'label_encoders': loader.label_encoders}, path)
+    return path, bundle.version
+
+
+def _init_worker(model_path):
+    """Load the model once per worker process"""
+    global _worker_loader
+    import joblib
+
+    # Only the parent process exports metrics; a worker binding the same port would fail
+    for name in (metrics.PORT_ENV, metrics.TEXTFILE_ENV):
+        os.environ.pop(name, None)
+
+    exported = joblib.load(model_path, mmap_mode='r')
+    # Processes are the unit of parallelism here, so each model call gets one thread
+    loader = ModelLoader(thread_budget=ThreadBudget(threads_per_call=1, total_threads=1))
+    loader.label_encoders = exported['label_encoders']
+    loader.thread_budget.configure(exported['model'])
+    loader.activate(classifier=ModelBundle(exported['model'], exported['features'], exported['metadata'],
+                                           version=exported['version'], artifacts=exported['artifacts']))
+    _worker_loader = loader
+
+
+def task_name(input_path, path, row_group):
+    """
+    Name of a row group's output files and done marker
+
+    Built from the file's path relative to input_path and the row group index,
+    so it stays the same when files are added to or removed from the input.
+    """
+    relative = os.path.relpath(path, input_path) if os.path.isdir(input_path) else os.path.basename(path)
+    return f"{quote(relative.replace(os.sep, '/'), safe='')}-rg{row_group:05d}"
+
+
+def read_done(output_dir):
+    """Finished tasks of an output directory: task name -> model version that scored it"""
+    done_dir = os.path.join(output_dir, DONE_DIR)
+    if not os.path.isdir(done_dir):
+        return {}
+    done = {}
+    for name in os.listdir(done_dir):
+        with open(os.path.join(done_dir, name)) as f:
+            done[name] = f.read().strip()
+    return done
+
+
+def score_row_group(name, path, row_group, output_dir, columns=None):
+    """
+    Score one row group and write its rows, partitioned by appointment month
+
+    Returns:
+        (rows scored, seconds)
+    """
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    start = time.perf_counter()
+    raw = pq.ParquetFile(path).read_row_group(row_group).to_pandas()
+    scores = _worker_loader.score_noshow(_worker_loader.prepare_classifier_input(raw))
+
+    out = raw if columns is None else raw[columns]
+    out = out.assign(noshow_probability=scores['noshow_probability'], valid=scores['valid'],
+                     model_version=_worker_loader.version)
+    months = pd.to_datetime(raw['appointment_date_continuous']).dt.strftime('%Y-%m').fillna('unknown')
+
+    for month, part in out.groupby(months.to_numpy(), sort=True):
+        partition_dir = os.path.join(output_dir, f'{PARTITION_COL}={month}')
+        os.makedirs(partition_dir, exist_ok=True)
+        # Written under a temporary name and renamed, so readers never see a partial file
+        tmp_path = os.path.join(partition_dir, f'.{name}.parquet.tmp')
+        pq.write_table(pa.Table.from_pandas(part, preserve_index=False), tmp_path)
+        os.replace(tmp_path, os.path.join(partition_dir, f'{name}.parquet'))
+
+    with open(os.path.join(output_dir, DONE_DIR, name), 'w') as f:
+        f.write(str(_worker_loader.version))
+    return len(raw), time.perf_counter() - start
+
+
+def backfill(input_path, output_dir, models_dir='models',
+             encoders_path=os.path.join('data', 'processed', 'label_encoders.pkl'),
+             version=None, workers=None, columns=None, resume=True, progress=print):
+    """
+    Score every row of a Parquet file or directory with a pool of processes
+
+    Args:
+        input_path: Parquet file or directory in the raw appointment schema
+        output_dir: root of the partitioned output
+        models_dir, encoders_path: as for ModelLoader
+        version: model version (default: the active one)
+        workers: worker processes (default: one per CPU)
+        columns: input columns to carry into the output (default: all)
+        resume: skip row groups finished by an earlier run into output_dir;
+            refused when that run used a different model version
+        progress: called with a status line after each row group (None for silence)
+
+    Returns:
+        dict with rows, tasks, skipped, seconds, rows_per_s and model_version
+    """
+    loader = ModelLoader(models_dir, encoders_path)
+    if not loader.load_preprocessing():
+        raise ValueError(f"Could not load label encoders from {encoders_path}")
+
+    tasks = parquet_tasks(input_path)
+    done_dir = os.path.join(output_dir, DONE_DIR)
+    if resume:
+        done = read_done(output_dir)
+    else:
+        # Markers of the earlier run would otherwise block the next resume
+        shutil.rmtree(done_dir, ignore_errors=True)
+        done = {}
+    os.makedirs(done_dir, exist_ok=True)
+
+    rows = 0
+    start = time.perf_counter()
+    with tempfile.TemporaryDirectory(prefix='noshow-backfill-') as tmp:
+        model_path, model_version = _export_model(loader, version, tmp)
+        # Mixing two models' scores in one output would go unnoticed downstream
+        other_versions = sorted(set(done.values()) - {str(model_version)})
+        if other_versions:
+            raise ValueError(f"{output_dir} has row groups scored with model version(s) "
+                             f"{', '.join(other_versions)}, not {model_version}; rerun with "
+                             f"--no-resume to rescore everything or use a new output directory")
+        named = [(task_name(input_path, path, group), path, group) for path, group in tasks]
+        todo = [task for task in named if task[0] not in done]
+        workers = min(workers or os.cpu_count() or 1, max(len(todo), 1))
+
+        # Spawned rather than forked: the parent may run threads (metrics, model watcher)
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker,
+                                 initargs=(model_path,)) as pool:
+            futures = [pool.submit(score_row_group, name, path, group, output_dir, columns)
+                       for name, path, group in todo]
+            for i, future in enumerate(futures, 1):
+                task_rows, _ = future.result()
+                rows += task_rows
+                if progress:
+                    elapsed = time.perf_counter() - start
+                    progress(f"[{i}/{len(todo)}] {rows:,} rows, {rows / elapsed:,.0f} rows/s")
+
+    seconds = time.perf_counter() - start
+    return {
+        'rows': rows,
+        'tasks': len(todo),
+        'skipped': len(tasks) - len(todo),
+        'workers': workers,
+        'seconds': seconds,
+        'rows_per_s': rows / seconds if seconds else 0.0,
+        'model_version': model_version
+    }
+
+
+def add_arguments(parser):
+    """Backfill options, shared with the command-line entry point"""
+    parser.add_argument('input', help='Parquet file or directory in the raw appointment schema')
+    parser.add_argument('output', help='output directory (partitioned by appointment month)')
+    parser.add_argument('--models-dir', default='models')
+    parser.add_argument('--encoders', default=os.path.join('data', 'processed', 'label_encoders.pkl'))
+    parser.add_argument('--version', help='model version (default: the active one)')
+    parser.add_argument('--workers', type=int, help='worker processes (default: one per CPU)')
+    parser.add_argument('--columns', nargs='+', help='input columns to keep (default: all)')
+    parser.add_argument('--no-resume', action='store_true', help='rescore row groups finished earlier')
+
+
+def run(args):
+    summary = backfill(args.input, args.output, args.models_dir, args.encoders, args.version,
+                       args.workers, args.columns, resume=not args.no_resume)
+    print(f"Scored {summary['rows']:,} rows in {summary['tasks']} row groups "
+          f"({summary['skipped']} already done) with {summary['workers']} workers: "
+          f"{summary['seconds']:.1f}s, {summary['rows_per_s']:,.0f} rows/s, model {summary['model_version']}")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score large Parquet appointment files with a process pool")
+    add_arguments(parser)
+    args = parser.parse_args()
+    metrics.enable_from_env()
+    run(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,197 @@
+"""
+Calendar Feature Utilities
+Precomputed Brazilian / Santa Catarina holiday, bridge-day and school-term features by date
+
+The table covers TABLE_START..TABLE_END (widened on demand) with one int8 row
+per day, so the features of any dates are gathered with one array take on
+their day ordinals instead of per-date holiday lookups.
+"""
+
+import threading
+
+import numpy as np
+import pandas as pd
+
+COUNTRY = 'BR'
+SUBDIVISION = 'SC'
+
+TABLE_START = pd.Timestamp('2015-01-01')
+TABLE_END = pd.Timestamp('2035-12-31')
+
+# Distances to the nearest holiday are capped (int8 storage, and demand is
+# not affected weeks away from one)
+MAX_HOLIDAY_DISTANCE = 30
+
+# Santa Catarina state school terms (month-day ranges, inclusive): the school
+# year starts in early February and breaks for two weeks in July and from
+# mid-December. Individual years move by a few days.
+SCHOOL_TERMS = [('02-10', '07-09'), ('07-26', '12-17')]
+
+CALENDAR_FEATURES = [
+    'is_holiday',            # national public holiday
+    'is_state_holiday',      # Santa Catarina public holiday that is not national
+    'is_optional_holiday',   # ponto facultativo: Carnival, Ash Wednesday, Corpus Christi, 24/12, 31/12, ...
+    'is_bridge_day',         # Monday before a Tuesday holiday or Friday after a Thursday one
+    'is_school_term',
+    'days_to_holiday',       # days until the next holiday of any kind (0 on one)
+    'days_since_holiday'     # days since the previous holiday of any kind (0 on one)
+]
+
+# Date columns recognised when adding features to a frame
+DATE_COLUMNS = ('appointment_date', 'date', 'appointment_date_continuous')
+
+_table = None
+_table_lock = threading.Lock()
+
+
+def _days(dates):
+    """Day numbers (days since 1970-01-01) of dates"""
+    values = pd.to_datetime(pd.Series(dates) if not isinstance(dates, pd.Index) else dates)
+    return np.asarray(values, dtype='datetime64[D]').astype(np.int64)
+
+
+class CalendarTable:
+    """
+    Calendar features for a contiguous range of dates
+
+    values[i] holds CALENDAR_FEATURES of the day start + i; holiday names are
+    kept separately for display.
+    """
+
+    def __init__(self, start, values, names):
+        self.start = pd.Timestamp(start)
+        self.values = values
+        self.names = names
+        self._first_day = _days([self.start])[0]
+
+    @classmethod
+    def build(cls, start=TABLE_START, end=TABLE_END):
+        """Compute the table from the holidays package for start..end"""
+        import holidays
+
+        start, end = pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize()
+        # One extra year on each side so distances near the edges see the neighbouring holidays
+        years = range(start.year - 1, end.year + 2)
+        national = holidays.country_holidays(COUNTRY, years=years)
+        state = holidays.country_holidays(COUNTRY, subdiv=SUBDIVISION, years=years)
+        optional = holidays.country_holidays(COUNTRY, subdiv=SUBDIVISION, years=years, categories=('optional',))
+
+        days = pd.date_range(pd.Timestamp(years[0], 1, 1), pd.Timestamp(years[-1], 12, 31))
+        dates = days.date
+        is_national = np.array([d in national for d in dates])
+        is_state = np.array([d in state for d in dates]) & ~is_national
+        is_optional = np.array([d in optional for d in dates]) & ~is_national & ~is_state
+        closed = is_national | is_state | is_optional
+
+        weekday = days.dayofweek.to_numpy()
+        workday = (weekday < 5) & ~closed
+        holiday_next = np.append(closed[1:], False)
+        holiday_before = np.insert(closed[:-1], 0, False)
+        is_bridge = workday & (((weekday == 0) & holiday_next) | ((weekday == 4) & holiday_before))
+
+        month_day = days.strftime('%m-%d')
+        is_term = np.zeros(len(days), dtype=bool)
+        for first, last in SCHOOL_TERMS:
+            is_term |= (month_day >= first) & (month_day <= last)
+
+        position = np.arange(len(days))
+        holiday_positions = np.flatnonzero(closed)
+        following = np.searchsorted(holiday_positions, position, side='left')
+        preceding = np.searchsorted(holiday_positions, position, side='right') - 1
+        to_next = np.where(following < len(holiday_positions),
+                           holiday_positions[np.minimum(following, len(holiday_positions) - 1)] - position,
+                           MAX_HOLIDAY_DISTANCE)
+        since_last = np.where(preceding >= 0, position - holiday_positions[np.maximum(preceding, 0)],
+                              MAX_HOLIDAY_DISTANCE)
+
+        columns = {
+            'is_holiday': is_national, 'is_state_holiday': is_state, 'is_optional_holiday': is_optional,
+            'is_bridge_day': is_bridge, 'is_school_term': is_term,
+            'days_to_holiday': np.minimum(to_next, MAX_HOLIDAY_DISTANCE),
+            'days_since_holiday': np.minimum(since_last, MAX_HOLIDAY_DISTANCE)
+        }
+        keep = (days >= start) & (days <= end)
+        values = np.column_stack([columns[name][keep] for name in CALENDAR_FEATURES]).astype(np.int8)
+        names = {pd.Timestamp(d): name for calendar in (national, state, optional) for d, name in calendar.items()
+                 if start <= pd.Timestamp(d) <= end}
+        return cls(start, values, names)
+
+    @property
+    def end(self):
+        return self.start + pd.Timedelta(days=len(self.values) - 1)
+
+    def covers(self, dates):
+        days = _days(dates)
+        return not len(days) or (days.min() >= self._first_day and days.max() < self._first_day + len(self.values))
+
+    def take(self, dates):
+        """
+        Calendar features of dates
+
+        Args:
+            dates: dates within the table's range (any order, repeats allowed)
+
+        Returns:
+            DataFrame of CALENDAR_FEATURES, one row per date (indexed like
+            dates when it is a Series)
+        """
+        offsets = _days(dates) - self._first_day
+        if len(offsets) and (offsets.min() < 0 or offsets.max() >= len(self.values)):
+            raise ValueError(f"Dates outside the calendar table ({self.start.date()} to {self.end.date()})")
+        index = dates.index if isinstance(dates, pd.Series) else None
+        return pd.DataFrame(np.take(self.values, offsets, axis=0), columns=CALENDAR_FEATURES, index=index)
+
+    def holiday_name(self, date):
+        """Name of the holiday on date, or None"""
+        return self.names.get(pd.Timestamp(date).normalize())
+
+
+def calendar_table(dates=None):
+    """
+    Process-wide CalendarTable, built on first use
+
+    Args:
+        dates: optional dates that must be covered; the table is rebuilt
+            over a wider range when they fall outside it
+    """
+    global _table
+    with _table_lock:
+        if _table is None or (dates is not None and not _table.covers(dates)):
+            start, end = TABLE_START, TABLE_END
+            if _table is not None:
+                start, end = _table.start, _table.end
+            if dates is not None and len(dates):
+                days = pd.to_datetime(pd.Series(dates))
+                start, end = min(start, days.min().normalize()), max(end, days.max().normalize())
+            _table = CalendarTable.build(start, end)
+        return _table
+
+
+def calendar_features(dates):
+    """CALENDAR_FEATURES for dates (see CalendarTable.take)"""
+    return calendar_table(dates).take(dates)
+
+
+def add_calendar_features(df, columns=CALENDAR_FEATURES):
+    """
+    Add the calendar feature columns df is missing
+
+    Args:
+        df: DataFrame with a date column (DATE_COLUMNS) or a DatetimeIndex
+        columns: calendar features wanted
+
+    Returns:
+        df with the missing columns added (df itself when none are missing)
+    """
+    missing = [name for name in columns if name not in df.columns]
+    if not missing:
+        return df
+    date_col = next((col for col in DATE_COLUMNS if col in df.columns), None)
+    if date_col is not None:
+        dates = df[date_col]
+    elif isinstance(df.index, pd.DatetimeIndex):
+        dates = df.index
+    else:
+        raise ValueError(f"Calendar features {missing} need a date column ({', '.join(DATE_COLUMNS)})")
+    features = calendar_features(dates)
+    return df.assign(**{name: features[name].to_numpy() for name in missing})
@@ -0,0 +1,242 @@
+"""
+Command-line Interface
+Batch scoring, demand forecasting and backfills without the Streamlit app
+
+Usage:
+    python -m utils.cli score appointments.csv scores.parquet
+    python -m utils.cli forecast appointments.parquet forecast.csv
+    python -m utils.cli backfill history/ scores/ --workers 8
+
+Inputs and outputs are CSV or Parquet (chosen by extension). Every output row
+carries the model version; throughput is reported on stderr.
+"""
+
+import os
+import sys
+import time
+import argparse
+
+from utils import metrics
+from utils import backfill as backfill_module
+from utils.model_loader import DEFAULT_QUANTILES, ModelLoader, quantile_column
+
+DEFAULT_CHUNK_ROWS = 50_000
+
+PARQUET_EXTENSIONS = ('.parquet', '.pq')
+
+
+def read_chunks(path, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """DataFrames of at most chunk_rows rows from a CSV or Parquet file"""
+    import pandas as pd
+
+    if path.endswith(PARQUET_EXTENSIONS):
+        import pyarrow.parquet as pq
+
+        start = 0
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+            df = batch.to_pandas()
+            df.index = pd.RangeIndex(start, start + len(df))
+            start += len(df)
+            yield df
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_rows)
+
+
+class ChunkWriter:
+    """Appends DataFrames to one CSV or Parquet file"""
+
+    def __init__(self, path):
+        self.path = path
+        self.parquet = path.endswith(PARQUET_EXTENSIONS)
+        self.rows = 0
+        self._writer = None
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    def write(self, df):
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            if self._writer is None:
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                self._writer = pq.ParquetWriter(self.path, table.schema)
+            else:
+                table = pa.Table.from_pandas(df, schema=self._writer.schema, preserve_index=False)
+            self._writer.write_table(table)
+        else:
+            df.to_csv(self.path, mode='a' if self.rows else 'w', header=not self.rows, index=False)
+        self.rows += len(df)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+def report(action, rows, seconds, version):
+    print(f"{action} {rows:,} rows in {seconds:.2f}s ({rows / seconds if seconds else 0:,.0f} rows/s), "
+          f"model {version}", file=sys.stderr)
+
+
+def make_loader(args, classifier=False, forecaster=False):
+    """ModelLoader with the requested models loaded, or None after printing why not"""
+    loader = ModelLoader(args.models_dir, args.encoders)
+    if classifier and not (loader.load_classifier(args.version) and loader.load_preprocessing()):
+        return None
+    if classifier and os.path.exists(args.feature_store) and not loader.load_feature_store(args.feature_store):
+        return None
+    if os.path.exists(args.weather) and not loader.load_weather(args.weather):
+        return None
+    if forecaster and not loader.load_forecaster(args.version):
+        return None
+    return loader.pinned()
+
+
+def score(args):
+    """Score raw-schema appointments chunk by chunk, profiling them for drift if the model allows"""
+    from utils.drift import ARTIFACT_NAME, DriftMonitor
+
+    loader = make_loader(args, classifier=True)
+    if loader is None:
+        return 1
+    reference = loader._classifier_bundle.artifacts.get(ARTIFACT_NAME)
+    monitor = DriftMonitor(reference, loader.version) if reference is not None else None
+
+    start = time.perf_counter()
+    with ChunkWriter(args.output) as writer:
+        for raw in read_chunks(args.input, args.chunk_rows):
+            scores = loader.score_noshow(loader.prepare_classifier_input(raw))
+            if monitor is not None:
+                monitor.observe(raw, scores)
+            out = raw if args.columns is None else raw[args.columns]
+            writer.write(out.assign(noshow_probability=scores['noshow_probability'], valid=scores['valid'],
+                                    model_version=loader.version))
+            if args.verbose:
+                report("Scored", writer.rows, time.perf_counter() - start, loader.version)
+    report("Scored", writer.rows, time.perf_counter() - start, loader.version)
+
+    if monitor is not None:
+        drift = monitor.report()
+        for column, row in drift[drift['status'] != 'ok'].iterrows():
+            print(f"Drift {row['status']}: {column} PSI {row['psi']:.3f}, share {row['share']:.1%} "
+                  f"({row['detail']})", file=sys.stderr)
+        if args.drift_report:
+            drift.to_csv(args.drift_report, index_label='column')
+    elif args.drift_report:
+        print(f"Model {loader.version} has no drift reference (python -m utils.drift reference)",
+              file=sys.stderr)
+    return 0
+
+
+def forecast(args):
+    """
+    Forecast daily demand with prediction bounds
+
+    The input is either raw appointments (aggregated to a daily series first)
+    or a table that already has the forecaster's feature columns. Weather
+    missing from either is filled from the weather file, if there is one.
+    """
+    import pandas as pd
+    from utils.calendar_features import CALENDAR_FEATURES, add_calendar_features
+    from utils.preprocessing import WEATHER_COLS, build_daily_series
+
+    loader = make_loader(args, forecaster=True)
+    if loader is None:
+        return 1
+
+    start = time.perf_counter()
+    features = loader.forecaster_features
+    chunks = read_chunks(args.input, args.chunk_rows)
+    first = next(chunks)
+    if 'appointment_date_continuous' not in first.columns:
+        data = pd.concat([first, *chunks])
+    else:
+        # Raw appointments: only the date and weather columns are kept while reading
+        columns = ['appointment_date_continuous'] + [col for col in WEATHER_COLS if col in first.columns]
+        raw = pd.concat([chunk[columns] for chunk in (first, *chunks)])
+        if loader.weather is not None:
+            raw = loader.weather.fill_appointments(raw)
+        data = build_daily_series(raw)
+    if args.last:
+        data = data.iloc[-args.last:]
+    if loader.weather is not None:
+        # Forecast rows without weather get it in one range fetch
+        data = loader.weather.fill_daily(data)
+    data = add_calendar_features(data, [name for name in features if name in CALENDAR_FEATURES])
+    horizon = loader.forecast_horizon(data[features].ffill().fillna(0), quantiles=args.quantiles)
+
+    out = horizon.assign(model_version=loader.version)
+    for column in ('appointment_date', 'date'):
+        if column in data.columns:
+            out.insert(0, column, data[column])
+            break
+    out['predicted_appointments'] = out['predicted_appointments'].clip(lower=0)
+    for q in args.quantiles:
+        out[quantile_column(q)] = out[quantile_column(q)].clip(lower=0)
+
+    with ChunkWriter(args.output) as writer:
+        writer.write(out)
+    report("Forecast", len(out), time.perf_counter() - start, loader.version)
+    return 0
+
+
+def backfill(args):
+    backfill_module.run(args)
+    return 0
+
+
+def add_model_arguments(parser):
+    parser.add_argument('--models-dir', default='models')
+    parser.add_argument('--encoders', default=os.path.join('data', 'processed', 'label_encoders.pkl'))
+    parser.add_argument('--version', help='model version (default: the active one)')
+    parser.add_argument('--feature-store', default=os.path.join('data', 'feature_store.sqlite'),
+                        help='per-patient history store, joined on patient_id when present')
+    parser.add_argument('--weather', default=os.path.join('data', 'weather.csv'),
+                        help='daily weather file, used for rows without weather when present')
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m utils.cli', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    score_parser = commands.add_parser('score', help='no-show probability for raw-schema appointments')
+    score_parser.add_argument('input', help='CSV or Parquet appointments in the raw schema')
+    score_parser.add_argument('output', help='CSV or Parquet output')
+    add_model_arguments(score_parser)
+    score_parser.add_argument('--columns', nargs='+', help='input columns to keep (default: all)')
+    score_parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS)
+    score_parser.add_argument('--verbose', action='store_true', help='report progress after every chunk')
+    score_parser.add_argument('--drift-report', help='CSV of input drift against the training profile')
+    score_parser.set_defaults(run=score)
+
+    forecast_parser = commands.add_parser('forecast', help='daily demand with prediction bounds')
+    forecast_parser.add_argument('input', help='raw appointments, or rows with the forecaster features')
+    forecast_parser.add_argument('output', help='CSV or Parquet output')
+    add_model_arguments(forecast_parser)
+    forecast_parser.add_argument('--last', type=int, help='only forecast the last N days')
+    forecast_parser.add_argument('--quantiles', type=float, nargs='+', default=list(DEFAULT_QUANTILES))
+    forecast_parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS)
+    forecast_parser.set_defaults(run=forecast)
+
+    backfill_parser = commands.add_parser('backfill', help='process-pool scoring of large Parquet inputs')
+    backfill_module.add_arguments(backfill_parser)
+    backfill_parser.set_defaults(run=backfill)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    metrics.enable_from_env()
+    return args.run(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
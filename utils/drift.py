@@ -0,0 +1,441 @@
+"""
+Drift Utilities
+Constant-memory sketches of incoming appointments, compared against the model's training profile
+
+Usage:
+    python -m utils.drift reference data/raw/Medical_appointment_data.csv
+
+scores the training appointments with the active classifier and saves their
+profile with the model (as its 'drift_reference' artifact). Batch scoring then
+updates a live profile and reports drift against it.
+"""
+
+import os
+import argparse
+import threading
+
+import numpy as np
+import pandas as pd
+
+from utils import metrics
+
+# Raw-schema columns profiled for every scored batch
+NUMERIC_COLUMNS = ['age', 'appointment_time', 'average_temp_day', 'average_rain_day',
+                   'max_temp_day', 'max_rain_day']
+CATEGORICAL_COLUMNS = ['place', 'specialty', 'disability', 'gender', 'appointment_shift', 'SMS_received']
+PROBABILITY_COLUMN = 'noshow_probability'
+
+ARTIFACT_NAME = 'drift_reference'
+
+# Sketch sizes: per column this is a few tens of KB, however many rows are seen
+TDIGEST_COMPRESSION = 100
+HISTOGRAM_BINS = 10
+CMS_WIDTH = 1024
+CMS_DEPTH = 4
+HLL_PRECISION = 12
+TOP_K = 20
+
+# Population stability index and unseen/out-of-range row shares that raise a flag
+PSI_WARN, PSI_ALERT = 0.1, 0.25
+SHARE_WARN, SHARE_ALERT = 0.01, 0.05
+
+# Keeps empty histogram bins from making the PSI infinite
+PSI_EPS = 1e-4
+
+_HASH_KEY = 'noshow-drift-key'
+
+_monitors = {}
+_monitors_lock = threading.Lock()
+
+
+def _hash(values):
+    """64-bit hashes of category values (compared as strings)"""
+    return pd.util.hash_array(np.asarray(values, dtype=str).astype(object), hash_key=_HASH_KEY)
+
+
+def psi(expected, actual):
+    """Population stability index between two count vectors over the same bins"""
+    expected = np.asarray(expected, dtype=float)
+    actual = np.asarray(actual, dtype=float)
+    if expected.sum() == 0 or actual.sum() == 0:
+        return float('nan')
+    p = np.maximum(expected / expected.sum(), PSI_EPS)
+    q = np.maximum(actual / actual.sum(), PSI_EPS)
+    return float(np.sum((q - p) * np.log(q / p)))
+
+
+class TDigest:
+    """
+    Mergeable quantile sketch (t-digest with the arcsine scale function)
+
+    Batches are compressed into at most compression + 1 centroids, which are
+    small near the tails and large near the median, so extreme quantiles stay
+    accurate.
+    """
+
+    def __init__(self, compression=TDIGEST_COMPRESSION):
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.min = np.inf
+        self.max = -np.inf
+
+    @property
+    def count(self):
+        return float(self.weights.sum())
+
+    def update(self, values, weights=None):
+        values = np.asarray(values, dtype=float)
+        if weights is None:
+            # Appointment columns repeat a few values; each distinct one becomes one point
+            values, weights = np.unique(values[np.isfinite(values)], return_counts=True)
+        else:
+            weights = np.asarray(weights, dtype=float)
+            keep = np.isfinite(values)
+            values, weights = values[keep], weights[keep]
+        if not len(values):
+            return self
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        self._compress(np.concatenate([self.means, values]), np.concatenate([self.weights, weights]))
+        return self
+
+    def merge(self, other):
+        if other.count:
+            self.min, self.max = min(self.min, other.min), max(self.max, other.max)
+            self._compress(np.concatenate([self.means, other.means]),
+                           np.concatenate([self.weights, other.weights]))
+        return self
+
+    def _compress(self, means, weights):
+        order = np.argsort(means, kind='stable')
+        means, weights = means[order], weights[order]
+        cumulative = np.cumsum(weights)
+        q = (cumulative - weights / 2) / cumulative[-1]
+        k = self.compression * (np.arcsin(2 * q - 1) / np.pi + 0.5)
+        _, groups = np.unique(np.floor(k).astype(int), return_inverse=True)
+        self.weights = np.bincount(groups, weights)
+        self.means = np.bincount(groups, weights * means) / self.weights
+
+    def quantile(self, q):
+        if not self.count:
+            return np.full(np.shape(q), np.nan)
+        cumulative = np.cumsum(self.weights)
+        centers = (cumulative - self.weights / 2) / cumulative[-1]
+        return np.interp(q, np.r_[0.0, centers, 1.0], np.r_[self.min, self.means, self.max])
+
+
+class CountMinSketch:
+    """Approximate counts per category; estimates never undercount"""
+
+    def __init__(self, width=CMS_WIDTH, depth=CMS_DEPTH):
+        self.width = width
+        self.table = np.zeros((depth, width), dtype=np.int64)
+
+    def _columns(self, hashes):
+        # Double hashing: row i uses h1 + i * h2
+        h1 = (hashes & 0xFFFFFFFF).astype(np.int64)
+        h2 = (hashes >> np.uint64(32)).astype(np.int64) | 1
+        rows = np.arange(len(self.table))[:, None]
+        return (h1[None, :] + rows * h2[None, :]) % self.width
+
+    def update(self, hashes, counts):
+        columns = self._columns(hashes)
+        for row, cols in enumerate(columns):
+            self.table[row] += np.bincount(cols, counts, minlength=self.width).astype(np.int64)
+        return self
+
+    def estimate(self, hashes):
+        columns = self._columns(hashes)
+        return np.min([self.table[row, cols] for row, cols in enumerate(columns)], axis=0)
+
+
+class HyperLogLog:
+    """Approximate number of distinct categories (about 1.6% error at precision 12)"""
+
+    def __init__(self, precision=HLL_PRECISION):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def update(self, hashes):
+        suffix_bits = 64 - self.precision
+        index = (hashes >> np.uint64(suffix_bits)).astype(np.int64)
+        suffix = (hashes & np.uint64((1 << suffix_bits) - 1)).astype(float)
+        # frexp's exponent is the bit length (exact: the suffix fits a float's mantissa)
+        rank = (suffix_bits - np.frexp(suffix)[1] + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+        return self
+
+    def union(self, other):
+        merged = HyperLogLog(self.precision)
+        merged.registers = np.maximum(self.registers, other.registers)
+        return merged
+
+    def count(self):
+        m = len(self.registers)
+        estimate = 0.7213 / (1 + 1.079 / m) * m * m / np.sum(2.0 ** -self.registers.astype(float))
+        zeros = int(np.sum(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            # Small-range correction (linear counting)
+            estimate = m * np.log(m / zeros)
+        return float(estimate)
+
+
+class NumericSketch:
+    """Histogram on the reference deciles, range checks and a t-digest for one numeric column"""
+
+    def __init__(self, edges, low, high):
+        self.edges = np.asarray(edges, dtype=float)
+        self.low = low
+        self.high = high
+        self.counts = np.zeros(len(self.edges) + 1, dtype=np.int64)
+        self.below = 0
+        self.above = 0
+        self.digest = TDigest()
+
+    @classmethod
+    def fit(cls, values):
+        values = np.asarray(values, dtype=float)
+        values = values[np.isfinite(values)]
+        quantiles = np.linspace(0, 1, HISTOGRAM_BINS + 1)[1:-1]
+        edges = np.unique(np.quantile(values, quantiles)) if len(values) else np.empty(0)
+        sketch = cls(edges, values.min() if len(values) else np.nan, values.max() if len(values) else np.nan)
+        return sketch.update(values)
+
+    def empty(self):
+        return NumericSketch(self.edges, self.low, self.high)
+
+    @property
+    def rows(self):
+        return int(self.counts.sum())
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[np.isfinite(values)]
+        values, counts = np.unique(values, return_counts=True)
+        self.counts += np.bincount(np.searchsorted(self.edges, values, side='right'), counts,
+                                   minlength=len(self.counts)).astype(np.int64)
+        self.below += int(counts[values < self.low].sum())
+        self.above += int(counts[values > self.high].sum())
+        self.digest.update(values, counts)
+        return self
+
+    def compare(self, reference):
+        p50, ref_p50 = self.digest.quantile(0.5), reference.digest.quantile(0.5)
+        return {
+            'psi': psi(reference.counts, self.counts),
+            'share': (self.below + self.above) / self.rows if self.rows else float('nan'),
+            'detail': f"p50 {p50:.3g} (ref {ref_p50:.3g}), range {self.digest.min:.3g}-{self.digest.max:.3g} "
+                      f"(ref {reference.low:.3g}-{reference.high:.3g})"
+        }
+
+
+class CategoricalSketch:
+    """Count-min counts, distinct-value HyperLogLog and unseen-row count for one categorical column"""
+
+    def __init__(self, top=None):
+        # Most frequent reference categories and their exact counts (reference only)
+        self.top = top or {}
+        self.cms = CountMinSketch()
+        self.hll = HyperLogLog()
+        self.rows = 0
+        self.unseen = 0
+
+    @classmethod
+    def fit(cls, values):
+        counts = pd.Series(values).value_counts()
+        sketch = cls(top=counts.head(TOP_K).to_dict())
+        hashes = _hash(counts.index)
+        sketch.cms.update(hashes, counts.to_numpy())
+        sketch.hll.update(hashes)
+        sketch.rows = int(counts.sum())
+        return sketch
+
+    def empty(self):
+        return CategoricalSketch(top=self.top)
+
+    def update(self, values, reference=None):
+        counts = pd.Series(values).value_counts()
+        hashes = _hash(counts.index)
+        self.cms.update(hashes, counts.to_numpy())
+        self.hll.update(hashes)
+        self.rows += int(counts.sum())
+        if reference is not None:
+            # A count-min estimate of 0 means the reference certainly never saw the value
+            self.unseen += int(counts.to_numpy()[reference.cms.estimate(hashes) == 0].sum())
+        return self
+
+    def compare(self, reference):
+        top = list(reference.top)
+        live_top = self.cms.estimate(_hash(top)) if top else np.empty(0)
+        live = np.r_[live_top, max(self.rows - live_top.sum(), 0)]
+        expected = np.r_[list(reference.top.values()), reference.rows - sum(reference.top.values())]
+        new_values = max(reference.hll.union(self.hll).count() - reference.hll.count(), 0)
+        return {
+            'psi': psi(expected, live),
+            'share': self.unseen / self.rows if self.rows else float('nan'),
+            'detail': f"~{self.hll.count():,.0f} distinct, ~{new_values:,.0f} not in reference"
+        }
+
+
+class DriftProfile:
+    """
+    Sketches of the monitored raw columns and of the predicted probabilities
+
+    A reference profile is fitted once on the training appointments and saved
+    with the model; live profiles start empty from it (spawn) and are updated
+    batch by batch. Memory does not grow with the number of rows seen.
+    """
+
+    def __init__(self, sketches, reference=None):
+        self.sketches = sketches
+        self.reference = reference
+
+    @classmethod
+    def fit(cls, raw_data, probabilities=None):
+        sketches = {col: NumericSketch.fit(raw_data[col]) for col in NUMERIC_COLUMNS if col in raw_data}
+        sketches.update({col: CategoricalSketch.fit(raw_data[col])
+                         for col in CATEGORICAL_COLUMNS if col in raw_data})
+        if probabilities is not None:
+            sketches[PROBABILITY_COLUMN] = NumericSketch.fit(probabilities)
+        return cls(sketches)
+
+    def spawn(self):
+        """Empty live profile to be compared against this one"""
+        return DriftProfile({col: sketch.empty() for col, sketch in self.sketches.items()}, reference=self)
+
+    def update(self, raw_data, probabilities=None):
+        for col, sketch in self.sketches.items():
+            if col == PROBABILITY_COLUMN:
+                if probabilities is not None:
+                    sketch.update(probabilities)
+            elif col in raw_data:
+                if isinstance(sketch, CategoricalSketch):
+                    sketch.update(raw_data[col], self.reference.sketches[col] if self.reference else None)
+                else:
+                    sketch.update(pd.to_numeric(raw_data[col], errors='coerce'))
+        return self
+
+    def report(self):
+        """
+        Drift of each column against the reference profile
+
+        Returns:
+            DataFrame indexed by column with rows seen, psi, share (rows with
+            unseen categories, or outside the reference range), status
+            ('ok', 'warn', 'alert') and a readable detail
+        """
+        if self.reference is None:
+            raise ValueError("Not a live profile: create it with reference.spawn()")
+        rows = {}
+        for col, sketch in self.sketches.items():
+            if not sketch.rows:
+                continue
+            row = sketch.compare(self.reference.sketches[col])
+            if row['psi'] >= PSI_ALERT or row['share'] >= SHARE_ALERT:
+                status = 'alert'
+            elif row['psi'] >= PSI_WARN or row['share'] >= SHARE_WARN:
+                status = 'warn'
+            else:
+                status = 'ok'
+            rows[col] = {'rows': sketch.rows, 'psi': row['psi'], 'share': row['share'], 'status': status,
+                         'detail': row['detail']}
+        return pd.DataFrame.from_dict(rows, orient='index',
+                                      columns=['rows', 'psi', 'share', 'status', 'detail'])
+
+
+class DriftMonitor:
+    """Thread-safe live profile for one model version"""
+
+    def __init__(self, reference, version=None):
+        self.version = version
+        self.profile = reference.spawn()
+        self._lock = threading.Lock()
+
+    def observe(self, raw_data, scores=None):
+        """Add a scored batch (scores: score_noshow output, probabilities of valid rows are profiled)"""
+        probabilities = None
+        if scores is not None:
+            probabilities = scores['noshow_probability'].to_numpy()[scores['valid'].to_numpy()]
+        with self._lock:
+            self.profile.update(raw_data, probabilities)
+
+    def report(self):
+        with self._lock:
+            report = self.profile.report()
+        for col, row in report.iterrows():
+            metrics.set_gauge('input_drift', row['psi'], column=col, measure='psi')
+            metrics.set_gauge('input_drift', row['share'], column=col, measure='share')
+        return report
+
+
+def drift_monitor(loader):
+    """
+    Process-wide DriftMonitor for the loader's active classifier
+
+    Returns None if the model has no drift reference. A new model version
+    starts a fresh live profile.
+    """
+    bundle = loader._classifier_bundle
+    reference = bundle.artifacts.get(ARTIFACT_NAME) if bundle else None
+    if reference is None:
+        return None
+    with _monitors_lock:
+        monitor = _monitors.get(loader.models_dir)
+        if monitor is None or monitor.version != bundle.version:
+            monitor = _monitors[loader.models_dir] = DriftMonitor(reference, bundle.version)
+        return monitor
+
+
+def save_reference(loader, reference):
+    """
+    Save a reference profile with the loader's active classifier
+
+    Notebook files get models/drift_reference.joblib; a versioned model is
+    republished as a new version with the profile among its artifacts (and
+    activated if it was the active one).
+
+    Returns:
+        the version serving the reference
+    """
+    import joblib
+    from utils.model_loader import CLASSIFIER_ARTIFACTS, current_version, publish_version
+
+    bundle = loader._classifier_bundle
+    if bundle.version == 'legacy':
+        joblib.dump(reference, os.path.join(loader.models_dir, CLASSIFIER_ARTIFACTS[ARTIFACT_NAME]))
+        return bundle.version
+    return publish_version(loader.models_dir, classifier={
+        'model': bundle.model, 'features': bundle.features, 'metadata': bundle.metadata,
+        'artifacts': {**bundle.artifacts, ARTIFACT_NAME: reference}
+    }, activate=bundle.version == current_version(loader.models_dir))
+
+
+def main():
+    from utils.model_loader import ModelLoader
+
+    parser = argparse.ArgumentParser(description="Save the training data's drift reference with the model")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    reference_parser = commands.add_parser('reference', help='profile training appointments and save it')
+    reference_parser.add_argument('input', help='CSV or Parquet appointments in the raw schema')
+    reference_parser.add_argument('--models-dir', default='models')
+    reference_parser.add_argument('--encoders', default=os.path.join('data', 'processed', 'label_encoders.pkl'))
+    args = parser.parse_args()
+
+    loader = ModelLoader(args.models_dir, args.encoders)
+    if not (loader.load_classifier() and loader.load_preprocessing()):
+        raise SystemExit(1)
+    raw = pd.read_parquet(args.input) if args.input.endswith(('.parquet', '.pq')) else pd.read_csv(args.input)
+    scores = loader.score_noshow(loader.prepare_classifier_input(raw))
+
+    # Built through the package module, so the pickled profile refers to utils.drift
+    from utils import drift
+
+    reference = drift.DriftProfile.fit(raw, scores['noshow_probability'][scores['valid']])
+    version = drift.save_reference(loader, reference)
+    print(f"Saved drift reference for {len(raw):,} appointments with model {version}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+Model Explanation Utilities
+Per-prediction feature contributions from random-forest decision paths
+"""
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+
+class TreeExplainer:
+    """
+    Saabas-style feature contributions for a forest of decision trees
+
+    Every node's change in no-show probability relative to its parent is
+    credited to the feature its parent split on. The credits are stored once
+    per model as a sparse (all nodes x features) matrix, so explaining a batch
+    is a single decision_path() call and one sparse matrix product across all
+    rows and trees:
+
+        predict_proba[:, 1] == bias + contributions.sum(axis=1)
+    """
+
+    def __init__(self, model, feature_names, positive_class=1):
+        if not hasattr(model, 'estimators_') or not hasattr(model, 'decision_path'):
+            raise ValueError(f"{type(model).__name__} is not a supported tree ensemble")
+
+        self.model = model
+        self.feature_names = list(feature_names)
+        self.class_index = list(model.classes_).index(positive_class)
+        self.bias, self._node_credits = self._compile()
+
+    def _compile(self):
+        """Per-node probability deltas keyed by the parent's split feature"""
+        trees = [estimator.tree_ for estimator in self.model.estimators_]
+        n_trees = len(trees)
+
+        rows, cols, values = [], [], []
+        bias = 0.0
+        offset = 0
+        for tree in trees:
+            value = tree.value[:, 0, :]
+            proba = value[:, self.class_index] / value.sum(axis=1)
+            bias += proba[0]
+
+            internal = np.flatnonzero(tree.children_left >= 0)
+            for children in (tree.children_left[internal], tree.children_right[internal]):
+                rows.append(offset + children)
+                cols.append(tree.feature[internal])
+                values.append((proba[children] - proba[internal]) / n_trees)
+            offset += tree.node_count
+
+        credits = sparse.csr_matrix(
+            (np.concatenate(values), (np.concatenate(rows), np.concatenate(cols))),
+            shape=(offset, len(self.feature_names))
+        )
+        return bias / n_trees, credits
+
+    def contributions(self, X):
+        """
+        Feature contributions to the positive-class probability
+
+        Args:
+            X: DataFrame aligned to feature_names
+
+        Returns:
+            DataFrame (rows of X x features) of probability contributions
+        """
+        paths, _ = self.model.decision_path(X)
+        contributions = (paths @ self._node_credits).toarray()
+        index = X.index if isinstance(X, pd.DataFrame) else None
+        return pd.DataFrame(contributions, index=index, columns=self.feature_names)
+
+    def top_drivers(self, X, top_k=5):
+        """
+        Strongest contributions per row, ready to display or export
+
+        Args:
+            X: DataFrame aligned to feature_names
+            top_k: number of drivers per row
+
+        Returns:
+            DataFrame with the predicted probability, the bias, and
+            driver_i / contribution_i / value_i columns for i = 1..top_k
+        """
+        contributions = self.contributions(X)
+        values = contributions.to_numpy()
+        top_k = min(top_k, values.shape[1])
+
+        order = np.argsort(-np.abs(values), axis=1)[:, :top_k]
+        names = np.asarray(self.feature_names)[order]
+        top_values = np.take_along_axis(values, order, axis=1)
+        feature_values = np.take_along_axis(np.asarray(X, dtype=float), order, axis=1)
+
+        result = pd.DataFrame({
+            'noshow_probability': self.bias + values.sum(axis=1),
+            'bias': self.bias
+        }, index=contributions.index)
+        for i in range(top_k):
+            result[f'driver_{i + 1}'] = names[:, i]
+            result[f'contribution_{i + 1}'] = top_values[:, i]
+            result[f'value_{i + 1}'] = feature_values[:, i]
+        return result
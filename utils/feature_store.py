@@ -0,0 +1,240 @@
+"""
+Feature Store Utilities
+Per-patient history aggregates in SQLite with an in-memory LRU, for bulk joins at scoring time
+
+Usage:
+    python -m utils.feature_store update outcomes.csv [--store data/feature_store.sqlite]
+
+adds resolved appointments (raw schema plus patient_id and no_show) to the
+per-patient, per-day visit and no-show counts.
+"""
+
+import os
+import sqlite3
+import argparse
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from utils.preprocessing import PATIENT_ID_COL
+
+DEFAULT_STORE_PATH = os.path.join('data', 'feature_store.sqlite')
+
+# Patients kept in memory; batches usually repeat the same regular patients
+DEFAULT_CACHE_SIZE = 50_000
+
+# Bound parameters per SELECT ... IN (...) (SQLite's historical limit is 999)
+LOOKUP_CHUNK = 900
+
+EPOCH = pd.Timestamp('1970-01-01')
+
+# Aggregates returned per appointment; last_visit is the latest visit day before it
+AGGREGATES = ['visits', 'noshows', 'last_visit']
+
+# Resolved appointments per patient and day, so history can be counted as of any date
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS patient_visits (
+    patient_id TEXT NOT NULL,
+    day INTEGER NOT NULL,
+    visits INTEGER NOT NULL,
+    noshows INTEGER NOT NULL,
+    PRIMARY KEY (patient_id, day)
+) WITHOUT ROWID
+"""
+
+UPSERT = """
+INSERT INTO patient_visits (patient_id, day, visits, noshows) VALUES (?, ?, ?, ?)
+ON CONFLICT (patient_id, day) DO UPDATE SET
+    visits = visits + excluded.visits,
+    noshows = noshows + excluded.noshows
+"""
+
+# Stores written before visits were kept per day hold one total per patient.
+# The totals are moved to the patient's last visit day, so they only count for
+# appointments after it.
+LEGACY_TABLE = 'patient_history'
+MIGRATE = f"""
+INSERT OR IGNORE INTO patient_visits (patient_id, day, visits, noshows)
+SELECT patient_id, last_visit, visits, noshows FROM {LEGACY_TABLE} WHERE last_visit IS NOT NULL
+"""
+
+# Patients with no resolved appointment yet: (days, visits, noshows) arrays
+EMPTY = (np.empty(0, dtype=np.int64),) * 3
+
+# Key of a (patient position, day) pair, for one sorted search over a batch
+DAY_SPAN = 1 << 32
+DAY_OFFSET = 1 << 31
+
+
+class PatientFeatureStore:
+    """
+    Keyed store of per-patient, per-day visit and no-show counts
+
+    Reads go through an LRU of recently seen patients (unknown patients are
+    cached too), so a batch costs one dictionary lookup per cached patient and
+    one SELECT per LOOKUP_CHUNK missing ones. Aggregates are counted as of
+    each appointment's date, so rescoring or backtesting past appointments
+    does not see their own or later outcomes. Safe to share between threads.
+    """
+
+    def __init__(self, path=DEFAULT_STORE_PATH, cache_size=DEFAULT_CACHE_SIZE):
+        self.path = path
+        self.cache_size = cache_size
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        with self._db:
+            self._db.execute(SCHEMA)
+            legacy = self._db.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                                      (LEGACY_TABLE,)).fetchone()
+            if legacy:
+                self._db.execute(MIGRATE)
+                self._db.execute(f'DROP TABLE {LEGACY_TABLE}')
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, patient_ids, before=None):
+        """
+        Aggregates for a batch of patients
+
+        Args:
+            patient_ids: sequence of patient ids (compared as strings)
+            before: optional dates, one per patient id; only visits on
+                earlier days are counted (all visits for a missing date)
+
+        Returns:
+            DataFrame in the order of patient_ids with visits, noshows and
+            last_visit (Timestamp, NaT if the patient has no history)
+        """
+        keys = pd.Series(patient_ids, dtype=object).astype(str).to_numpy()
+        uniques, inverse = np.unique(keys, return_inverse=True)
+        rows = {}
+        with self._lock:
+            missing = []
+            for key in uniques:
+                row = self._cache.get(key)
+                if row is None:
+                    missing.append(key)
+                else:
+                    self._cache.move_to_end(key)
+                    rows[key] = row
+            self.hits += len(uniques) - len(missing)
+            self.misses += len(missing)
+
+            for start in range(0, len(missing), LOOKUP_CHUNK):
+                chunk = missing[start:start + LOOKUP_CHUNK]
+                query = (f"SELECT patient_id, day, visits, noshows FROM patient_visits "
+                         f"WHERE patient_id IN ({','.join('?' * len(chunk))}) ORDER BY patient_id, day")
+                found = {}
+                for key, day, visits, noshows in self._db.execute(query, chunk):
+                    found.setdefault(key, []).append((day, visits, noshows))
+                for key in chunk:
+                    visits = found.get(key)
+                    rows[key] = EMPTY if visits is None else tuple(np.array(column, dtype=np.int64)
+                                                                   for column in zip(*visits))
+                    self._remember(key, rows[key])
+
+        # The batch's visit days, patient by patient, with running totals
+        per_patient = [rows[key] for key in uniques]
+        lengths = np.array([len(days) for days, _, _ in per_patient], dtype=np.int64)
+        starts = np.concatenate([[0], np.cumsum(lengths)])
+        days = np.concatenate([days for days, _, _ in per_patient])
+        visits = np.concatenate([[0], np.cumsum(np.concatenate([v for _, v, _ in per_patient]))])
+        noshows = np.concatenate([[0], np.cumsum(np.concatenate([n for _, _, n in per_patient]))])
+
+        first, ends = starts[inverse], starts[inverse + 1]
+        if before is not None:
+            cutoff = np.asarray(pd.to_datetime(pd.Series(before)).to_numpy(), dtype='datetime64[D]')
+            dated = ~np.isnat(cutoff)
+            visit_keys = np.repeat(np.arange(len(uniques), dtype=np.int64), lengths) * DAY_SPAN + days + DAY_OFFSET
+            row_keys = inverse.astype(np.int64) * DAY_SPAN + cutoff.astype(np.int64) + DAY_OFFSET
+            ends = np.where(dated, np.searchsorted(visit_keys, row_keys, side='left'), ends)
+
+        has_history = ends > first
+        last_visit = np.full(len(keys), np.nan)
+        last_visit[has_history] = days[ends[has_history] - 1]
+        history = pd.DataFrame({'visits': visits[ends] - visits[first],
+                                'noshows': noshows[ends] - noshows[first],
+                                'last_visit': last_visit})
+        history['last_visit'] = EPOCH + pd.to_timedelta(history['last_visit'], unit='D')
+        return history
+
+    def _remember(self, key, row):
+        self._cache[key] = row
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def update(self, outcomes):
+        """
+        Add resolved appointments to their patients' daily counts
+
+        Args:
+            outcomes: DataFrame with patient_id, appointment_date_continuous and
+                no_show ('yes'/'no'); rows without a patient, date or outcome
+                are skipped. Each appointment must be added once: the store
+                keeps counts, not appointment ids.
+
+        Returns:
+            number of patients updated
+        """
+        dates = pd.to_datetime(outcomes['appointment_date_continuous'])
+        resolved = (outcomes[PATIENT_ID_COL].notna() & outcomes['no_show'].isin(['yes', 'no'])
+                    & dates.notna()).to_numpy()
+        per_day = pd.DataFrame({
+            'patient_id': outcomes[PATIENT_ID_COL][resolved].astype(str).to_numpy(),
+            'day': (dates[resolved] - EPOCH).dt.days.to_numpy(),
+            'visits': 1,
+            'noshows': (outcomes['no_show'][resolved] == 'yes').astype(int).to_numpy()
+        }).groupby(['patient_id', 'day']).sum()
+        params = [(key, int(day), int(visits), int(noshows))
+                  for (key, day), visits, noshows in per_day.itertuples()]
+        patients = per_day.index.unique(level='patient_id')
+
+        with self._lock:
+            with self._db:
+                self._db.executemany(UPSERT, params)
+            # Cached visits of these patients are now stale
+            for key in patients:
+                self._cache.pop(key, None)
+        return len(patients)
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute('SELECT count(DISTINCT patient_id) FROM patient_visits').fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the per-patient history feature store")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    update_parser = commands.add_parser('update', help='add resolved appointments to the store')
+    update_parser.add_argument('input', help='CSV or Parquet file, or a Parquet outcome store directory')
+    update_parser.add_argument('--store', default=DEFAULT_STORE_PATH)
+    args = parser.parse_args()
+
+    if os.path.isdir(args.input) or args.input.endswith(('.parquet', '.pq')):
+        outcomes = pd.read_parquet(args.input)
+    else:
+        outcomes = pd.read_csv(args.input)
+    if PATIENT_ID_COL not in outcomes:
+        print(f"Error updating feature store: {args.input} has no {PATIENT_ID_COL} column")
+        raise SystemExit(1)
+
+    store = PatientFeatureStore(args.store)
+    patients = store.update(outcomes)
+    print(f"Updated {patients:,} patients from {len(outcomes):,} appointments; "
+          f"{len(store):,} patients in {args.store}")
+    store.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,259 @@
+"""
+Job Utilities
+Shared background pool for long-running scoring and forecasting jobs
+"""
+
+import os
+import time
+import uuid
+import threading
+from collections import OrderedDict, deque
+
+# Worker threads shared by every session in the process
+WORKERS_ENV = 'JOB_WORKERS'
+DEFAULT_WORKERS = 2
+
+# Rows per work item; a job's partial results grow by one chunk at a time
+DEFAULT_CHUNK_ROWS = 5_000
+
+# Finished jobs are kept this long (seconds) so pages can still show them
+FINISHED_TTL = 3600
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = 'queued', 'running', 'done', 'failed', 'cancelled'
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+class Job:
+    """
+    One submitted job: a list of chunks processed by the same function
+
+    Chunk results are kept in chunk order; partial() combines the ones
+    finished so far. lock is the manager's lock, which workers hold while
+    recording a chunk's result.
+    """
+
+    def __init__(self, fn, chunks, owner, combine, label, lock=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.owner = owner
+        self.label = label
+        self.fn = fn
+        self.combine = combine
+        self.total = len(chunks)
+        self.state = QUEUED
+        self.error = None
+        self.submitted_at = time.time()
+        self.finished_at = None
+        self._pending = deque(enumerate(chunks))
+        self._results = {}
+        self._running = 0
+        self._lock = lock or threading.Lock()
+
+    @property
+    def completed(self):
+        return len(self._results)
+
+    @property
+    def progress(self):
+        """Fraction of chunks finished (0-1)"""
+        return self.completed / self.total if self.total else 1.0
+
+    @property
+    def finished(self):
+        return self.state in (DONE, FAILED, CANCELLED)
+
+    def partial(self):
+        """Combined results of the chunks finished so far (None before the first)"""
+        # Snapshot under the workers' lock; combining can be slow, so it runs outside
+        with self._lock:
+            results = [self._results[i] for i in sorted(self._results)]
+        if not results:
+            return None
+        return self.combine(results)
+
+    def result(self):
+        """Combined results of all chunks; raises if the job did not complete"""
+        if self.state != DONE:
+            raise RuntimeError(f"Job {self.id} is {self.state}" + (f": {self.error}" if self.error else ''))
+        return self.partial()
+
+
+class JobManager:
+    """
+    Fixed pool of worker threads shared fairly between owners
+
+    Jobs are split into chunks up front. Workers take one chunk at a time,
+    rotating over owners (e.g. Streamlit sessions) and, within an owner,
+    over its jobs in submission order, so a large job from one user cannot
+    hold the pool while another user's small job waits.
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS):
+        self.workers = workers
+        self._jobs = {}
+        self._owners = OrderedDict()
+        self._cond = threading.Condition()
+        for i in range(workers):
+            threading.Thread(target=self._work, name=f'job-worker-{i}', daemon=True).start()
+
+    def submit(self, fn, chunks, owner=None, combine=None, label=''):
+        """
+        Queue a job
+
+        Args:
+            fn: function applied to each chunk
+            chunks: list of chunk inputs
+            owner: key the pool is shared fairly between (e.g. a session id)
+            combine: function turning the list of chunk results into one
+                result (default: the list itself)
+            label: short description shown with the job
+
+        Returns:
+            Job (look it up again later with get(job.id))
+        """
+        job = Job(fn, list(chunks), owner, combine or list, label, lock=self._cond)
+        with self._cond:
+            self._purge()
+            self._jobs[job.id] = job
+            if job.total:
+                self._owners.setdefault(owner, deque()).append(job)
+            else:
+                job.state, job.finished_at = DONE, time.time()
+            self._cond.notify_all()
+        return job
+
+    def get(self, job_id):
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    def jobs(self, owner=None):
+        """Jobs of one owner (all jobs if owner is None), oldest first"""
+        with self._cond:
+            return [job for job in self._jobs.values() if owner is None or job.owner == owner]
+
+    def cancel(self, job_id):
+        """Drop a job's remaining chunks; chunks already running still finish"""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None or job.finished:
+                return False
+            job._pending.clear()
+            self._finish(job, CANCELLED)
+            return True
+
+    def _next_chunk(self):
+        """Round-robin over owners, then over the owner's jobs; call with the lock held"""
+        while self._owners:
+            owner, queue = next(iter(self._owners.items()))
+            self._owners.move_to_end(owner)
+            while queue and not queue[0]._pending:
+                queue.popleft()
+            if not queue:
+                del self._owners[owner]
+                continue
+            job = queue.popleft()
+            index, chunk = job._pending.popleft()
+            if job._pending:
+                queue.append(job)
+            job.state = RUNNING
+            job._running += 1
+            return job, index, chunk
+        return None
+
+    def _work(self):
+        while True:
+            with self._cond:
+                item = self._next_chunk()
+                while item is None:
+                    self._cond.wait()
+                    item = self._next_chunk()
+            job, index, chunk = item
+
+            try:
+                result, error = job.fn(chunk), None
+            except Exception as e:
+                result, error = None, e
+
+            with self._cond:
+                job._running -= 1
+                if error is not None:
+                    if not job.finished:
+                        print(f"Error in job {job.id}: {error}")
+                        job._pending.clear()
+                        job.error = str(error)
+                        self._finish(job, FAILED)
+                elif job.state != CANCELLED:
+                    job._results[index] = result
+                    if job.completed == job.total:
+                        self._finish(job, DONE)
+
+    def _finish(self, job, state):
+        job.state = state
+        job.finished_at = time.time()
+
+    def _purge(self):
+        cutoff = time.time() - FINISHED_TTL
+        for job_id in [j.id for j in self._jobs.values() if j.finished and j.finished_at < cutoff]:
+            del self._jobs[job_id]
+
+
+def job_manager():
+    """Process-wide JobManager (JOB_WORKERS threads, default 2)"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = JobManager(int(os.environ.get(WORKERS_ENV, DEFAULT_WORKERS)))
+        return _manager
+
+
+def split_rows(df, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Consecutive row slices of df with at most chunk_rows rows each"""
+    return [df.iloc[start:start + chunk_rows] for start in range(0, len(df), chunk_rows)]
+
+
+def concat_frames(frames):
+    import pandas as pd
+
+    return pd.concat(frames)
+
+
+def submit_scoring(loader, raw_data, owner=None, chunk_rows=DEFAULT_CHUNK_ROWS, manager=None):
+    """
+    Score raw-schema appointments in the background, chunk by chunk
+
+    All chunks use the model version active at submission, even if a new
+    version is swapped in while the job runs. If the model has a drift
+    reference, every chunk also updates the process-wide drift monitor.
+
+    Returns:
+        Job whose results are DataFrames of noshow_probability and valid,
+        indexed like raw_data
+    """
+    from utils.drift import drift_monitor
+
+    pinned = loader.pinned()
+    monitor = drift_monitor(pinned)
+
+    def score(chunk):
+        scores = pinned.score_noshow(pinned.prepare_classifier_input(chunk))
+        if monitor is not None:
+            monitor.observe(chunk, scores)
+        return scores
+
+    return (manager or job_manager()).submit(score, split_rows(raw_data, chunk_rows), owner=owner,
+                                             combine=concat_frames,
+                                             label=f"Scoring {len(raw_data):,} appointments")
+
+
+def submit_forecast(loader, features, owner=None, chunk_rows=DEFAULT_CHUNK_ROWS, manager=None):
+    """
+    Forecast a horizon in the background, chunk by chunk
+
+    Returns:
+        Job whose results are forecast_horizon DataFrames indexed like features
+    """
+    pinned = loader.pinned()
+    return (manager or job_manager()).submit(pinned.forecast_horizon, split_rows(features, chunk_rows),
+                                             owner=owner, combine=concat_frames,
+                                             label=f"Forecasting {len(features):,} days")
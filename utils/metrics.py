@@ -0,0 +1,180 @@
+"""
+Metrics Utilities
+Opt-in Prometheus instrumentation for model loading and inference
+"""
+
+import os
+import time
+import threading
+
+# Environment switches: an HTTP endpoint, a node_exporter textfile, or both
+PORT_ENV = 'METRICS_PORT'
+TEXTFILE_ENV = 'METRICS_TEXTFILE'
+TEXTFILE_INTERVAL_ENV = 'METRICS_TEXTFILE_INTERVAL'
+
+# Latency buckets fine enough for p50/p99 of single-row predictions (seconds)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0)
+BATCH_BUCKETS = (1, 10, 100, 1_000, 10_000, 100_000, 1_000_000)
+
+# name -> (type, help, labels, buckets)
+METRICS = {
+    'model_load_seconds': ('histogram', 'Time to load a model bundle', ['kind'], LATENCY_BUCKETS),
+    'model_load_errors_total': ('counter', 'Failed model or encoder loads', ['kind'], None),
+    'model_info': ('gauge', 'Active model version (value is always 1)', ['kind', 'version'], None),
+    'feature_transform_seconds': ('histogram', 'Time spent building model input', ['stage'], LATENCY_BUCKETS),
+    'inference_seconds': ('histogram', 'Time spent in model calls', ['model', 'method'], LATENCY_BUCKETS),
+    'batch_rows': ('histogram', 'Rows per inference call', ['model'], BATCH_BUCKETS),
+    'rejected_rows_total': ('counter', 'Rows rejected by feature schema validation', [], None),
+    'thread_budget_wait_seconds': ('histogram', 'Time model calls waited for a thread budget slot', [],
+                                   LATENCY_BUCKETS),
+    'cache_requests_total': ('counter', 'Per-model cache lookups', ['cache', 'result'], None),
+    'input_drift': ('gauge', 'Drift of scored inputs against the training profile (PSI or row share)',
+                    ['column', 'measure'], None)
+}
+PREFIX = 'noshow_'
+
+_lock = threading.Lock()
+_metrics = {}
+_model_versions = {}
+_enabled = False
+
+
+class _NullTimer:
+    """Shared do-nothing context manager returned while metrics are disabled"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def enabled():
+    return _enabled
+
+
+def enable(port=None, textfile=None, textfile_interval=15.0):
+    """
+    Register the metrics and start the exporters (idempotent, process-wide)
+
+    Called by process entry points (the app's warm-up, the command-line
+    tools), not by ModelLoader, so worker processes never try to bind the
+    port their parent already serves on. A port that cannot be bound is
+    reported and metrics stay disabled (unless a textfile is also set).
+
+    Args:
+        port: serve /metrics over HTTP on this port
+        textfile: path rewritten every textfile_interval seconds, for
+            node_exporter's textfile collector
+        textfile_interval: seconds between textfile writes
+
+    Returns:
+        True if metrics are enabled
+    """
+    global _enabled
+    with _lock:
+        if _enabled:
+            return True
+        try:
+            import prometheus_client
+        except ImportError:
+            print("prometheus_client is not installed; metrics stay disabled")
+            return False
+
+        if not _metrics:
+            _register(prometheus_client)
+
+        if port:
+            try:
+                prometheus_client.start_http_server(int(port))
+            except OSError as e:
+                # Usually the port is taken (another process already exports); the
+                # caller keeps running, only without this endpoint
+                print(f"Error starting metrics server on port {port}: {e}")
+                if not textfile:
+                    return False
+        if textfile:
+            threading.Thread(target=_write_textfile, args=(prometheus_client, textfile, textfile_interval),
+                             name='metrics-textfile', daemon=True).start()
+        _enabled = True
+        return True
+
+
+def _register(prometheus_client):
+    """Create the METRICS collectors in the default registry (once per process)"""
+    types = {
+        'histogram': prometheus_client.Histogram,
+        'counter': prometheus_client.Counter,
+        'gauge': prometheus_client.Gauge
+    }
+    for name, (kind, description, labels, buckets) in METRICS.items():
+        # Counters are registered without the '_total' suffix, which the client appends
+        metric_name = PREFIX + (name[:-len('_total')] if kind == 'counter' else name)
+        options = {'buckets': buckets} if buckets else {}
+        _metrics[name] = types[kind](metric_name, description, labels, **options)
+
+
+def enable_from_env():
+    """Enable metrics if METRICS_PORT or METRICS_TEXTFILE is set (for process entry points)"""
+    port = os.environ.get(PORT_ENV)
+    textfile = os.environ.get(TEXTFILE_ENV)
+    if not (port or textfile):
+        return False
+    return enable(port, textfile, float(os.environ.get(TEXTFILE_INTERVAL_ENV, 15)))
+
+
+def _write_textfile(prometheus_client, path, interval):
+    while True:
+        try:
+            # Written to a temporary file and renamed, so readers never see a partial file
+            prometheus_client.write_to_textfile(path, prometheus_client.REGISTRY)
+        except OSError as e:
+            print(f"Error writing metrics textfile: {e}")
+        time.sleep(interval)
+
+
+def timed(name, **labels):
+    """Context manager observing its duration into a histogram (no-op when disabled)"""
+    if not _enabled:
+        return _NULL_TIMER
+    return _metrics[name].labels(**labels).time()
+
+
+def observe(name, value, **labels):
+    if _enabled:
+        metric = _metrics[name]
+        (metric.labels(**labels) if labels else metric).observe(value)
+
+
+def inc(name, amount=1, **labels):
+    if _enabled:
+        metric = _metrics[name]
+        (metric.labels(**labels) if labels else metric).inc(amount)
+
+
+def set_gauge(name, value, **labels):
+    if _enabled:
+        metric = _metrics[name]
+        (metric.labels(**labels) if labels else metric).set(value)
+
+
+def cache_lookup(cache, hit):
+    """Count a hit or miss of a per-model cache"""
+    if _enabled:
+        _metrics['cache_requests_total'].labels(cache=cache, result='hit' if hit else 'miss').inc()
+
+
+def set_model_info(kind, version):
+    """Point the model_info gauge for kind at the active version"""
+    if _enabled:
+        gauge = _metrics['model_info']
+        with _lock:
+            previous = _model_versions.get(kind)
+            if previous is not None and previous != str(version):
+                gauge.remove(kind, previous)
+            _model_versions[kind] = str(version)
+            gauge.labels(kind=kind, version=str(version)).set(1)
@@ -0,0 +1,327 @@
+"""
+Model Evaluation Utilities
+Accuracy and calibration reports for the trained models
+"""
+
+import numpy as np
+import pandas as pd
+
+from utils.model_loader import quantile_column
+
+# Central prediction intervals checked by the calibration report
+DEFAULT_INTERVALS = ((0.1, 0.9), (0.2, 0.8), (0.25, 0.75))
+
+
+def prepare_forecast_features(ts_data, feature_cols):
+    """
+    Build the forecaster input matrix the same way notebook 04 does for ts_test
+    
+    Args:
+        ts_data: DataFrame such as ts_test.csv
+        feature_cols: forecaster feature names
+        
+    Returns:
+        DataFrame restricted to feature_cols with gaps filled; calendar
+        features missing from ts_data are gathered from its date column
+    """
+    from utils.calendar_features import CALENDAR_FEATURES, add_calendar_features
+    
+    ts_data = add_calendar_features(ts_data, [col for col in feature_cols if col in CALENDAR_FEATURES])
+    return ts_data[feature_cols].ffill().fillna(0)
+
+
+def interval_coverage_report(loader, ts_test, intervals=DEFAULT_INTERVALS,
+                             target='daily_appointments'):
+    """
+    Check how well the forecaster's prediction intervals are calibrated
+    
+    All quantiles are requested from a single forecast over the test horizon.
+    
+    Args:
+        loader: ModelLoader with the forecaster loaded
+        ts_test: held-out time series DataFrame (e.g. ts_test.csv)
+        intervals: (lower, upper) quantile pairs to check
+        target: name of the actual demand column
+        
+    Returns:
+        DataFrame with nominal vs. empirical coverage and mean width per interval
+    """
+    X = prepare_forecast_features(ts_test, loader.forecaster_features)
+    y = ts_test[target].to_numpy(dtype=float)
+    
+    quantiles = sorted({q for pair in intervals for q in pair})
+    horizon = loader.forecast_horizon(X, quantiles=quantiles)
+    
+    rows = []
+    for lower_q, upper_q in intervals:
+        lower = horizon[quantile_column(lower_q)].to_numpy()
+        upper = horizon[quantile_column(upper_q)].to_numpy()
+        inside = (y >= lower) & (y <= upper)
+        rows.append({
+            'interval': f"{lower_q:.0%}-{upper_q:.0%}",
+            'nominal_coverage': upper_q - lower_q,
+            'empirical_coverage': inside.mean(),
+            'below_lower': (y < lower).mean(),
+            'above_upper': (y > upper).mean(),
+            'mean_width': np.mean(upper - lower),
+            'n_days': len(y)
+        })
+    
+    report = pd.DataFrame(rows)
+    report['coverage_gap'] = report['empirical_coverage'] - report['nominal_coverage']
+    return report
+
+
+def time_folds(dates, n_folds=5, test_days=30, window_days=None, gap_days=0):
+    """
+    Rolling-origin backtest folds over a date column
+    
+    The last n_folds blocks of test_days days are the test sets, oldest
+    first. Each fold trains on everything before its test block (expanding
+    window) or on the window_days days before it (rolling window), leaving
+    gap_days days out between the two.
+    
+    Args:
+        dates: dates of the rows (any order)
+        n_folds: number of folds
+        test_days: days per test block
+        window_days: training window length (None for an expanding window)
+        gap_days: days between the end of training and the test block
+    
+    Returns:
+        list of (train_index, test_index) integer arrays, computed once and
+        shared by every model evaluated on them
+    """
+    days = pd.to_datetime(pd.Series(dates)).dt.normalize().to_numpy()
+    end = days.max() + np.timedelta64(1, 'D')
+    step = np.timedelta64(test_days, 'D')
+    gap = np.timedelta64(gap_days, 'D')
+    
+    folds = []
+    for k in range(n_folds, 0, -1):
+        test_start = end - k * step
+        train_end = test_start - gap
+        in_train = days < train_end
+        if window_days is not None:
+            in_train &= days >= train_end - np.timedelta64(window_days, 'D')
+        train = np.flatnonzero(in_train)
+        test = np.flatnonzero((days >= test_start) & (days < test_start + step))
+        if len(train) and len(test):
+            folds.append((train, test))
+    if not folds:
+        raise ValueError("No fold has both training and test rows; use fewer or shorter folds")
+    return folds
+
+
+def classification_scores(y_true, proba, threshold=0.5):
+    from sklearn.metrics import f1_score, precision_score, recall_score, roc_auc_score
+    
+    predicted = (proba > threshold).astype(int)
+    return {
+        'f1': f1_score(y_true, predicted, zero_division=0),
+        'precision': precision_score(y_true, predicted, zero_division=0),
+        'recall': recall_score(y_true, predicted, zero_division=0),
+        'roc_auc': roc_auc_score(y_true, proba) if len(np.unique(y_true)) > 1 else np.nan
+    }
+
+
+def regression_scores(y_true, predicted):
+    from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+    
+    nonzero = y_true != 0
+    return {
+        'mae': mean_absolute_error(y_true, predicted),
+        'rmse': float(np.sqrt(mean_squared_error(y_true, predicted))),
+        'mape': float(np.mean(np.abs((y_true[nonzero] - predicted[nonzero]) / y_true[nonzero]))) * 100,
+        'r2': r2_score(y_true, predicted)
+    }
+
+
+def _evaluate_fold(name, fold, model, X_train, y_train, X_test, y_test, task):
+    """Fit one model on one fold (runs in a worker process)"""
+    import time
+    import warnings
+    
+    start = time.perf_counter()
+    with warnings.catch_warnings():
+        warnings.filterwarnings('ignore', message='X does not have valid feature names')
+        model.fit(X_train, y_train)
+        fit_seconds = time.perf_counter() - start
+        if task == 'classification':
+            scores = classification_scores(y_test, model.predict_proba(X_test)[:, 1])
+        else:
+            scores = regression_scores(y_test, model.predict(X_test))
+    return {'model': name, 'fold': fold, 'fit_seconds': fit_seconds, **scores}
+
+
+class Backtest:
+    """
+    Time-ordered cross-validation of several models on shared folds
+    
+    Fold indices are computed once; each fold's feature matrices are built
+    once (lazily) and reused by every model, and (model, fold) fits run in
+    parallel worker processes. Subclasses define how a fold's matrices are
+    built.
+    """
+    
+    task = None
+    
+    def __init__(self, dates, folds):
+        self.dates = pd.to_datetime(pd.Series(dates)).reset_index(drop=True)
+        self.folds = folds
+        self._matrices = {}
+    
+    def fold_matrices(self, fold):
+        """(X_train, y_train, X_test, y_test) of a fold, built on first use"""
+        if fold not in self._matrices:
+            self._matrices[fold] = self._build_fold(*self.folds[fold])
+        return self._matrices[fold]
+    
+    def _build_fold(self, train, test):
+        raise NotImplementedError
+    
+    def describe_folds(self):
+        """Date range and size of every fold's training and test sets"""
+        rows = []
+        for fold, (train, test) in enumerate(self.folds):
+            rows.append({
+                'fold': fold,
+                'train_start': self.dates[train].min().date(), 'train_end': self.dates[train].max().date(),
+                'test_start': self.dates[test].min().date(), 'test_end': self.dates[test].max().date(),
+                'train_rows': len(train), 'test_rows': len(test)
+            })
+        return pd.DataFrame(rows).set_index('fold')
+    
+    def run(self, models, n_jobs=-1):
+        """
+        Fit and score every model on every fold
+        
+        Args:
+            models: dict name -> unfitted estimator (cloned for each fold)
+            n_jobs: worker processes (-1 for one per CPU); each fit is
+                limited to one thread so the workers do not oversubscribe
+        
+        Returns:
+            DataFrame with one row per (model, fold): fold dates and sizes,
+            fit time and the task's scores
+        """
+        from joblib import Parallel, delayed
+        from sklearn.base import clone
+        from utils.model_loader import ThreadBudget
+        
+        single_thread = ThreadBudget(threads_per_call=1)
+        tasks = []
+        for fold in range(len(self.folds)):
+            X_train, y_train, X_test, y_test = self.fold_matrices(fold)
+            for name, model in models.items():
+                model = single_thread.configure(clone(model))
+                tasks.append(delayed(_evaluate_fold)(name, fold, model, X_train, y_train, X_test, y_test,
+                                                     self.task))
+        results = pd.DataFrame(Parallel(n_jobs=n_jobs)(tasks))
+        return results.join(self.describe_folds(), on='fold')
+    
+    @staticmethod
+    def summary(results):
+        """Mean and standard deviation of every score per model, across folds"""
+        scores = results.drop(columns=['fold', 'train_start', 'train_end', 'test_start', 'test_end',
+                                       'train_rows', 'test_rows'])
+        return scores.groupby('model').agg(['mean', 'std'])
+
+
+class ClassifierBacktest(Backtest):
+    """
+    Backtest of no-show classifiers on raw appointments
+    
+    The appointments are cleaned, engineered and encoded once; per fold only
+    the historical no-show rate columns are recomputed from that fold's
+    training rows, so no fold sees rates that include its own test outcomes.
+    """
+    
+    task = 'classification'
+    
+    def __init__(self, raw_data, feature_names, label_encoders, n_folds=5, test_days=30,
+                 window_days=None, gap_days=0):
+        from utils import preprocessing
+        
+        cleaned = preprocessing.clean_appointments(raw_data).reset_index(drop=True)
+        super().__init__(cleaned['appointment_date'],
+                         time_folds(cleaned['appointment_date'], n_folds, test_days, window_days, gap_days))
+        engineered = preprocessing.engineer_features(cleaned)
+        # float32 halves the fold caches; the tree models fit on float32 anyway
+        self.features = preprocessing.encode_features(engineered, feature_names, label_encoders).astype(np.float32)
+        self.groups = cleaned[preprocessing.RATE_GROUPS]
+        self.target = (cleaned['no_show'] == 'yes').astype(int).to_numpy()
+    
+    def _build_fold(self, train, test):
+        from utils.preprocessing import RATE_GROUPS
+        
+        X_train, X_test = self.features.iloc[train].copy(), self.features.iloc[test].copy()
+        y_train = self.target[train]
+        for col in RATE_GROUPS:
+            name = f'{col}_noshow_rate'
+            if name in self.features:
+                groups = self.groups[col].to_numpy()
+                rates = pd.Series(y_train).groupby(groups[train]).mean()
+                X_train[name] = pd.Series(groups[train]).map(rates).to_numpy(dtype=np.float32)
+                X_test[name] = pd.Series(groups[test]).map(rates).fillna(y_train.mean()).to_numpy(dtype=np.float32)
+        return X_train, y_train, X_test, self.target[test]
+
+
+class ForecasterBacktest(Backtest):
+    """Backtest of demand forecasters on a daily series (build_daily_series output or ts_*.csv)"""
+    
+    task = 'regression'
+    
+    def __init__(self, ts_data, feature_cols, n_folds=5, test_days=30, window_days=None, gap_days=0,
+                 target='daily_appointments'):
+        ts_data = ts_data.reset_index(drop=True)
+        date_col = 'appointment_date' if 'appointment_date' in ts_data else 'date'
+        super().__init__(ts_data[date_col],
+                         time_folds(ts_data[date_col], n_folds, test_days, window_days, gap_days))
+        self.features = prepare_forecast_features(ts_data, feature_cols)
+        self.target = ts_data[target].to_numpy(dtype=float)
+    
+    def _build_fold(self, train, test):
+        return self.features.iloc[train], self.target[train], self.features.iloc[test], self.target[test]
+
+
+def main():
+    import os
+    import argparse
+    from utils.model_loader import ModelLoader
+    from utils.preprocessing import build_daily_series
+    
+    parser = argparse.ArgumentParser(description="Rolling-origin backtest of the active models")
+    parser.add_argument('model', choices=['classifier', 'forecaster'])
+    parser.add_argument('input', help='CSV or Parquet appointments in the raw schema, with no_show')
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--test-days', type=int, default=30)
+    parser.add_argument('--window-days', type=int, help='rolling training window (default: expanding)')
+    parser.add_argument('--gap-days', type=int, default=0)
+    parser.add_argument('--jobs', type=int, default=-1, help='worker processes (default: one per CPU)')
+    parser.add_argument('--models-dir', default='models')
+    parser.add_argument('--encoders', default=os.path.join('data', 'processed', 'label_encoders.pkl'))
+    args = parser.parse_args()
+    
+    raw = pd.read_parquet(args.input) if args.input.endswith(('.parquet', '.pq')) else pd.read_csv(args.input)
+    loader = ModelLoader(args.models_dir, args.encoders)
+    fold_args = (args.folds, args.test_days, args.window_days, args.gap_days)
+    if args.model == 'classifier':
+        if not (loader.load_classifier() and loader.load_preprocessing()):
+            raise SystemExit(1)
+        backtest = ClassifierBacktest(raw, loader.classifier_features, loader.label_encoders, *fold_args)
+        models = {type(loader.classifier).__name__: loader.classifier}
+    else:
+        if not loader.load_forecaster():
+            raise SystemExit(1)
+        backtest = ForecasterBacktest(build_daily_series(raw), loader.forecaster_features, *fold_args)
+        models = {type(loader.forecaster).__name__: loader.forecaster}
+    
+    print(backtest.describe_folds().to_string())
+    results = backtest.run(models, n_jobs=args.jobs)
+    print()
+    print(Backtest.summary(results).round(4).to_string())
+
+
+if __name__ == '__main__':
+    main()
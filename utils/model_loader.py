@@ -3,85 +3,788 @@ Model Loading Utilities
 Loads saved ML models and metadata for Streamlit app
 """
 
-import joblib
 import os
-import pandas as pd
-import numpy as np
+import copy
+import json
+import shutil
+import hashlib
+import time
+import threading
+import warnings
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from utils import metrics
+
+# joblib, numpy, pandas, scikit-learn and scipy are imported inside the functions
+# that use them, so reading version metadata does not load the scientific stack
+
+# Quantile levels reported as the lower/upper bound of a demand forecast
+DEFAULT_QUANTILES = (0.2, 0.8)
+
+# Versioned layout: models/versions/<version>/manifest.json, models/CURRENT names the active one
+VERSIONS_DIR = 'versions'
+CURRENT_FILE = 'CURRENT'
+MANIFEST_FILE = 'manifest.json'
+
+# Fixed filenames written by notebooks 03 and 04 (unversioned layout)
+LEGACY_FILES = {
+    'classifier': ('best_noshow_classifier.joblib', 'feature_names.joblib', 'model_metadata.joblib'),
+    'forecaster': ('best_demand_forecaster.joblib', 'forecasting_feature_names.joblib',
+                   'forecasting_metadata.joblib')
+}
+
+# Optional artifacts that travel with a model (name -> filename)
+CLASSIFIER_ARTIFACTS = {'noshow_rates': 'noshow_rates.joblib', 'drift_reference': 'drift_reference.joblib'}
+
+# Thread budget: threads per model call (0 keeps the models' pickled n_jobs) and
+# threads shared by all concurrent calls (default: one per CPU)
+THREADS_ENV = 'MODEL_THREADS'
+THREAD_BUDGET_ENV = 'MODEL_THREAD_BUDGET'
+DEFAULT_THREADS = 1
+
+# Estimator parameters that size a model's own thread pool (scikit-learn and
+# LightGBM, XGBoost, CatBoost)
+THREAD_PARAMS = ('n_jobs', 'nthread', 'thread_count')
+
+
+def quantile_column(q):
+    """Column name used for a forecast quantile, e.g. 0.2 -> 'q20'"""
+    return f"q{q * 100:g}".replace('.', '_')
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    """SHA-256 hex digest of a file"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def current_version(models_dir):
+    """Name of the active model version, or None for the unversioned layout"""
+    try:
+        with open(os.path.join(models_dir, CURRENT_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _json_safe(value):
+    """Convert numpy scalars in metadata to plain Python for the manifest"""
+    import numpy as np
+    
+    if isinstance(value, dict):
+        return {k: _json_safe(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_json_safe(v) for v in value]
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def publish_version(models_dir, version=None, classifier=None, forecaster=None, activate=True):
+    """
+    Write a new model version and (optionally) make it the active one
+    
+    Args:
+        models_dir: root models directory
+        version: version name (default: UTC timestamp, with a -2, -3, ... suffix if taken)
+        classifier / forecaster: dict with 'model', 'features', 'metadata' and
+            optionally 'artifacts' (name -> object); omitted models are carried
+            over from the active version, or from the notebooks' fixed files
+            when there is no versioned model yet. Classifier artifacts
+            (CLASSIFIER_ARTIFACTS) left out of 'artifacts' are carried over
+            the same way.
+        activate: point CURRENT at the new version
+    
+    Returns:
+        the version name
+    
+    Raises:
+        ValueError: if activating would leave a model kind with no model
+    """
+    if version is None:
+        # Timestamps have one-second resolution; later publishes in the same second get a suffix
+        version = stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')
+        suffix = 1
+        while os.path.exists(os.path.join(models_dir, VERSIONS_DIR, version)):
+            suffix += 1
+            version = f'{stamp}-{suffix}'
+    version_dir = os.path.join(models_dir, VERSIONS_DIR, version)
+    
+    import joblib
+    
+    previous = current_version(models_dir)
+    previous_manifest = read_manifest(models_dir, previous) if previous else {}
+    
+    specs = {'classifier': classifier, 'forecaster': forecaster}
+    if previous is None:
+        # First version over the notebooks' layout: what is not published here is
+        # still served from the fixed files, so it moves into the version too
+        for kind, spec in specs.items():
+            if spec is None and os.path.exists(os.path.join(models_dir, LEGACY_FILES[kind][0])):
+                bundle = ModelBundle.from_legacy(models_dir, kind)
+                specs[kind] = {'model': bundle.model, 'features': bundle.features,
+                               'metadata': bundle.metadata, 'artifacts': bundle.artifacts}
+    
+    missing = [kind for kind, spec in specs.items() if spec is None and kind not in previous_manifest]
+    if activate and missing:
+        raise ValueError(f"Version {version} would have no {' or '.join(missing)}; "
+                         f"publish {'it' if len(missing) == 1 else 'them'} too or use activate=False")
+    
+    if specs['classifier'] is not None:
+        specs['classifier'] = _with_inherited_artifacts(specs['classifier'], models_dir, previous,
+                                                        previous_manifest)
+    
+    os.makedirs(version_dir)
+    manifest = {'version': version, 'created': datetime.now(timezone.utc).isoformat(timespec='seconds')}
+    for kind, spec in specs.items():
+        if spec is None:
+            if kind not in previous_manifest:
+                continue
+            # Carry the previous version's files over unchanged
+            entry = previous_manifest[kind]
+            previous_dir = os.path.join(models_dir, VERSIONS_DIR, previous)
+            for filename in [entry['path']] + list(entry.get('artifacts', {}).values()):
+                shutil.copy2(os.path.join(previous_dir, filename), os.path.join(version_dir, filename))
+            manifest[kind] = entry
+            continue
+        
+        model_file = LEGACY_FILES[kind][0]
+        joblib.dump(spec['model'], os.path.join(version_dir, model_file))
+        entry = {
+            'path': model_file,
+            'sha256': file_sha256(os.path.join(version_dir, model_file)),
+            'features': list(spec['features']),
+            'metadata': _json_safe(spec.get('metadata', {})),
+            'artifacts': {}
+        }
+        for name, obj in spec.get('artifacts', {}).items():
+            filename = f'{name}.joblib'
+            joblib.dump(obj, os.path.join(version_dir, filename))
+            entry['artifacts'][name] = filename
+        manifest[kind] = entry
+    
+    with open(os.path.join(version_dir, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    
+    if activate:
+        # Write-then-rename so readers never see a half-written pointer
+        tmp_path = os.path.join(models_dir, CURRENT_FILE + '.tmp')
+        with open(tmp_path, 'w') as f:
+            f.write(version)
+        os.replace(tmp_path, os.path.join(models_dir, CURRENT_FILE))
+    return version
+
+
+def _with_inherited_artifacts(spec, models_dir, previous, previous_manifest):
+    """
+    Classifier spec with the CLASSIFIER_ARTIFACTS it leaves out taken from the
+    active version (or the fixed files), so e.g. the no-show rates are not lost
+    """
+    import joblib
+    
+    artifacts = dict(spec.get('artifacts', {}))
+    for name, legacy_file in CLASSIFIER_ARTIFACTS.items():
+        if name in artifacts:
+            continue
+        if previous is not None:
+            filename = previous_manifest.get('classifier', {}).get('artifacts', {}).get(name)
+            path = os.path.join(models_dir, VERSIONS_DIR, previous, filename) if filename else None
+        else:
+            path = os.path.join(models_dir, legacy_file)
+        if path is not None and os.path.exists(path):
+            artifacts[name] = joblib.load(path)
+    return {**spec, 'artifacts': artifacts}
+
+
+def read_manifest(models_dir, version):
+    """Parsed manifest.json of a model version"""
+    with open(os.path.join(models_dir, VERSIONS_DIR, version, MANIFEST_FILE)) as f:
+        return json.load(f)
+
+
+class ModelBundle:
+    """
+    A model together with its feature list, metadata and artifacts
+    
+    Bundles are immutable once built and replaced as a whole, so anything that
+    holds a bundle always sees a model and feature list that belong together.
+    Per-model caches (e.g. the explainer) live on the bundle for the same reason.
+    """
+    
+    def __init__(self, model, features, metadata, version='legacy', artifacts=None):
+        self.model = model
+        self.features = list(features)
+        self.metadata = metadata
+        self.version = version
+        self.artifacts = artifacts or {}
+        self.cache = {}
+    
+    @classmethod
+    def from_version(cls, models_dir, version, kind):
+        """Load one model of a versioned directory, verifying its hash"""
+        import joblib
+        
+        entry = read_manifest(models_dir, version)[kind]
+        version_dir = os.path.join(models_dir, VERSIONS_DIR, version)
+        model_path = os.path.join(version_dir, entry['path'])
+        
+        if entry.get('sha256') and file_sha256(model_path) != entry['sha256']:
+            raise ValueError(f"Hash mismatch for {kind} of version {version}")
+        
+        artifacts = {name: joblib.load(os.path.join(version_dir, filename))
+                     for name, filename in entry.get('artifacts', {}).items()}
+        return cls(joblib.load(model_path), entry['features'], entry.get('metadata', {}),
+                   version=version, artifacts=artifacts)
+    
+    @classmethod
+    def from_legacy(cls, models_dir, kind):
+        """Load one model from the fixed notebook filenames"""
+        import joblib
+        
+        model_file, features_file, metadata_file = LEGACY_FILES[kind]
+        artifacts = {}
+        if kind == 'classifier':
+            for name, filename in CLASSIFIER_ARTIFACTS.items():
+                path = os.path.join(models_dir, filename)
+                if os.path.exists(path):
+                    artifacts[name] = joblib.load(path)
+        return cls(joblib.load(os.path.join(models_dir, model_file)),
+                   joblib.load(os.path.join(models_dir, features_file)),
+                   joblib.load(os.path.join(models_dir, metadata_file)),
+                   artifacts=artifacts)
+
+
+class ThreadBudget:
+    """
+    Caps the CPU threads used by concurrent model calls
+    
+    Models are set to threads_per_call workers when loaded (the notebooks
+    pickled the forests with n_jobs=-1), and each call also limits the
+    calling thread's OpenMP pool and the BLAS pool. At most
+    total_threads // threads_per_call calls run at once; further calls wait
+    for a free slot instead of oversubscribing the CPU.
+    """
+    
+    def __init__(self, threads_per_call=DEFAULT_THREADS, total_threads=None):
+        self.threads_per_call = threads_per_call
+        self.total_threads = total_threads or os.cpu_count() or 1
+        self.slots = max(1, self.total_threads // max(threads_per_call or 1, 1))
+        self._semaphore = threading.BoundedSemaphore(self.slots)
+        self._controller = None
+        self._controller_lock = threading.Lock()
+    
+    @classmethod
+    def from_env(cls):
+        """Budget from MODEL_THREADS and MODEL_THREAD_BUDGET"""
+        threads = int(os.environ.get(THREADS_ENV, DEFAULT_THREADS))
+        total = int(os.environ.get(THREAD_BUDGET_ENV, 0)) or None
+        return cls(threads or None, total)
+    
+    @property
+    def enabled(self):
+        return bool(self.threads_per_call)
+    
+    def configure(self, model):
+        """Set a loaded model's own thread pool size to threads_per_call"""
+        if not self.enabled or not hasattr(model, 'get_params'):
+            return model
+        params = [name for name in model.get_params()
+                  if name.rsplit('__', 1)[-1] in THREAD_PARAMS]
+        if params:
+            model.set_params(**{name: self.threads_per_call for name in params})
+        return model
+    
+    def _threadpools(self):
+        if self._controller is None:
+            with self._controller_lock:
+                if self._controller is None:
+                    from threadpoolctl import ThreadpoolController
+                    controller = ThreadpoolController()
+                    # BLAS pools are process-wide, so they are limited once rather than per call
+                    controller.limit(limits=self.threads_per_call, user_api='blas')
+                    self._controller = controller
+        return self._controller
+    
+    @contextmanager
+    def call(self):
+        """Hold one slot of the budget and limit this thread's OpenMP pool"""
+        if not self.enabled:
+            yield
+            return
+        controller = self._threadpools()
+        start = time.perf_counter()
+        with self._semaphore:
+            metrics.observe('thread_budget_wait_seconds', time.perf_counter() - start)
+            with controller.limit(limits=self.threads_per_call, user_api='openmp'):
+                yield
+
+
+_default_budget = None
+_default_budget_lock = threading.Lock()
+
+
+def default_thread_budget():
+    """Process-wide ThreadBudget shared by every ModelLoader"""
+    global _default_budget
+    with _default_budget_lock:
+        if _default_budget is None:
+            _default_budget = ThreadBudget.from_env()
+        return _default_budget
+
 
 class ModelLoader:
     """Load and manage ML models"""
     
-    def __init__(self, models_dir='models'):
+    def __init__(self, models_dir='models',
+                 encoders_path=os.path.join('data', 'processed', 'label_encoders.pkl'),
+                 thread_budget=None):
         self.models_dir = models_dir
-        self.classifier = None
-        self.forecaster = None
-        self.classifier_features = None
-        self.forecaster_features = None
-        self.classifier_metadata = None
-        self.forecaster_metadata = None
-        
-    def load_classifier(self):
+        self.encoders_path = encoders_path
+        self.thread_budget = thread_budget or default_thread_budget()
+        self.label_encoders = None
+        self.feature_store = None
+        self.weather = None
+        self._classifier_bundle = None
+        self._forecaster_bundle = None
+        self._swap_lock = threading.Lock()
+    
+    # Read-only views of the active bundles
+    
+    @property
+    def classifier(self):
+        return self._classifier_bundle.model if self._classifier_bundle else None
+    
+    @property
+    def classifier_features(self):
+        return self._classifier_bundle.features if self._classifier_bundle else None
+    
+    @property
+    def classifier_metadata(self):
+        return self._classifier_bundle.metadata if self._classifier_bundle else None
+    
+    @property
+    def forecaster(self):
+        return self._forecaster_bundle.model if self._forecaster_bundle else None
+    
+    @property
+    def forecaster_features(self):
+        return self._forecaster_bundle.features if self._forecaster_bundle else None
+    
+    @property
+    def forecaster_metadata(self):
+        return self._forecaster_bundle.metadata if self._forecaster_bundle else None
+    
+    @property
+    def noshow_rates(self):
+        return self._classifier_bundle.artifacts.get('noshow_rates') if self._classifier_bundle else None
+    
+    @property
+    def version(self):
+        """Version of the active classifier (falls back to the forecaster)"""
+        bundle = self._classifier_bundle or self._forecaster_bundle
+        return bundle.version if bundle else None
+    
+    def load_bundle(self, kind, version=None):
+        """
+        Load a classifier/forecaster bundle without activating it
+        
+        Args:
+            kind: 'classifier' or 'forecaster'
+            version: version name (default: models/CURRENT, else the unversioned files)
+        """
+        version = version or current_version(self.models_dir)
+        with metrics.timed('model_load_seconds', kind=kind):
+            if version is None:
+                bundle = ModelBundle.from_legacy(self.models_dir, kind)
+            else:
+                bundle = ModelBundle.from_version(self.models_dir, version, kind)
+        self.thread_budget.configure(bundle.model)
+        if kind == 'classifier':
+            self._compile_schema(bundle)
+        return bundle
+    
+    def activate(self, classifier=None, forecaster=None):
+        """Swap in new bundles; each swap is a single reference assignment"""
+        with self._swap_lock:
+            if classifier is not None:
+                self._classifier_bundle = classifier
+                metrics.set_model_info('classifier', classifier.version)
+            if forecaster is not None:
+                self._forecaster_bundle = forecaster
+                metrics.set_model_info('forecaster', forecaster.version)
+    
+    def pinned(self):
+        """
+        Loader view fixed to the currently active bundles
+        
+        Use it when one request makes several calls (prepare, predict, explain)
+        that must all see the same model version even if a swap happens midway.
+        """
+        return copy.copy(self)
+    
+    def load_classifier(self, version=None):
         """Load the no-show classification model"""
         try:
-            self.classifier = joblib.load(os.path.join(self.models_dir, 'best_noshow_classifier.joblib'))
-            self.classifier_features = joblib.load(os.path.join(self.models_dir, 'feature_names.joblib'))
-            self.classifier_metadata = joblib.load(os.path.join(self.models_dir, 'model_metadata.joblib'))
+            self.activate(classifier=self.load_bundle('classifier', version))
             return True
         except Exception as e:
             print(f"Error loading classifier: {e}")
+            metrics.inc('model_load_errors_total', kind='classifier')
             return False
     
-    def load_forecaster(self):
+    def load_forecaster(self, version=None):
         """Load the demand forecasting model"""
         try:
-            self.forecaster = joblib.load(os.path.join(self.models_dir, 'best_demand_forecaster.joblib'))
-            self.forecaster_features = joblib.load(os.path.join(self.models_dir, 'forecasting_feature_names.joblib'))
-            self.forecaster_metadata = joblib.load(os.path.join(self.models_dir, 'forecasting_metadata.joblib'))
+            self.activate(forecaster=self.load_bundle('forecaster', version))
             return True
         except Exception as e:
             print(f"Error loading forecaster: {e}")
+            metrics.inc('model_load_errors_total', kind='forecaster')
+            return False
+    
+    def load_preprocessing(self):
+        """Load the label encoders used to build classifier input"""
+        import joblib
+        
+        try:
+            self.label_encoders = joblib.load(self.encoders_path)
+            return True
+        except Exception as e:
+            print(f"Error loading label encoders: {e}")
+            metrics.inc('model_load_errors_total', kind='encoders')
             return False
     
+    def load_feature_store(self, path=None):
+        """Open the per-patient history feature store (joined for models that use it)"""
+        from utils.feature_store import DEFAULT_STORE_PATH, PatientFeatureStore
+        
+        try:
+            self.feature_store = PatientFeatureStore(path or DEFAULT_STORE_PATH)
+            return True
+        except Exception as e:
+            print(f"Error opening feature store: {e}")
+            metrics.inc('model_load_errors_total', kind='feature_store')
+            return False
+    
+    def load_weather(self, path=None):
+        """Open the local daily weather file (fills appointments and forecast rows without weather)"""
+        from utils.weather import DEFAULT_WEATHER_PATH, shared_weather
+        
+        path = path or DEFAULT_WEATHER_PATH
+        try:
+            self.weather = shared_weather(path)
+            if self.weather is None:
+                raise FileNotFoundError(path)
+            return True
+        except Exception as e:
+            print(f"Error opening weather file: {e}")
+            metrics.inc('model_load_errors_total', kind='weather')
+            return False
+    
+    def _compile_schema(self, bundle):
+        from utils.preprocessing import FeatureSchema
+        
+        schema = FeatureSchema.compile(bundle.features, self.label_encoders)
+        bundle.cache['schema'] = (self.label_encoders, schema)
+        return schema
+    
+    def feature_schema(self, bundle=None):
+        """Compiled FeatureSchema of the active (or given) classifier bundle"""
+        bundle = bundle or self._require(self._classifier_bundle, 'classifier')
+        encoders, schema = bundle.cache.get('schema', (None, None))
+        hit = schema is not None and encoders is self.label_encoders
+        metrics.cache_lookup('schema', hit)
+        if not hit:
+            # Recompile once the label encoders (code bounds) become available
+            schema = self._compile_schema(bundle)
+        return schema
+    
+    def categorical_encoder(self, bundle=None):
+        """Compiled CategoricalEncoder of the active (or given) classifier bundle and the label encoders"""
+        bundle = bundle or self._require(self._classifier_bundle, 'classifier')
+        encoders, encoder = bundle.cache.get('encoder', (None, None))
+        hit = encoder is not None and encoders is self.label_encoders
+        metrics.cache_lookup('encoder', hit)
+        if not hit:
+            from utils.preprocessing import CategoricalEncoder
+            encoder = CategoricalEncoder.compile(bundle.features, self.label_encoders)
+            bundle.cache['encoder'] = (self.label_encoders, encoder)
+        return encoder
+    
+    def _require(self, bundle, kind):
+        if bundle is None:
+            raise ValueError(f"{kind.capitalize()} not loaded. Call load_{kind}() first.")
+        return bundle
+    
+    def prepare_classifier_input(self, raw_data):
+        """
+        Turn raw-schema appointments into classifier input
+        
+        Args:
+            raw_data: DataFrame in the raw appointment schema; with a weather
+                provider loaded, rows without weather get their day's weather
+        
+        Returns:
+            DataFrame aligned to classifier_features
+        """
+        bundle = self._require(self._classifier_bundle, 'classifier')
+        if self.label_encoders is None:
+            raise ValueError("Label encoders not loaded. Call load_preprocessing() first.")
+        from utils import preprocessing
+        
+        if self.weather is not None:
+            # One cached range fetch for every date in the batch
+            with metrics.timed('feature_transform_seconds', stage='weather'):
+                raw_data = self.weather.fill_appointments(raw_data)
+        
+        history = None
+        if (self.feature_store is not None and preprocessing.PATIENT_ID_COL in raw_data
+                and not set(preprocessing.HISTORY_FEATURES).isdisjoint(bundle.features)):
+            # One bulk lookup for the whole batch, counted as of each appointment's date
+            with metrics.timed('feature_transform_seconds', stage='history_lookup'):
+                history = self.feature_store.lookup(raw_data[preprocessing.PATIENT_ID_COL],
+                                                    before=raw_data.get('appointment_date_continuous'))
+        
+        with metrics.timed('feature_transform_seconds', stage='classifier_input'):
+            return preprocessing.prepare_classifier_input(raw_data, bundle.features, self.label_encoders,
+                                                          bundle.artifacts.get('noshow_rates'), history,
+                                                          self.categorical_encoder(bundle))
+    
     def predict_noshow(self, input_data):
         """
         Predict no-show probability
         
         Args:
             input_data: DataFrame with patient features
-            
+        
         Returns:
             probability of no-show (0-1)
         """
-        if self.classifier is None:
-            raise ValueError("Classifier not loaded. Call load_classifier() first.")
+        bundle = self._require(self._classifier_bundle, 'classifier')
+        
+        with metrics.timed('feature_transform_seconds', stage='schema_align'):
+            matrix, valid = self.feature_schema(bundle).align(input_data)
+        if not valid[:1].all():
+            metrics.inc('rejected_rows_total')
+            raise ValueError("Input failed feature schema validation (missing, non-finite or unknown values)")
         
         # Get prediction probability
-        proba = self.classifier.predict_proba(input_data)[0]
+        proba = self._predict_proba(bundle, matrix[:1])[0]
         
         return {
             'show_probability': proba[0],
             'noshow_probability': proba[1],
-            'prediction': 'No-Show Risk' if proba[1] > 0.5 else 'Likely to Show'
+            'prediction': 'No-Show Risk' if proba[1] > 0.5 else 'Likely to Show',
+            'model_version': bundle.version
         }
     
+    def score_noshow(self, input_data):
+        """
+        Score a batch of appointments
+        
+        Args:
+            input_data: DataFrame with patient features (any column order)
+        
+        Returns:
+            DataFrame indexed like input_data with noshow_probability (NaN for
+            rows rejected by the feature schema) and a boolean 'valid' column
+        """
+        import numpy as np
+        import pandas as pd
+        
+        bundle = self._require(self._classifier_bundle, 'classifier')
+        
+        with metrics.timed('feature_transform_seconds', stage='schema_align'):
+            matrix, valid = self.feature_schema(bundle).align(input_data)
+        metrics.inc('rejected_rows_total', len(valid) - int(valid.sum()))
+        noshow = np.full(len(matrix), np.nan)
+        if valid.any():
+            rows = matrix if valid.all() else matrix[valid]
+            noshow[valid] = self._predict_proba(bundle, rows)[:, 1]
+        
+        index = input_data.index if isinstance(input_data, pd.DataFrame) else None
+        return pd.DataFrame({'noshow_probability': noshow, 'valid': valid}, index=index)
+    
+    def _predict_proba(self, bundle, matrix):
+        """predict_proba on a schema-aligned float32 matrix, skipping sklearn's re-validation"""
+        metrics.observe('batch_rows', len(matrix), model='classifier')
+        from sklearn import config_context
+        
+        timer = metrics.timed('inference_seconds', model='classifier', method='predict_proba')
+        with self.thread_budget.call(), timer, warnings.catch_warnings(), config_context(assume_finite=True):
+            # Columns were aligned by the schema, so the missing-feature-names warning does not apply
+            warnings.filterwarnings('ignore', message='X does not have valid feature names')
+            return bundle.model.predict_proba(matrix)
+    
+    def explain_noshow(self, input_data, top_k=5):
+        """
+        Top feature contributions to each row's no-show probability
+        
+        Args:
+            input_data: DataFrame with patient features (any number of rows)
+            top_k: number of drivers per row
+        
+        Returns:
+            DataFrame of drivers per row (see TreeExplainer.top_drivers)
+        """
+        bundle = self._require(self._classifier_bundle, 'classifier')
+        
+        metrics.cache_lookup('explainer', 'explainer' in bundle.cache)
+        if 'explainer' not in bundle.cache:
+            from utils.explanations import TreeExplainer
+            bundle.cache['explainer'] = TreeExplainer(bundle.model, bundle.features)
+        with self.thread_budget.call(), metrics.timed('inference_seconds', model='classifier',
+                                                      method='decision_path'):
+            return bundle.cache['explainer'].top_drivers(input_data, top_k=top_k)
+    
     def forecast_demand(self, input_data):
         """
         Forecast daily appointment demand
         
         Args:
             input_data: DataFrame with temporal features
-            
+        
         Returns:
-            predicted appointment count
+            predicted appointment count with 20th/80th percentile bounds
         """
-        if self.forecaster is None:
-            raise ValueError("Forecaster not loaded. Call load_forecaster() first.")
-        
-        # Get prediction
-        prediction = self.forecaster.predict(input_data)[0]
+        horizon = self.forecast_horizon(input_data.iloc[:1])
+        lower, upper = (horizon[quantile_column(q)].iloc[0] for q in DEFAULT_QUANTILES)
+        prediction = horizon['predicted_appointments'].iloc[0]
         
         return {
             'predicted_appointments': max(0, int(round(prediction))),  # No negative predictions
-            'lower_bound': max(0, int(round(prediction - 80))),  # Based on MAE
-            'upper_bound': int(round(prediction + 80))
-        }
\ No newline at end of file
+            'lower_bound': max(0, int(round(lower))),
+            'upper_bound': max(0, int(round(upper)))
+        }
+    
+    def forecast_horizon(self, input_data, quantiles=DEFAULT_QUANTILES):
+        """
+        Forecast demand with prediction quantiles for a whole horizon
+        
+        For random forests the quantiles come from the per-tree predictions,
+        gathered for every row and tree in one pass over the leaf indices.
+        Other forecasters fall back to a symmetric band of one MAE.
+        
+        Args:
+            input_data: DataFrame with temporal features, one row per date.
+                Calendar features (utils.calendar_features) the forecaster
+                uses may be left out, and with a weather provider loaded
+                weather may be missing, if there is an appointment_date column.
+            quantiles: quantile levels (0-1) to report
+        
+        Returns:
+            DataFrame with 'predicted_appointments' and one column per quantile
+            (named by quantile_column, e.g. 'q20')
+        """
+        import numpy as np
+        import pandas as pd
+        
+        bundle = self._require(self._forecaster_bundle, 'forecaster')
+        forecaster = bundle.model
+        input_data = self._forecaster_input(bundle, input_data)
+        
+        quantiles = np.atleast_1d(np.asarray(quantiles, dtype=float))
+        metrics.observe('batch_rows', len(input_data), model='forecaster')
+        
+        if hasattr(forecaster, 'estimators_') and hasattr(forecaster, 'apply'):
+            per_tree = self._per_tree_predictions(bundle, input_data)
+            prediction = per_tree.mean(axis=1)
+            bounds = np.quantile(per_tree, quantiles, axis=1)
+        else:
+            with self.thread_budget.call(), metrics.timed('inference_seconds', model='forecaster',
+                                                          method='predict'):
+                prediction = np.asarray(forecaster.predict(input_data), dtype=float)
+            mae = (bundle.metadata or {}).get('mae', 80)
+            bounds = prediction[np.newaxis, :] + np.sign(quantiles - 0.5)[:, np.newaxis] * mae
+        
+        index = input_data.index if isinstance(input_data, pd.DataFrame) else None
+        result = pd.DataFrame({'predicted_appointments': prediction}, index=index)
+        for q, bound in zip(quantiles, bounds):
+            result[quantile_column(q)] = bound
+        return result
+    
+    def _forecaster_input(self, bundle, input_data):
+        """
+        Input restricted to the forecaster's features, with missing calendar
+        features and (given a weather provider) missing weather filled by date
+        """
+        from utils.calendar_features import CALENDAR_FEATURES, add_calendar_features
+        from utils.preprocessing import WEATHER_COLS
+        
+        filled = input_data
+        has_date = 'appointment_date' in filled.columns or 'date' in filled.columns
+        if self.weather is not None and has_date and not set(WEATHER_COLS).isdisjoint(bundle.features):
+            with metrics.timed('feature_transform_seconds', stage='weather'):
+                filled = self.weather.fill_daily(filled)
+        missing = [name for name in bundle.features if name in CALENDAR_FEATURES and name not in filled.columns]
+        if missing:
+            with metrics.timed('feature_transform_seconds', stage='calendar'):
+                filled = add_calendar_features(filled, missing)
+        return filled if list(filled.columns) == list(bundle.features) else filled[bundle.features]
+    
+    def _per_tree_predictions(self, bundle, input_data):
+        """Predictions of every tree for every row, shape (n_rows, n_trees)"""
+        import numpy as np
+        
+        with self.thread_budget.call(), metrics.timed('inference_seconds', model='forecaster', method='apply'):
+            leaves = bundle.model.apply(input_data)
+        table = self._leaf_value_table(bundle)
+        return table[np.arange(table.shape[0])[np.newaxis, :], leaves]
+    
+    def _leaf_value_table(self, bundle):
+        """Node values of all trees padded into one (n_trees, max_nodes) array"""
+        metrics.cache_lookup('leaf_values', 'leaf_values' in bundle.cache)
+        if 'leaf_values' not in bundle.cache:
+            import numpy as np
+            trees = [estimator.tree_ for estimator in bundle.model.estimators_]
+            table = np.zeros((len(trees), max(tree.node_count for tree in trees)))
+            for i, tree in enumerate(trees):
+                table[i, :tree.node_count] = tree.value[:, 0, 0]
+            bundle.cache['leaf_values'] = table
+        return bundle.cache['leaf_values']
+
+
+class ModelWatcher(threading.Thread):
+    """
+    Background thread that hot-swaps a ModelLoader to new model versions
+    
+    Polls models/CURRENT; when it names a new version, both models are loaded
+    and hash-checked on this thread and only then swapped into the loader, so
+    requests keep using the previous version until the new one is ready.
+    """
+    
+    def __init__(self, loader, interval=30.0):
+        super().__init__(name='model-watcher', daemon=True)
+        self.loader = loader
+        self.interval = interval
+        self._stop_event = threading.Event()
+    
+    def check(self):
+        """Load and activate the current version if it changed; returns True on swap"""
+        version = current_version(self.loader.models_dir)
+        if version is None or version == self.loader.version:
+            return False
+        
+        manifest = read_manifest(self.loader.models_dir, version)
+        bundles = {kind: self.loader.load_bundle(kind, version)
+                   for kind in ('classifier', 'forecaster')
+                   if kind in manifest and getattr(self.loader, f'_{kind}_bundle') is not None}
+        if not bundles:
+            return False
+        self.loader.activate(**bundles)
+        return True
+    
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                if self.check():
+                    print(f"Activated model version {self.loader.version}")
+            except Exception as e:
+                print(f"Error reloading models: {e}")
+    
+    def stop(self):
+        self._stop_event.set()
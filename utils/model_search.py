@@ -0,0 +1,354 @@
+"""
+Model Search Utilities
+Successive-halving hyperparameter search for the no-show classifiers, with an on-disk result cache
+
+Usage:
+    python -m utils.model_search appointments.csv --families random_forest lightgbm --resource trees
+
+scores every candidate on a small budget (the most recent training rows of
+each backtest fold, or few trees), keeps the best 1/eta and repeats with
+eta times the budget until the full budget. Every (model, params, fold,
+budget) score is cached under data/search_cache/, so rerunning with a larger
+space only fits the new points.
+"""
+
+import os
+import json
+import math
+import hashlib
+import argparse
+from importlib import import_module
+from itertools import product
+
+import numpy as np
+import pandas as pd
+
+from utils.model_evaluation import ClassifierBacktest, _evaluate_fold
+
+DEFAULT_CACHE_DIR = os.path.join('data', 'search_cache')
+
+# Budget multiplier between rungs; the best 1/ETA candidates move up
+DEFAULT_ETA = 3
+
+# Full budget for resource='trees'
+DEFAULT_MAX_TREES = 300
+
+# Smallest budget a rung is given
+MIN_ROWS = 2_000
+MIN_TREES = 10
+
+# Model families: estimator class, fixed parameters, tree-count parameter and
+# default search space. Fixed parameters follow notebook 03, except that the
+# notebook's SMOTE oversampling is replaced by class weights.
+FAMILIES = {
+    'logistic_regression': {
+        'estimator': 'sklearn.linear_model.LogisticRegression',
+        'fixed': {'random_state': 42, 'max_iter': 1000, 'class_weight': 'balanced'},
+        'trees': None,
+        'space': {'C': [0.01, 0.1, 1.0, 10.0]}
+    },
+    'random_forest': {
+        'estimator': 'sklearn.ensemble.RandomForestClassifier',
+        'fixed': {'random_state': 42, 'n_jobs': 1, 'class_weight': 'balanced'},
+        'trees': 'n_estimators',
+        'space': {'max_depth': [10, 15, 20], 'min_samples_split': [2, 10], 'min_samples_leaf': [1, 5],
+                  'max_features': ['sqrt', 0.5]}
+    },
+    'gradient_boosting': {
+        'estimator': 'sklearn.ensemble.GradientBoostingClassifier',
+        'fixed': {'random_state': 42, 'subsample': 0.8},
+        'trees': 'n_estimators',
+        'space': {'max_depth': [3, 5, 7], 'learning_rate': [0.05, 0.1, 0.2]}
+    },
+    'xgboost': {
+        'estimator': 'xgboost.XGBClassifier',
+        'fixed': {'random_state': 42, 'eval_metric': 'logloss', 'subsample': 0.8, 'colsample_bytree': 0.8,
+                  'n_jobs': 1},
+        'trees': 'n_estimators',
+        'space': {'max_depth': [4, 6, 8], 'learning_rate': [0.05, 0.1, 0.2]}
+    },
+    'lightgbm': {
+        'estimator': 'lightgbm.LGBMClassifier',
+        'fixed': {'random_state': 42, 'class_weight': 'balanced', 'subsample': 0.8, 'subsample_freq': 1,
+                  'colsample_bytree': 0.8, 'verbosity': -1, 'n_jobs': 1},
+        'trees': 'n_estimators',
+        'space': {'num_leaves': [15, 31, 63], 'learning_rate': [0.05, 0.1, 0.2]}
+    },
+    'catboost': {
+        'estimator': 'catboost.CatBoostClassifier',
+        'fixed': {'random_state': 42, 'verbose': 0, 'auto_class_weights': 'Balanced', 'thread_count': 1},
+        'trees': 'iterations',
+        'space': {'depth': [4, 6, 8], 'learning_rate': [0.05, 0.1, 0.2]}
+    }
+}
+
+
+def available_families():
+    """Families whose library is installed (xgboost, lightgbm and catboost are optional)"""
+    available = []
+    for name, family in FAMILIES.items():
+        try:
+            import_module(family['estimator'].rsplit('.', 1)[0])
+        except ImportError:
+            continue
+        available.append(name)
+    return available
+
+
+def make_estimator(family, params, y_train):
+    """Unfitted estimator of a family with the fixed parameters plus params"""
+    module, cls = FAMILIES[family]['estimator'].rsplit('.', 1)
+    params = {**FAMILIES[family]['fixed'], **params}
+    if family == 'xgboost' and 'scale_pos_weight' not in params:
+        # XGBoost has no class_weight; weight positives by the fold's class ratio
+        positives = max(int(y_train.sum()), 1)
+        params['scale_pos_weight'] = (len(y_train) - positives) / positives
+    return getattr(import_module(module), cls)(**params)
+
+
+def candidates(spaces):
+    """(family, params) for every point of every family's grid"""
+    points = []
+    for family, space in spaces.items():
+        names = sorted(space)
+        for values in product(*(space[name] for name in names)):
+            points.append((family, dict(zip(names, values))))
+    return points
+
+
+def backtest_digest(backtest):
+    """Hash of a backtest's data and folds, so cached scores are never reused across datasets"""
+    digest = hashlib.sha256()
+    digest.update(pd.util.hash_pandas_object(backtest.features, index=False).to_numpy().tobytes())
+    digest.update(np.ascontiguousarray(backtest.target).tobytes())
+    groups = getattr(backtest, 'groups', None)
+    if groups is not None:
+        digest.update(pd.util.hash_pandas_object(groups, index=False).to_numpy().tobytes())
+    for train, test in backtest.folds:
+        digest.update(train.tobytes())
+        digest.update(test.tobytes())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    Fold scores keyed by (data, family, params, fold, training rows)
+
+    One small JSON file per result, written atomically, so interrupted or
+    concurrent searches never leave a partial entry.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(data, family, params, fold, rows):
+        payload = json.dumps({'data': data, 'family': family, 'params': params, 'fold': fold, 'rows': rows},
+                             sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f'{key}.json')
+
+    def get(self, key):
+        try:
+            with open(self._path(key)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key, result):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(result, f, default=float)
+        os.replace(tmp_path, path)
+
+
+class HalvingSearch:
+    """
+    Successive halving over model families on a backtest's shared folds
+
+    Each rung scores the surviving candidates on every fold, in parallel
+    worker processes, and keeps the best 1/eta by mean score. The budget is
+    either the number of most recent training rows per fold (resource='rows')
+    or the tree count (resource='trees'; families without trees are given
+    rows instead). The last rung always uses the full budget.
+    """
+
+    def __init__(self, backtest, cache_dir=DEFAULT_CACHE_DIR, scoring='roc_auc', eta=DEFAULT_ETA,
+                 resource='rows', max_trees=DEFAULT_MAX_TREES, n_jobs=-1):
+        if backtest.task != 'classification':
+            raise ValueError("HalvingSearch searches no-show classifiers; use a ClassifierBacktest")
+        if resource not in ('rows', 'trees'):
+            raise ValueError(f"resource must be 'rows' or 'trees', not {resource!r}")
+        self.backtest = backtest
+        self.cache = ResultCache(cache_dir)
+        self.scoring = scoring
+        self.eta = eta
+        self.resource = resource
+        self.max_trees = max_trees
+        self.n_jobs = n_jobs
+        self.data = backtest_digest(backtest)
+        self._order = {}
+
+    def n_rungs(self, n_candidates):
+        """Rungs needed to get down to one candidate, limited by the smallest useful budget"""
+        if self.resource == 'trees':
+            smallest = MIN_TREES / self.max_trees
+        else:
+            smallest = MIN_ROWS / min(len(train) for train, _ in self.backtest.folds)
+        by_candidates = math.ceil(math.log(max(n_candidates, 1), self.eta)) + 1
+        by_budget = math.floor(math.log(1 / min(smallest, 1), self.eta)) + 1
+        return max(1, min(by_candidates, by_budget))
+
+    def _recent(self, fold, rows):
+        """Positions of a fold's rows most recent training rows, in training order"""
+        if fold not in self._order:
+            train = self.backtest.folds[fold][0]
+            self._order[fold] = np.argsort(self.backtest.dates.to_numpy()[train], kind='stable')
+        return np.sort(self._order[fold][-rows:])
+
+    def _budget(self, family, params, fold, fraction):
+        """(params including the tree count, training rows) of a candidate at a budget fraction"""
+        trees = FAMILIES[family]['trees']
+        n_train = len(self.backtest.folds[fold][0])
+        if self.resource == 'trees' and trees:
+            return {**params, trees: max(MIN_TREES, round(self.max_trees * fraction))}, n_train
+        return params, min(n_train, max(MIN_ROWS, round(n_train * fraction)))
+
+    def run(self, spaces=None):
+        """
+        Search the families' spaces
+
+        Args:
+            spaces: dict family -> {param: [values]} (default: every installed
+                family's FAMILIES space). With resource='trees' the tree-count
+                parameter is set by the search, not by the space.
+
+        Returns:
+            DataFrame with one row per (rung, candidate): budget, mean and
+            standard deviation of the score across folds, fits that were run
+            rather than read from the cache, and whether it moved up
+        """
+        from joblib import Parallel, delayed
+        from utils.model_loader import ThreadBudget
+
+        spaces = spaces or {family: FAMILIES[family]['space'] for family in available_families()}
+        if self.resource == 'trees':
+            spaces = {family: {name: values for name, values in space.items() if name != FAMILIES[family]['trees']}
+                      for family, space in spaces.items()}
+        alive = candidates(spaces)
+        rungs = self.n_rungs(len(alive))
+        single_thread = ThreadBudget(threads_per_call=1)
+
+        history = []
+        for rung in range(rungs):
+            fraction = float(self.eta) ** (rung - rungs + 1)
+            scores = {}
+            jobs = []
+            for index, (family, params) in enumerate(alive):
+                for fold in range(len(self.backtest.folds)):
+                    fit_params, rows = self._budget(family, params, fold, fraction)
+                    key = self.cache.key(self.data, family, fit_params, fold, rows)
+                    cached = self.cache.get(key)
+                    if cached is not None:
+                        scores.setdefault(index, []).append((cached, False))
+                        continue
+                    X_train, y_train, X_test, y_test = self.backtest.fold_matrices(fold)
+                    if rows < len(y_train):
+                        recent = self._recent(fold, rows)
+                        X_train, y_train = X_train.iloc[recent], y_train[recent]
+                    model = single_thread.configure(make_estimator(family, fit_params, y_train))
+                    jobs.append((index, key, delayed(_evaluate_fold)(family, fold, model, X_train, y_train,
+                                                                     X_test, y_test, 'classification')))
+
+            results = Parallel(n_jobs=self.n_jobs)(job for _, _, job in jobs) if jobs else []
+            for (index, key, _), result in zip(jobs, results):
+                self.cache.put(key, result)
+                scores.setdefault(index, []).append((result, True))
+
+            rung_rows = []
+            for index, (family, params) in enumerate(alive):
+                fold_scores = [result[self.scoring] for result, _ in scores[index]]
+                # Rows reported for the last (largest) fold
+                fit_params, rows = self._budget(family, params, len(self.backtest.folds) - 1, fraction)
+                trees = FAMILIES[family]['trees']
+                rung_rows.append({
+                    'rung': rung, 'family': family, 'params': json.dumps(params, sort_keys=True, default=str),
+                    'budget': fraction, 'train_rows': rows,
+                    'trees': fit_params.get(trees, FAMILIES[family]['fixed'].get(trees)) if trees else None,
+                    'score': np.mean(fold_scores), 'score_std': np.std(fold_scores),
+                    'fits': sum(fitted for _, fitted in scores[index]),
+                    'fit_seconds': sum(result['fit_seconds'] for result, fitted in scores[index] if fitted)
+                })
+            rung_frame = pd.DataFrame(rung_rows)
+            keep = max(1, math.ceil(len(alive) / self.eta)) if rung < rungs - 1 else 1
+            survivors = rung_frame['score'].fillna(-np.inf).sort_values(ascending=False, kind='stable').index[:keep]
+            rung_frame['promoted'] = rung_frame.index.isin(survivors)
+            history.append(rung_frame)
+            alive = [alive[index] for index in sorted(survivors)]
+
+        return pd.concat(history, ignore_index=True)
+
+    @staticmethod
+    def best(history):
+        """Best-scoring candidate of each family at the largest budget it reached"""
+        last = history[history['rung'] == history.groupby('family')['rung'].transform('max')]
+        return last.sort_values('score', ascending=False).groupby('family').head(1).set_index('family')
+
+
+def main():
+    from utils.model_loader import ModelLoader
+
+    parser = argparse.ArgumentParser(description="Successive-halving search over no-show classifiers")
+    parser.add_argument('input', help='CSV or Parquet appointments in the raw schema, with no_show')
+    parser.add_argument('--families', nargs='+', choices=list(FAMILIES),
+                        help='model families to search (default: every installed one)')
+    parser.add_argument('--resource', choices=['rows', 'trees'], default='rows',
+                        help='budget that grows between rungs')
+    parser.add_argument('--eta', type=int, default=DEFAULT_ETA, help='budget multiplier between rungs')
+    parser.add_argument('--max-trees', type=int, default=DEFAULT_MAX_TREES)
+    parser.add_argument('--scoring', default='roc_auc', choices=['roc_auc', 'f1', 'precision', 'recall'])
+    parser.add_argument('--folds', type=int, default=3)
+    parser.add_argument('--test-days', type=int, default=30)
+    parser.add_argument('--window-days', type=int, help='rolling training window (default: expanding)')
+    parser.add_argument('--jobs', type=int, default=-1, help='worker processes (default: one per CPU)')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR)
+    parser.add_argument('--output', help='CSV of every rung')
+    parser.add_argument('--models-dir', default='models')
+    parser.add_argument('--encoders', default=os.path.join('data', 'processed', 'label_encoders.pkl'))
+    args = parser.parse_args()
+
+    families = args.families or available_families()
+    missing = sorted(set(families) - set(available_families()))
+    if missing:
+        print(f"Error searching models: {', '.join(missing)} not installed")
+        raise SystemExit(1)
+
+    loader = ModelLoader(args.models_dir, args.encoders)
+    if not (loader.load_classifier() and loader.load_preprocessing()):
+        raise SystemExit(1)
+    raw = pd.read_parquet(args.input) if args.input.endswith(('.parquet', '.pq')) else pd.read_csv(args.input)
+    backtest = ClassifierBacktest(raw, loader.classifier_features, loader.label_encoders, args.folds,
+                                  args.test_days, args.window_days)
+    print(backtest.describe_folds().to_string())
+
+    search = HalvingSearch(backtest, args.cache_dir, args.scoring, args.eta, args.resource, args.max_trees,
+                           args.jobs)
+    history = search.run({family: FAMILIES[family]['space'] for family in families})
+    if args.output:
+        history.to_csv(args.output, index=False)
+
+    for rung, rung_frame in history.groupby('rung'):
+        print(f"\nRung {rung}: {len(rung_frame)} candidates, budget {rung_frame['budget'].iloc[0]:.3g}, "
+              f"{rung_frame['fits'].sum()} fits ({rung_frame['fit_seconds'].sum():.1f}s), "
+              f"{len(rung_frame) * len(backtest.folds) - rung_frame['fits'].sum()} cached")
+    print()
+    print(HalvingSearch.best(history)[['params', 'train_rows', 'trees', 'score', 'score_std']].to_string())
+
+
+if __name__ == '__main__':
+    main()
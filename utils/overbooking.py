@@ -0,0 +1,126 @@
+"""
+Overbooking Simulation Utilities
+Monte Carlo attendance simulation over per-patient no-show risk
+"""
+
+import numpy as np
+import pandas as pd
+
+# Number of simulated clinic days
+DEFAULT_SIMULATIONS = 100_000
+
+# Upper bound on random draws held in memory per batch (~64 MB of float32)
+MAX_DRAWS_PER_BATCH = 2 ** 24
+
+
+def simulate_overbooking(noshow_proba, slots=None, capacity=None, max_extra=5,
+                         extra_noshow_proba=None, n_sims=DEFAULT_SIMULATIONS, seed=42):
+    """
+    Simulate a clinic day's attendance for 0..max_extra extra bookings per slot
+
+    Each booked patient attends with probability 1 - noshow_proba, independently.
+    Extra bookings are assumed to behave like the slot's average patient unless
+    extra_noshow_proba is given. Draws are made in vectorized batches.
+
+    Args:
+        noshow_proba: array of no-show probabilities, one per scored appointment
+        slots: array of slot labels (same length), or None for a single slot
+        capacity: dict/Series slot -> patients that can be seen; defaults to
+            the number of bookings in each slot
+        max_extra: largest number of extra bookings per slot to evaluate
+        extra_noshow_proba: no-show probability of extra bookings (scalar)
+        n_sims: number of simulated days
+        seed: random seed
+
+    Returns:
+        dict with DataFrames indexed by slot and columned by extra bookings:
+        'overflow_risk' (P(attendance > capacity)), 'expected_overflow' and
+        'expected_idle' (patients over / seats under capacity), plus 'slots'
+        with per-slot bookings, capacity and expected attendance
+    """
+    noshow_proba = np.asarray(noshow_proba, dtype=np.float64)
+    if noshow_proba.size == 0:
+        raise ValueError("No scored appointments to simulate.")
+    if slots is None:
+        slots = np.zeros(len(noshow_proba), dtype=int)
+    codes, labels = pd.factorize(pd.Series(slots), sort=True)
+
+    order = np.argsort(codes, kind='stable')
+    show_proba = (1.0 - noshow_proba[order]).astype(np.float32)
+    booked = np.bincount(codes, minlength=len(labels))
+    starts = np.concatenate([[0], np.cumsum(booked)[:-1]])
+
+    if capacity is None:
+        slot_capacity = booked.astype(np.int64)
+    else:
+        slot_capacity = pd.Series(capacity).reindex(labels).fillna(0).to_numpy(dtype=np.int64)
+
+    if extra_noshow_proba is None:
+        extra_show = 1.0 - np.bincount(codes, weights=noshow_proba, minlength=len(labels)) / booked
+    else:
+        extra_show = np.full(len(labels), 1.0 - extra_noshow_proba)
+    extra_show = extra_show.astype(np.float32)
+
+    n_slots, n_extra = len(labels), max_extra + 1
+    overflow_count = np.zeros((n_slots, n_extra))
+    overflow_total = np.zeros((n_slots, n_extra))
+    idle_total = np.zeros((n_slots, n_extra))
+
+    rng = np.random.default_rng(seed)
+    draws_per_sim = len(show_proba) + n_slots * max_extra
+    batch_size = int(max(1, min(n_sims, MAX_DRAWS_PER_BATCH // max(draws_per_sim, 1))))
+
+    done = 0
+    while done < n_sims:
+        b = min(batch_size, n_sims - done)
+
+        shows = rng.random((b, len(show_proba)), dtype=np.float32) < show_proba
+        attended = np.add.reduceat(shows, starts, axis=1, dtype=np.int32)
+
+        extra = np.zeros((b, n_slots, n_extra), dtype=np.int32)
+        if max_extra:
+            extra_shows = rng.random((b, n_slots, max_extra), dtype=np.float32) < extra_show[:, np.newaxis]
+            np.cumsum(extra_shows, axis=2, out=extra[:, :, 1:])
+
+        excess = attended[:, :, np.newaxis] + extra - slot_capacity[np.newaxis, :, np.newaxis]
+        overflow_count += (excess > 0).sum(axis=0)
+        overflow_total += np.clip(excess, 0, None).sum(axis=0)
+        idle_total += np.clip(-excess, 0, None).sum(axis=0)
+        done += b
+
+    index = pd.Index(labels, name='slot')
+    columns = pd.RangeIndex(n_extra, name='extra_bookings')
+    return {
+        'overflow_risk': pd.DataFrame(overflow_count / n_sims, index=index, columns=columns),
+        'expected_overflow': pd.DataFrame(overflow_total / n_sims, index=index, columns=columns),
+        'expected_idle': pd.DataFrame(idle_total / n_sims, index=index, columns=columns),
+        'slots': pd.DataFrame({
+            'booked': booked,
+            'capacity': slot_capacity,
+            'expected_attendance': np.bincount(codes, weights=1.0 - noshow_proba, minlength=n_slots)
+        }, index=index)
+    }
+
+
+def recommend_extra_bookings(simulation, target_risk=0.05):
+    """
+    Pick the largest number of extra bookings per slot within an overflow target
+
+    Args:
+        simulation: result of simulate_overbooking
+        target_risk: maximum acceptable probability that a slot overflows
+
+    Returns:
+        DataFrame per slot with the recommendation and its expected outcome
+    """
+    risk = simulation['overflow_risk'].to_numpy()
+    # Overflow risk only grows with extra bookings, so count the levels within target
+    recommended = np.maximum((risk <= target_risk).sum(axis=1) - 1, 0)
+    rows = np.arange(len(risk))
+
+    summary = simulation['slots'].copy()
+    summary['recommended_extra'] = recommended
+    summary['overflow_risk'] = risk[rows, recommended]
+    summary['expected_idle'] = simulation['expected_idle'].to_numpy()[rows, recommended]
+    summary['idle_without_extra'] = simulation['expected_idle'].to_numpy()[:, 0]
+    return summary
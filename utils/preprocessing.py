@@ -0,0 +1,658 @@
+"""
+Preprocessing Utilities
+Serving-time version of the cleaning and feature engineering in notebook 02
+"""
+
+import threading
+
+import numpy as np
+import pandas as pd
+
+from utils.calendar_features import CALENDAR_FEATURES, add_calendar_features
+
+# Columns of data/raw/Medical_appointment_data.csv
+RAW_COLUMNS = [
+    'specialty', 'appointment_time', 'gender', 'appointment_date_continuous', 'age',
+    'under_12_years_old', 'over_60_years_old', 'patient_needs_companion',
+    'Hipertension', 'Diabetes', 'Alcoholism', 'Handcap', 'Scholarship', 'SMS_received',
+    'disability', 'place', 'appointment_shift',
+    'average_temp_day', 'average_rain_day', 'max_temp_day', 'max_rain_day',
+    'rainy_day_before', 'storm_day_before', 'rain_intensity', 'heat_intensity', 'no_show'
+]
+
+WEATHER_COLS = ['average_temp_day', 'average_rain_day', 'max_temp_day', 'max_rain_day']
+HEALTH_COLS = ['Hipertension', 'Diabetes', 'Alcoholism', 'Handcap']
+
+# First appointment date in the training data (origin of days_since_start)
+DATA_START_DATE = pd.Timestamp('2020-01-01')
+
+# Overall no-show rate, used for groups without a historical rate
+DEFAULT_NOSHOW_RATE = 0.318
+
+# Median age after imputation in notebook 02
+DEFAULT_AGE = 12
+
+AGE_BINS = [0, 12, 18, 40, 60, 120]
+AGE_LABELS = ['Child (0-12)', 'Teen (13-18)', 'Adult (19-40)', 'Middle-Age (41-60)', 'Senior (60+)']
+
+HOUR_BINS = [0, 9, 12, 15, 24]
+HOUR_LABELS = ['Early Morning (6-9)', 'Morning (9-12)', 'Afternoon (12-15)', 'Late (15+)']
+
+# One-hot encoded (low cardinality) and label encoded (high cardinality) columns
+ONE_HOT_COLS = ['specialty', 'gender', 'disability', 'appointment_shift', 'rain_intensity',
+                'heat_intensity', 'age_group', 'sms_shift', 'hour_category', 'age_group_noshow_rate']
+LABEL_ENCODED_COLS = ['place', 'specialty_place', 'disability_age_group']
+
+# Code of label-encoded values the encoder has not seen (FeatureSchema's lower bound)
+UNKNOWN_CODE = -1
+
+# Group columns with a historical no-show rate feature
+RATE_GROUPS = ['specialty', 'place', 'disability']
+
+# Demand forecaster inputs (notebook 04 feature_cols)
+FORECAST_FEATURES = [
+    'average_temp_day', 'average_rain_day', 'max_temp_day', 'max_rain_day',
+    'day_of_week', 'month', 'quarter', 'is_weekend', 'is_hot_day', 'is_cold_day', 'is_rainy_day',
+    'lag_1', 'lag_7', 'lag_30', 'rolling_mean_7', 'rolling_mean_30', 'rolling_std_7', 'days_since_start'
+]
+
+# Forecaster inputs for models retrained with holiday and school-term features
+CALENDAR_FORECAST_FEATURES = FORECAST_FEATURES + CALENDAR_FEATURES
+
+# Largest batch whose aligned matrix is kept for reuse by FeatureSchema (the
+# command-line chunk size); bigger batches get a one-off matrix, so one large
+# call does not pin its memory on the thread for the life of the process
+MAX_BUFFER_ROWS = 50_000
+
+# Rows gathered into the buffer per step by FeatureSchema.align
+GATHER_BLOCK_ROWS = 4_096
+
+# Optional raw column identifying the patient (not in the notebook data), and
+# the per-patient history features joined from the feature store
+PATIENT_ID_COL = 'patient_id'
+HISTORY_FEATURES = ['prior_visits', 'prior_noshows', 'prior_noshow_rate', 'days_since_last_visit']
+
+# Visits at the overall rate that prior_noshow_rate is shrunk towards
+HISTORY_PRIOR_VISITS = 2
+
+# Streamlit form options -> values used in the raw data
+FORM_PLACES = {
+    'ITAJAÍ': 'ITAJAÍ',
+    'BALNEÁRIO CAMBORIÚ': 'B. CAMBORIU',
+    'CAMBORIÚ': 'CAMBORIU',
+    'NAVEGANTES': 'NAVEGANTES',
+    'PENHA': 'PENHA',
+    'BOMBINHAS': 'BOMBINHAS'
+}
+FORM_DISABILITIES = {'None': ' ', 'Motor': 'motor', 'Intellectual': 'intellectual'}
+FORM_SHIFT_HOURS = {'Morning': 8, 'Afternoon': 14}
+
+
+def clean_appointments(df):
+    """
+    Apply the notebook 02 cleaning rules to a raw appointment batch
+
+    Args:
+        df: DataFrame in the raw schema
+
+    Returns:
+        cleaned copy with 'appointment_date' parsed
+    """
+    df = df.copy()
+
+    df.loc[~df['gender'].isin(['M', 'F']), 'gender'] = 'M'
+    df['age'] = df['age'].where(df['age'].between(0, 120)).fillna(DEFAULT_AGE)
+
+    for col in ['specialty', 'disability', 'place']:
+        df[col] = df[col].fillna('Unknown')
+
+    df['appointment_date'] = pd.to_datetime(df['appointment_date_continuous'])
+
+    # Weather gaps: carry neighbouring days' values, as in notebook 02
+    if df[WEATHER_COLS].isnull().any().any():
+        order = df['appointment_date'].argsort(kind='stable').to_numpy()
+        filled = df[WEATHER_COLS].iloc[order].ffill().bfill()
+        df[WEATHER_COLS] = filled.sort_index()
+
+    return df
+
+
+def fit_noshow_rates(df):
+    """
+    Historical no-show rates per group, as computed in notebook 02
+
+    Args:
+        df: cleaned appointments with a 'no_show' ('yes'/'no') column
+
+    Returns:
+        dict group column -> dict of group value -> rate, plus 'overall'
+    """
+    target = (df['no_show'] == 'yes').astype(int)
+    rates = {col: target.groupby(df[col]).mean().to_dict() for col in RATE_GROUPS}
+    rates['overall'] = float(target.mean())
+    return rates
+
+
+def engineer_features(df, noshow_rates=None):
+    """
+    Create the notebook 02 engineered features for a cleaned batch
+
+    Args:
+        df: output of clean_appointments
+        noshow_rates: output of fit_noshow_rates (None -> overall default rate)
+
+    Returns:
+        copy of df with temporal, patient, interaction, rate and weather features
+    """
+    df = df.copy()
+    date = df['appointment_date']
+
+    # Temporal
+    df['year'] = date.dt.year
+    df['month'] = date.dt.month
+    df['quarter'] = date.dt.quarter
+    df['day_of_week'] = date.dt.dayofweek
+    df['week_of_year'] = date.dt.isocalendar().week.astype(int)
+    df['day_of_month'] = date.dt.day
+    df['is_weekend'] = (df['day_of_week'] >= 5).astype(int)
+    df['is_month_start'] = date.dt.is_month_start.astype(int)
+    df['is_month_end'] = date.dt.is_month_end.astype(int)
+    df['days_since_start'] = (date - DATA_START_DATE).dt.days
+
+    # Patient
+    df['age_group'] = pd.cut(df['age'], bins=AGE_BINS, labels=AGE_LABELS, include_lowest=True)
+    df['total_health_conditions'] = df[HEALTH_COLS].sum(axis=1)
+    df['has_any_condition'] = (df['total_health_conditions'] > 0).astype(int)
+    df['hour_category'] = pd.cut(df['appointment_time'], bins=HOUR_BINS, labels=HOUR_LABELS,
+                                 include_lowest=True)
+
+    # Interactions
+    df['specialty_place'] = df['specialty'] + '_' + df['place']
+    df['disability_age_group'] = df['disability'].astype(str) + '_' + df['age_group'].astype(str)
+    df['sms_shift'] = df['SMS_received'].astype(int).astype(str) + '_' + df['appointment_shift']
+
+    # Historical rates
+    rates = noshow_rates or {}
+    overall = rates.get('overall', DEFAULT_NOSHOW_RATE)
+    for col in RATE_GROUPS:
+        df[f'{col}_noshow_rate'] = df[col].map(rates.get(col, {})).astype(float).fillna(overall)
+
+    # Weather flags
+    for name, flag in weather_flags(df).items():
+        df[name] = flag
+    df['is_heavy_rain'] = (df['max_rain_day'] > 5).astype(int)
+
+    return df
+
+
+def add_history_features(df, history):
+    """
+    Add per-patient history features to an engineered batch
+
+    Args:
+        df: output of engineer_features
+        history: PatientFeatureStore.lookup result for df's rows (visits,
+            noshows, last_visit), looked up with before=the appointment dates
+            so no row sees its own or later outcomes
+
+    Returns:
+        copy of df with HISTORY_FEATURES; patients without history get 0
+        visits, the overall rate and -1 days since their last visit
+    """
+    df = df.copy()
+    visits = history['visits'].to_numpy(dtype=float)
+    noshows = history['noshows'].to_numpy(dtype=float)
+    df['prior_visits'] = visits
+    df['prior_noshows'] = noshows
+    df['prior_noshow_rate'] = ((noshows + HISTORY_PRIOR_VISITS * DEFAULT_NOSHOW_RATE)
+                               / (visits + HISTORY_PRIOR_VISITS))
+    days = (df['appointment_date'].to_numpy() - history['last_visit'].to_numpy()) / np.timedelta64(1, 'D')
+    # Only a history looked up without dates can end after the appointment
+    df['days_since_last_visit'] = np.where(np.isnan(days) | (days < 0), -1, days)
+    return df
+
+
+def safe_label_encode(encoder, values):
+    """LabelEncoder.transform that maps unseen values to UNKNOWN_CODE (-1) instead of raising"""
+    return CategoricalEncoder.lookup(CategoricalEncoder.table(encoder.classes_), pd.Series(values))
+
+
+def encode_features(df, feature_names, label_encoders, encoder=None):
+    """
+    Encode engineered features into the model's column layout
+
+    One-hot columns follow the dummy columns listed in feature_names (the
+    dropped first category is all zeros); high-cardinality columns use the
+    saved label encoders for both the raw and '_encoded' column.
+
+    Args:
+        df: output of engineer_features
+        feature_names: classifier feature names (feature_names.joblib)
+        label_encoders: dict from label_encoders.pkl
+        encoder: CategoricalEncoder compiled for feature_names and
+            label_encoders, to skip compiling one per call
+
+    Returns:
+        numeric DataFrame with exactly feature_names as columns
+    """
+    encoder = encoder or CategoricalEncoder.compile(feature_names, label_encoders)
+    return encoder.transform(df)
+
+
+def prepare_classifier_input(raw_df, feature_names, label_encoders, noshow_rates=None, history=None,
+                             encoder=None):
+    """
+    Full raw appointments -> classifier input pipeline
+
+    Args:
+        raw_df: DataFrame in the raw schema (no_show not required)
+        feature_names: classifier feature names
+        label_encoders: dict from label_encoders.pkl
+        noshow_rates: output of fit_noshow_rates, optional
+        history: per-patient aggregates for raw_df's rows, optional (see
+            add_history_features)
+        encoder: precompiled CategoricalEncoder, optional
+
+    Returns:
+        DataFrame aligned to feature_names
+    """
+    features = engineer_features(clean_appointments(raw_df), noshow_rates)
+    if history is not None:
+        features = add_history_features(features, history)
+    return encode_features(features, feature_names, label_encoders, encoder)
+
+
+def weather_flags(df):
+    """is_hot_day, is_cold_day and is_rainy_day (0/1) of rows with the daily weather columns"""
+    return {
+        'is_hot_day': (df['max_temp_day'] > 30).astype(int),
+        'is_cold_day': (df['average_temp_day'] < 15).astype(int),
+        'is_rainy_day': (df['average_rain_day'] > 0).astype(int)
+    }
+
+
+def rain_intensity(rain_mm):
+    """Approximate rain_intensity band for a daily rainfall (mm)"""
+    return np.select([rain_mm <= 0, rain_mm < 5, rain_mm < 25], ['no_rain', 'weak', 'moderate'], 'heavy')
+
+
+def heat_intensity(temp_c):
+    """Approximate heat_intensity band for a daily temperature (°C)"""
+    return np.select([temp_c < 12, temp_c < 18, temp_c < 26, temp_c < 32],
+                     ['heavy_cold', 'cold', 'mild', 'warm'], 'heavy_warm')
+
+
+def form_appointments(form, appointment_date=None):
+    """
+    Build raw appointments from No-Show Predictor form inputs, one per row
+
+    Args:
+        form: DataFrame with the single_appointment arguments as columns
+        appointment_date: date of the appointments (default: today)
+
+    Returns:
+        DataFrame in the raw schema, indexed like form
+    """
+    date = pd.Timestamp(appointment_date or pd.Timestamp.today().normalize())
+    age = form['age']
+    companion = (age <= 12) | (form['disability'] != 'None')
+    return pd.DataFrame({
+        'specialty': form['specialty'],
+        'appointment_time': form['shift'].map(FORM_SHIFT_HOURS),
+        'gender': form['gender'],
+        'appointment_date_continuous': date.strftime('%Y-%m-%d'),
+        'age': age,
+        'under_12_years_old': (age <= 12).astype(int),
+        'over_60_years_old': (age > 60).astype(int),
+        'patient_needs_companion': companion.astype(int),
+        'Hipertension': form['hipertension'].astype(int),
+        'Diabetes': form['diabetes'].astype(int),
+        'Alcoholism': form['alcoholism'].astype(int),
+        'Handcap': form['handcap'].astype(int),
+        'Scholarship': (form['scholarship'] == 'Yes').astype(int),
+        'SMS_received': (form['sms'] == 'Yes').astype(int),
+        'disability': form['disability'].map(FORM_DISABILITIES),
+        'place': form['place'].map(lambda place: FORM_PLACES.get(place, place)),
+        'appointment_shift': form['shift'].str.lower(),
+        'average_temp_day': form['temp'],
+        'average_rain_day': form['rain'],
+        'max_temp_day': form['temp'],
+        'max_rain_day': form['rain'],
+        'rainy_day_before': 0,
+        'storm_day_before': 0,
+        'rain_intensity': rain_intensity(form['rain'].to_numpy()),
+        'heat_intensity': heat_intensity(form['temp'].to_numpy())
+    }, index=form.index)
+
+
+def single_appointment(age, gender, scholarship, disability, hipertension, diabetes,
+                       alcoholism, handcap, specialty, place, shift, sms, temp, rain,
+                       appointment_date=None):
+    """
+    Build a one-row raw appointment from the No-Show Predictor form inputs
+
+    Args:
+        form values as shown in pages/1_NoShow_Predictor.py ('Yes'/'No',
+        'Morning'/'Afternoon', display place and disability names)
+        appointment_date: date of the appointment (default: today)
+
+    Returns:
+        one-row DataFrame in the raw schema
+    """
+    form = pd.DataFrame([{
+        'age': age, 'gender': gender, 'scholarship': scholarship, 'disability': disability,
+        'hipertension': hipertension, 'diabetes': diabetes, 'alcoholism': alcoholism, 'handcap': handcap,
+        'specialty': specialty, 'place': place, 'shift': shift, 'sms': sms, 'temp': temp, 'rain': rain
+    }])
+    return form_appointments(form, appointment_date)
+
+
+def build_daily_series(raw_df):
+    """
+    Aggregate raw appointments into the notebook 02 daily time series
+
+    Args:
+        raw_df: DataFrame in the raw schema
+
+    Returns:
+        one row per appointment date with daily_appointments, daily weather,
+        calendar flags, lags and rolling statistics (see FORECAST_FEATURES),
+        plus the holiday, bridge-day and school-term CALENDAR_FEATURES
+    """
+    df = pd.DataFrame({
+        'appointment_date': pd.to_datetime(raw_df['appointment_date_continuous']).to_numpy()
+    })
+    df[WEATHER_COLS] = raw_df[WEATHER_COLS].ffill().bfill().to_numpy()
+
+    ts = df.groupby('appointment_date').agg(
+        daily_appointments=('appointment_date', 'size'),
+        average_temp_day=('average_temp_day', 'mean'),
+        average_rain_day=('average_rain_day', 'mean'),
+        max_temp_day=('max_temp_day', 'max'),
+        max_rain_day=('max_rain_day', 'max')
+    ).reset_index()
+
+    date = ts['appointment_date']
+    ts['day_of_week'] = date.dt.dayofweek
+    ts['month'] = date.dt.month
+    ts['quarter'] = date.dt.quarter
+    ts['is_weekend'] = (ts['day_of_week'] >= 5).astype(int)
+    for name, flag in weather_flags(ts).items():
+        ts[name] = flag
+    ts = add_calendar_features(ts)
+
+    demand = ts['daily_appointments']
+    for lag in (1, 7, 30):
+        ts[f'lag_{lag}'] = demand.shift(lag)
+    ts['rolling_mean_7'] = demand.rolling(window=7, min_periods=1).mean()
+    ts['rolling_mean_30'] = demand.rolling(window=30, min_periods=1).mean()
+    ts['rolling_std_7'] = demand.rolling(window=7, min_periods=1).std()
+    # Fixed origin, as in training: a recent window must not restart the trend at 0
+    ts['days_since_start'] = (date - DATA_START_DATE).dt.days
+
+    return ts
+
+
+
+def forecast_days(dates, weekday_volumes, weather):
+    """
+    Forecaster input rows for future dates, from the Demand Forecaster form
+
+    The app has no recent daily series, so the lag and rolling features
+    describe a typical run-up: the demand of every earlier day is taken
+    from weekday_volumes.
+
+    Args:
+        dates: dates to forecast
+        weekday_volumes: typical daily appointments by weekday, Monday first
+        weather: dict of WEATHER_COLS values for every date, or a DataFrame
+            of WEATHER_COLS with one row per date
+
+    Returns:
+        DataFrame with appointment_date and FORECAST_FEATURES, one row per
+        date (calendar features are filled by ModelLoader.forecast_horizon)
+    """
+    dates = pd.DatetimeIndex(pd.to_datetime(dates)).normalize()
+    volumes = np.asarray(weekday_volumes, dtype=float)
+    if isinstance(weather, dict):
+        weather = pd.DataFrame([weather] * len(dates))
+
+    def days_before(days):
+        return volumes[(dates - pd.Timedelta(days=days)).dayofweek]
+
+    ts = pd.DataFrame({'appointment_date': dates})
+    ts[WEATHER_COLS] = weather[WEATHER_COLS].to_numpy(dtype=float)
+    ts['day_of_week'] = dates.dayofweek
+    ts['month'] = dates.month
+    ts['quarter'] = dates.quarter
+    ts['is_weekend'] = (ts['day_of_week'] >= 5).astype(int)
+    for name, flag in weather_flags(ts).items():
+        ts[name] = flag
+    for lag in (1, 7, 30):
+        ts[f'lag_{lag}'] = days_before(lag)
+    # Any 7 consecutive days cover every weekday once
+    ts['rolling_mean_7'] = volumes.mean()
+    ts['rolling_mean_30'] = np.mean([days_before(days) for days in range(30)], axis=0)
+    ts['rolling_std_7'] = volumes.std(ddof=1)
+    ts['days_since_start'] = (dates - DATA_START_DATE).days
+    return ts[['appointment_date'] + FORECAST_FEATURES]
+
+class FeatureSchema:
+    """
+    Compiled description of the classifier's input columns
+
+    Holds the column index map, the valid range of every column (one-hot
+    columns are 0/1, label-encoded columns are integer codes with -1 for
+    unseen values) and a per-thread float32 buffer, so a batch is aligned with
+    one column gather and validated with a few vectorized comparisons.
+    """
+
+    def __init__(self, features, lower, upper, integer_mask):
+        self.features = list(features)
+        self.columns = pd.Index(self.features)
+        self.index = {name: i for i, name in enumerate(self.features)}
+        self.lower = np.asarray(lower, dtype=np.float32)
+        self.upper = np.asarray(upper, dtype=np.float32)
+        self.integer_mask = np.asarray(integer_mask, dtype=bool)
+        self._buffers = threading.local()
+
+    @classmethod
+    def compile(cls, features, label_encoders=None):
+        """
+        Build the schema for a feature list
+
+        Args:
+            features: classifier feature names
+            label_encoders: dict from label_encoders.pkl (bounds the code columns)
+
+        Returns:
+            FeatureSchema
+        """
+        n = len(features)
+        lower = np.full(n, -np.inf)
+        upper = np.full(n, np.inf)
+        integer_mask = np.zeros(n, dtype=bool)
+
+        one_hot_prefixes = tuple(col + '_' for col in ONE_HOT_COLS)
+        # Target-rate columns share a prefix with the specialty/disability dummies
+        rate_columns = {f'{col}_noshow_rate' for col in RATE_GROUPS}
+        for i, name in enumerate(features):
+            base = name[:-len('_encoded')] if name.endswith('_encoded') else name
+            if base in LABEL_ENCODED_COLS:
+                integer_mask[i] = True
+                lower[i] = -1
+                if label_encoders is not None and base in label_encoders:
+                    upper[i] = len(label_encoders[base].classes_) - 1
+            elif name.startswith(one_hot_prefixes) and name not in rate_columns:
+                integer_mask[i] = True
+                lower[i], upper[i] = 0, 1
+
+        return cls(features, lower, upper, integer_mask)
+
+    def _buffer(self, n_rows):
+        """Reusable (n_rows, n_features) float32 matrix for the calling thread (up to MAX_BUFFER_ROWS)"""
+        if n_rows > MAX_BUFFER_ROWS:
+            return np.empty((n_rows, len(self.features)), dtype=np.float32)
+        buffer = getattr(self._buffers, 'matrix', None)
+        if buffer is None or buffer.shape[0] < n_rows:
+            buffer = np.empty((max(n_rows, 1), len(self.features)), dtype=np.float32)
+            self._buffers.matrix = buffer
+        return buffer[:n_rows]
+
+    def align(self, data):
+        """
+        Align and validate a batch against the schema
+
+        Args:
+            data: DataFrame containing (at least) the schema columns in any
+                order, or an array already in schema column order
+
+        Returns:
+            (matrix, valid): float32 (n_rows, n_features) view of a per-thread
+            buffer, reused by the next call on the same thread (a fresh array
+            above MAX_BUFFER_ROWS rows), and a boolean mask of rows that passed
+            validation
+        """
+        if isinstance(data, pd.DataFrame):
+            positions = data.columns.get_indexer(self.columns)
+            if (positions < 0).any():
+                missing = self.columns[positions < 0].tolist()
+                raise ValueError(f"Input is missing {len(missing)} feature columns, e.g. {missing[:5]}")
+            if data.shape[1] != len(positions):
+                # Other columns (of any type) are left behind rather than converted
+                data, positions = data.iloc[:, positions], None
+            # A view of the frame's values when it is a single numeric block
+            values = data.to_numpy()
+        else:
+            values = np.asarray(data)
+            if values.ndim != 2 or values.shape[1] != len(self.features):
+                raise ValueError(f"Expected {len(self.features)} columns, got shape {values.shape}")
+            positions = None
+
+        matrix = self._buffer(values.shape[0])
+        # Gathered and cast straight into the buffer, a block of rows at a time so the
+        # temporary of a reordering cast stays small
+        for start in range(0, values.shape[0], GATHER_BLOCK_ROWS):
+            block = values[start:start + GATHER_BLOCK_ROWS]
+            np.copyto(matrix[start:start + GATHER_BLOCK_ROWS], block if positions is None else block[:, positions],
+                      casting='unsafe')
+
+        with np.errstate(invalid='ignore'):
+            valid = np.isfinite(matrix).all(axis=1)
+            valid &= ((matrix >= self.lower) & (matrix <= self.upper)).all(axis=1)
+            codes = matrix[:, self.integer_mask]
+            valid &= (codes == np.round(codes)).all(axis=1)
+        return matrix, valid
+
+
+class CategoricalEncoder:
+    """
+    Compiled label-encoder and one-hot transforms for the classifier's columns
+
+    Every categorical column has a precomputed hash table (value -> position)
+    of its known values: LabelEncoder classes for the label-encoded columns, and
+    for one-hot columns the categories whose dummy is in feature_names. A
+    batch is encoded by looking up each distinct value once and writing into
+    a preallocated matrix: codes for label-encoded columns (UNKNOWN_CODE for
+    unseen values), a 1 at the dummy's fixed position for one-hot columns.
+    The output has every feature_names column whichever categories the batch
+    contains; the dropped first category and unseen values are all zeros, as
+    with pd.get_dummies(drop_first=True) reindexed to the training columns.
+    """
+
+    def __init__(self, features, label_tables, one_hot_tables, passthrough):
+        self.features = list(features)
+        self.label_tables = label_tables
+        self.one_hot_tables = one_hot_tables
+        self.passthrough = passthrough
+
+    @classmethod
+    def compile(cls, features, label_encoders):
+        """
+        Build the lookup tables for a feature list
+
+        Args:
+            features: classifier feature names
+            label_encoders: dict from label_encoders.pkl
+
+        Returns:
+            CategoricalEncoder
+        """
+        index = {name: i for i, name in enumerate(features)}
+        claimed = set()
+
+        # col -> (classes, output positions of col and col_encoded)
+        label_tables = {}
+        for col in LABEL_ENCODED_COLS:
+            positions = [index[name] for name in (col, col + '_encoded') if name in index]
+            if positions:
+                label_tables[col] = (cls.table(label_encoders[col].classes_), np.array(positions))
+                claimed.update(positions)
+
+        # (source column, categories, output position of each category's dummy);
+        # longest prefix first so age_group_noshow_rate_* are not age_group dummies
+        rate_columns = {f'{col}_noshow_rate' for col in RATE_GROUPS}
+        one_hot_tables = []
+        for col in sorted(ONE_HOT_COLS, key=len, reverse=True):
+            prefix = col + '_'
+            names = [name for name in features
+                     if name.startswith(prefix) and name not in rate_columns and index[name] not in claimed]
+            if not names:
+                continue
+            source, categories = col, [name[len(prefix):] for name in names]
+            if col == 'age_group_noshow_rate':
+                # One dummy per age group after the first, in AGE_LABELS order
+                source, categories = 'age_group', AGE_LABELS[1:len(names) + 1]
+                names = names[:len(categories)]
+            positions = np.array([index[name] for name in names])
+            one_hot_tables.append((source, cls.table(categories), positions))
+            claimed.update(positions.tolist())
+
+        passthrough = [(name, i) for name, i in index.items() if i not in claimed]
+        return cls(features, label_tables, one_hot_tables, passthrough)
+
+    @staticmethod
+    def table(values):
+        """Hash table from each value (as a string) to its position"""
+        return {value: i for i, value in enumerate(np.asarray(values, dtype=str).tolist())}
+
+    @staticmethod
+    def lookup(table, values):
+        """
+        Position of each value in table, UNKNOWN_CODE if absent
+
+        Values are compared as strings (missing values as 'nan'); each
+        distinct value is hashed once.
+        """
+        codes, uniques = pd.factorize(values)
+        keys = np.asarray(uniques, dtype=str).tolist() + ['nan']
+        # Missing values have code -1, which picks the trailing 'nan' entry
+        positions = np.array([table.get(key, UNKNOWN_CODE) for key in keys], dtype=np.int64)
+        return positions[codes]
+
+    def transform(self, df, dtype=np.float64):
+        """
+        Encode an engineered batch
+
+        Args:
+            df: output of engineer_features
+            dtype: output dtype
+
+        Returns:
+            DataFrame indexed like df with exactly the feature columns;
+            numeric features missing from df are zeros
+        """
+        n_rows = len(df)
+        matrix = np.zeros((n_rows, len(self.features)), dtype=dtype)
+        present = [(name, i) for name, i in self.passthrough if name in df]
+        if present:
+            names, positions = zip(*present)
+            matrix[:, list(positions)] = df[list(names)].to_numpy(dtype=dtype)
+        for col, (classes, positions) in self.label_tables.items():
+            matrix[:, positions] = self.lookup(classes, df[col])[:, np.newaxis]
+        rows = np.arange(n_rows)
+        for source, categories, positions in self.one_hot_tables:
+            hits = self.lookup(categories, df[source])
+            known = hits >= 0
+            matrix[rows[known], positions[hits[known]]] = 1
+        return pd.DataFrame(matrix, columns=self.features, index=df.index)
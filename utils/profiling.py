@@ -0,0 +1,152 @@
+"""
+Profiling Utilities
+Opt-in per-section wall time and allocation tracking for Streamlit script runs
+"""
+
+import os
+import io
+import json
+import time
+import cProfile
+import pstats
+import tracemalloc
+from datetime import datetime
+
+import streamlit as st
+
+# Enable with PAGE_PROFILE=1 or by opening a page with ?profile=1
+PROFILE_ENV = 'PAGE_PROFILE'
+PROFILE_DIR_ENV = 'PAGE_PROFILE_DIR'
+PROFILE_QUERY_PARAM = 'profile'
+DEFAULT_PROFILE_DIR = 'profiles'
+
+# Allocation sites are reported per line, so one frame is enough (and far cheaper)
+TRACEMALLOC_FRAMES = 1
+TOP_ALLOCATIONS = 25
+TOP_FUNCTIONS = 15
+
+
+def profiling_requested():
+    """True if the env var or the page's query string asks for profiling"""
+    if os.environ.get(PROFILE_ENV, '').lower() in ('1', 'true', 'yes'):
+        return True
+    try:
+        return st.query_params.get(PROFILE_QUERY_PARAM, '').lower() in ('1', 'true', 'yes')
+    except Exception:
+        return False
+
+
+class PageProfiler:
+    """
+    Section timer for one script run
+
+    Call mark() at each section boundary and finish() at the end of the page.
+    Each section records wall time, net allocated memory and peak memory
+    (tracemalloc). finish() shows a summary panel and writes the run's cProfile
+    stats (.prof), top allocation sites (.alloc.txt) and section table
+    (.sections.json) to PAGE_PROFILE_DIR. Profiled runs are slower than normal
+    ones, most of all in allocation-heavy code; compare sections with each
+    other rather than with unprofiled timings. When profiling is off, every
+    method returns immediately.
+    """
+
+    def __init__(self, page, enabled=None, output_dir=None):
+        self.page = page
+        self.enabled = profiling_requested() if enabled is None else enabled
+        self.output_dir = output_dir or os.environ.get(PROFILE_DIR_ENV, DEFAULT_PROFILE_DIR)
+        self.sections = []
+        self._current = None
+        self._profile = None
+        self._owns_tracemalloc = False
+        if self.enabled:
+            self._start()
+
+    def _start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+            self._owns_tracemalloc = True
+        self._profile = cProfile.Profile()
+        try:
+            self._profile.enable()
+        except ValueError:
+            # Another profiler is already active (e.g. a concurrent profiled session)
+            self._profile = None
+        self._run_start = time.perf_counter()
+
+    def mark(self, name):
+        """End the current section and start timing a new one"""
+        if not self.enabled:
+            return
+        self._close(time.perf_counter())
+        memory, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        self._current = (name, time.perf_counter(), memory)
+
+    def _close(self, now):
+        if self._current is None:
+            return
+        name, start, memory_start = self._current
+        memory, peak = tracemalloc.get_traced_memory()
+        self.sections.append({
+            'section': name,
+            'wall_ms': (now - start) * 1000,
+            'allocated_kb': (memory - memory_start) / 1024,
+            'peak_kb': (peak - memory_start) / 1024
+        })
+        self._current = None
+
+    def finish(self):
+        """
+        Close the last section, dump the profiles to disk and show the summary panel
+
+        Returns:
+            DataFrame of sections (None when profiling is off)
+        """
+        if not self.enabled:
+            return None
+        import pandas as pd
+
+        self._close(time.perf_counter())
+        total_ms = (time.perf_counter() - self._run_start) * 1000
+        if self._profile is not None:
+            self._profile.disable()
+        snapshot = tracemalloc.take_snapshot()
+        if self._owns_tracemalloc:
+            tracemalloc.stop()
+
+        summary = pd.DataFrame(self.sections, columns=['section', 'wall_ms', 'allocated_kb', 'peak_kb'])
+        paths = self._dump(summary, snapshot, total_ms)
+        self._render(summary, total_ms, paths)
+        return summary
+
+    def _dump(self, summary, snapshot, total_ms):
+        os.makedirs(self.output_dir, exist_ok=True)
+        stem = os.path.join(self.output_dir, f"{self.page}-{datetime.now():%Y%m%d-%H%M%S-%f}")
+        paths = {}
+
+        if self._profile is not None:
+            paths['cprofile'] = stem + '.prof'
+            self._profile.dump_stats(paths['cprofile'])
+
+        paths['allocations'] = stem + '.alloc.txt'
+        with open(paths['allocations'], 'w', encoding='utf-8') as f:
+            for stat in snapshot.statistics('lineno')[:TOP_ALLOCATIONS]:
+                f.write(f"{stat}\n")
+
+        paths['sections'] = stem + '.sections.json'
+        with open(paths['sections'], 'w', encoding='utf-8') as f:
+            json.dump({'page': self.page, 'total_ms': total_ms, 'sections': summary.to_dict('records')}, f,
+                      indent=2)
+        return paths
+
+    def _render(self, summary, total_ms, paths):
+        with st.expander(f"⏱️ Profile of this run: {total_ms:.0f} ms", expanded=True):
+            st.dataframe(
+                summary.style.format({'wall_ms': '{:.1f}', 'allocated_kb': '{:,.0f}', 'peak_kb': '{:,.0f}'}),
+                use_container_width=True, hide_index=True
+            )
+            if self._profile is not None:
+                text = io.StringIO()
+                pstats.Stats(self._profile, stream=text).sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
+                st.code(text.getvalue(), language=None)
+            st.caption("Saved: " + ", ".join(f"`{path}`" for path in paths.values()))
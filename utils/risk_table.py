@@ -0,0 +1,253 @@
+"""
+Risk Table Utilities
+Precomputed no-show probabilities for every No-Show Predictor form input, per appointment date
+
+Usage:
+    python -m utils.risk_table build [--days 7] [--start 2026-01-31]
+
+scores the form's whole input space through the active classifier and saves one
+array per date under models/risk_tables/<model fingerprint>/. Tables of other
+models are removed, so a new model version never serves an old table.
+"""
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import threading
+from itertools import product
+
+import numpy as np
+import pandas as pd
+
+from utils.model_loader import CLASSIFIER_ARTIFACTS, LEGACY_FILES, ModelLoader
+from utils.preprocessing import FORM_DISABILITIES, FORM_PLACES, FORM_SHIFT_HOURS, form_appointments
+
+TABLES_DIR = 'risk_tables'
+AXES_FILE = 'axes.json'
+
+# Probabilities are stored as uint16 (resolution 1/65535)
+SCALE = np.iinfo(np.uint16).max
+
+FORM_SPECIALTIES = ['physiotherapy', 'psychotherapy', 'speech therapy', 'occupational therapy',
+                    'pedagogo', 'assist']
+
+# Form inputs with few values, enumerated exactly
+DISCRETE_AXES = {
+    'place': list(FORM_PLACES),
+    'specialty': FORM_SPECIALTIES,
+    'shift': list(FORM_SHIFT_HOURS),
+    'sms': ['Yes', 'No'],
+    'disability': list(FORM_DISABILITIES),
+    'gender': ['M', 'F'],
+    'scholarship': ['No', 'Yes'],
+    'hipertension': [False, True],
+    'diabetes': [False, True],
+    'alcoholism': [False, True],
+    'handcap': [0, 1, 2, 3, 4]
+}
+
+# Slider inputs, binned: (lower bound of each bin, value scored for the bin).
+# Bin edges follow the feature thresholds in preprocessing (age groups, the
+# heat/rain intensity bands and the hot/cold/heavy-rain flags), so every
+# value in a bin gets the same engineered categories as its representative.
+# The forest also splits on the raw age, temperature and rain columns, so
+# other values in a bin can score differently: for these inputs the table
+# approximates the model with its score at the representative value.
+BINNED_AXES = {
+    'age': ([0, 6, 13, 19, 41, 61], [3, 9, 16, 30, 50, 72]),
+    'temp': ([10, 12, 15, 18, 26, 31, 32], [11, 13, 16, 22, 28, 31, 35]),
+    'rain': ([0, 1, 5, 6, 25], [0, 2, 5, 12, 35])
+}
+
+AXES = list(DISCRETE_AXES) + list(BINNED_AXES)
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def model_fingerprint(loader):
+    """
+    Name that changes whenever the classifier's predictions could change
+
+    The model version for versioned models (legacy files are fingerprinted by
+    size and modification time, including artifacts such as noshow_rates.joblib
+    that feed the features), plus the label encoders file.
+    """
+    version = loader.version
+    paths = [loader.encoders_path]
+    if version == 'legacy':
+        paths.append(os.path.join(loader.models_dir, LEGACY_FILES['classifier'][0]))
+        artifacts = [os.path.join(loader.models_dir, filename) for filename in CLASSIFIER_ARTIFACTS.values()]
+        paths.extend(path for path in artifacts if os.path.exists(path))
+    digest = hashlib.sha256()
+    for path in paths:
+        stat = os.stat(path)
+        digest.update(f'{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns};'.encode())
+    return f'{version}-{digest.hexdigest()[:10]}'
+
+
+def form_grid(axes):
+    """Form inputs for every combination of axes values, in C order"""
+    values = [DISCRETE_AXES[axis] if axis in DISCRETE_AXES else BINNED_AXES[axis][1] for axis in axes]
+    return pd.DataFrame(list(product(*values)), columns=axes)
+
+
+class RiskTable:
+    """
+    No-show probabilities on the form's input grid for one model and date
+
+    Lookups are plain array indexing (no pandas, no model call), so the form
+    gets an answer in microseconds. It is the model's exact score for the
+    discrete inputs, but age, temperature and rain are scored at one value
+    per band (see BINNED_AXES), so the table approximates the model there.
+    """
+
+    def __init__(self, probabilities, fingerprint, date):
+        self.probabilities = probabilities
+        self.fingerprint = fingerprint
+        self.date = date
+
+    @classmethod
+    def build(cls, loader, date):
+        """Score the whole grid through the loader's classifier"""
+        loader = loader.pinned()
+        shape = [len(DISCRETE_AXES[axis]) if axis in DISCRETE_AXES else len(BINNED_AXES[axis][1])
+                 for axis in AXES]
+        probabilities = np.empty(shape, dtype=np.uint16)
+
+        # One (place, specialty) slice at a time keeps the raw frame small
+        rest = form_grid(AXES[2:])
+        for i, place in enumerate(DISCRETE_AXES['place']):
+            for j, specialty in enumerate(DISCRETE_AXES['specialty']):
+                form = rest.assign(place=place, specialty=specialty)
+                scores = loader.score_noshow(loader.prepare_classifier_input(form_appointments(form, date)))
+                proba = scores['noshow_probability'].to_numpy()
+                probabilities[i, j] = np.rint(proba * SCALE).astype(np.uint16).reshape(shape[2:])
+        return cls(probabilities, model_fingerprint(loader), pd.Timestamp(date).strftime('%Y-%m-%d'))
+
+    def index(self, **form):
+        """Grid position of one set of form inputs"""
+        position = []
+        for axis in AXES:
+            value = form[axis]
+            if axis in DISCRETE_AXES:
+                position.append(DISCRETE_AXES[axis].index(value))
+            else:
+                lower_bounds = BINNED_AXES[axis][0]
+                position.append(max(np.searchsorted(lower_bounds, value, side='right') - 1, 0))
+        return tuple(position)
+
+    def lookup(self, **form):
+        """
+        No-show probability for one set of form inputs
+
+        Args:
+            the single_appointment form values (age, gender, ..., temp, rain)
+        """
+        return float(self.probabilities[self.index(**form)]) / SCALE
+
+    def save(self, models_dir):
+        directory = os.path.join(models_dir, TABLES_DIR, self.fingerprint)
+        os.makedirs(directory, exist_ok=True)
+        axes_path = os.path.join(directory, AXES_FILE)
+        if not os.path.exists(axes_path):
+            with open(axes_path, 'w') as f:
+                json.dump({'fingerprint': self.fingerprint, 'axes': AXES, 'discrete': DISCRETE_AXES,
+                           'binned': BINNED_AXES}, f, indent=2)
+        path = os.path.join(directory, f'{self.date}.npy')
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.save(f, self.probabilities)
+        os.replace(tmp_path, path)
+        return path
+
+    @classmethod
+    def load(cls, models_dir, fingerprint, date):
+        """Saved table (memory-mapped), or None if there is none for this model and date"""
+        date = pd.Timestamp(date).strftime('%Y-%m-%d')
+        directory = os.path.join(models_dir, TABLES_DIR, fingerprint)
+        path = os.path.join(directory, f'{date}.npy')
+        if not os.path.exists(path):
+            return None
+        with open(os.path.join(directory, AXES_FILE)) as f:
+            if json.load(f)['axes'] != AXES:
+                return None
+        return cls(np.load(path, mmap_mode='r'), fingerprint, date)
+
+
+def table_for(loader, date=None):
+    """
+    Cached RiskTable for the loader's active classifier and a date (default: today)
+
+    Returns None when no table was built for this model and date; callers
+    fall back to the model itself.
+    """
+    date = pd.Timestamp(date or pd.Timestamp.today().normalize()).strftime('%Y-%m-%d')
+    try:
+        key = (loader.models_dir, model_fingerprint(loader), date)
+    except OSError:
+        return None
+    with _cache_lock:
+        if key not in _cache:
+            table = RiskTable.load(*key)
+            if table is None:
+                return None
+            _cache.clear()
+            _cache[key] = table
+        return _cache[key]
+
+
+def build_tables(loader, start=None, days=1, progress=print):
+    """
+    Build and save tables for days consecutive dates
+
+    Tables of other models and of dates before start are removed.
+
+    Returns:
+        list of saved paths
+    """
+    start = pd.Timestamp(start or pd.Timestamp.today().normalize())
+    fingerprint = model_fingerprint(loader)
+    root = os.path.join(loader.models_dir, TABLES_DIR)
+    if os.path.isdir(root):
+        for name in os.listdir(root):
+            if name != fingerprint:
+                shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+        directory = os.path.join(root, fingerprint)
+        for name in os.listdir(directory) if os.path.isdir(directory) else []:
+            if name.endswith('.npy') and name[:-len('.npy')] < start.strftime('%Y-%m-%d'):
+                os.remove(os.path.join(directory, name))
+
+    paths = []
+    for date in pd.date_range(start, periods=days):
+        started = time.perf_counter()
+        table = RiskTable.build(loader, date)
+        paths.append(table.save(loader.models_dir))
+        if progress:
+            progress(f"{table.date}: {table.probabilities.size:,} cells in "
+                     f"{time.perf_counter() - started:.1f}s -> {paths[-1]}")
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute No-Show Predictor risk tables")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = commands.add_parser('build', help='score the form input grid for upcoming dates')
+    build_parser.add_argument('--start', help='first date (default: today)')
+    build_parser.add_argument('--days', type=int, default=7, help='number of consecutive dates')
+    build_parser.add_argument('--models-dir', default='models')
+    build_parser.add_argument('--encoders', default=os.path.join('data', 'processed', 'label_encoders.pkl'))
+    args = parser.parse_args()
+
+    loader = ModelLoader(args.models_dir, args.encoders)
+    if not (loader.load_classifier() and loader.load_preprocessing()):
+        raise SystemExit(1)
+    build_tables(loader, args.start, args.days)
+
+
+if __name__ == '__main__':
+    main()
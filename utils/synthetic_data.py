@@ -0,0 +1,547 @@
+"""
+Synthetic Data Utilities
+Raw-schema appointment generator for offline benchmarks and load tests
+"""
+
+import os
+import argparse
+import joblib
+import numpy as np
+import pandas as pd
+
+from utils.preprocessing import (
+    AGE_BINS, AGE_LABELS, HEALTH_COLS, LABEL_ENCODED_COLS, RAW_COLUMNS, WEATHER_COLS, DATA_START_DATE,
+    heat_intensity, rain_intensity
+)
+
+# Category mix of the cleaned data in notebook 02 (None = missing in the raw file)
+SPECIALTY_MIX = {
+    'psychotherapy': 28642, 'speech therapy': 22321, 'physiotherapy': 21001, None: 20100,
+    'occupational therapy': 11318, 'pedagogo': 3535, 'enf': 1681, 'assist': 635,
+    'sem especialidade': 324
+}
+PLACE_MIX = {
+    'ITAJAÍ': 20512, None: 11509, 'B. CAMBORIU': 6018, 'CAMBORIU': 5523, 'NAVEGANTES': 3901,
+    'ITAPEMA': 2665, 'BOMBINHAS': 1707, 'PENHA': 1038, 'PORTO BELO': 950, 'BALN. PIÇARRAS': 943
+}
+DISABILITY_MIX = {'intellectual': 62847, 'motor': 29720, None: 16571, ' ': 419}
+
+# Median age per specialty (notebook 02 imputation table)
+SPECIALTY_MEDIAN_AGE = {
+    'assist': 19, 'enf': 50, 'occupational therapy': 10, 'pedagogo': 12,
+    'physiotherapy': 18, 'psychotherapy': 12, 'speech therapy': 8, 'sem especialidade': 12
+}
+
+# Historical no-show rates by specialty (range 0.16-0.53 in notebook 02)
+SPECIALTY_NOSHOW_RATE = {
+    'assist': 0.16, 'enf': 0.22, 'occupational therapy': 0.30, 'pedagogo': 0.35,
+    'physiotherapy': 0.27, 'psychotherapy': 0.38, 'speech therapy': 0.33, 'sem especialidade': 0.53
+}
+
+MISSING_AGE_RATE = 0.21
+MISSING_WEATHER_RATE = 0.02
+
+# Relative appointment volume by weekday (Mon..Sun)
+WEEKDAY_WEIGHTS = np.array([1.0, 1.0, 1.0, 1.0, 0.9, 0.1, 0.02])
+
+# Days from DATA_START_DATE to the last date in the raw file (2021-05-12)
+DEFAULT_DAYS = 498
+
+
+def _mix(rng, mix, n):
+    """Draw n values from a {value: count} category mix"""
+    values = list(mix)
+    weights = np.array(list(mix.values()), dtype=float)
+    codes = rng.choice(len(values), size=n, p=weights / weights.sum())
+    return np.array(values, dtype=object)[codes]
+
+
+def daily_weather(n_days, start_date=DATA_START_DATE, seed=42):
+    """
+    Seasonal daily weather for the Itajaí region
+
+    Args:
+        n_days: number of consecutive days
+        start_date: first date
+        seed: random seed
+
+    Returns:
+        DataFrame indexed by date with the raw weather columns
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(start_date, periods=n_days, freq='D')
+
+    # Southern hemisphere: warmest mid-January, coldest mid-July
+    season = np.cos(2 * np.pi * (dates.dayofyear.to_numpy() - 15) / 365.25)
+    average_temp = 20.5 + 4.5 * season + rng.normal(0, 1.8, n_days)
+    rains = rng.random(n_days) < 0.45
+    average_rain = np.where(rains, rng.gamma(0.8, 6.0, n_days), 0.0)
+    max_rain = average_rain * rng.uniform(1.5, 3.0, n_days)
+
+    weather = pd.DataFrame({
+        'average_temp_day': average_temp.round(1),
+        'average_rain_day': average_rain.round(1),
+        'max_temp_day': (average_temp + rng.uniform(2, 6, n_days)).round(1),
+        'max_rain_day': max_rain.round(1)
+    }, index=dates)
+    weather['rainy_day_before'] = (weather['average_rain_day'].shift(1) > 0).astype(int)
+    weather['storm_day_before'] = (weather['max_rain_day'].shift(1) > 25).astype(int)
+    weather['rain_intensity'] = rain_intensity(weather['average_rain_day'].to_numpy())
+    weather['heat_intensity'] = heat_intensity(weather['average_temp_day'].to_numpy())
+    return weather
+
+
+def generate_appointments(n_rows, seed=42, start_date=DATA_START_DATE, n_days=DEFAULT_DAYS):
+    """
+    Generate raw-schema appointments with the mix and missingness of the real data
+
+    Args:
+        n_rows: number of appointments
+        seed: random seed
+        start_date: first appointment date
+        n_days: number of days the appointments are spread over
+
+    Returns:
+        DataFrame with RAW_COLUMNS (including no_show 'yes'/'no')
+    """
+    rng = np.random.default_rng(seed)
+    weather = daily_weather(n_days, start_date, seed)
+
+    day_weights = WEEKDAY_WEIGHTS[weather.index.dayofweek]
+    day = rng.choice(n_days, size=n_rows, p=day_weights / day_weights.sum())
+
+    specialty = _mix(rng, SPECIALTY_MIX, n_rows)
+    known_specialty = pd.Series(specialty).fillna('sem especialidade')
+    median_age = known_specialty.map(SPECIALTY_MEDIAN_AGE).to_numpy(dtype=float)
+    age = np.clip(np.round(median_age * rng.lognormal(0, 0.6, n_rows)), 0, 100)
+    age[rng.random(n_rows) < MISSING_AGE_RATE] = np.nan
+
+    appointment_time = rng.integers(7, 18, n_rows)
+    known_age = np.nan_to_num(age, nan=12)
+    df = pd.DataFrame({
+        'specialty': specialty,
+        'appointment_time': appointment_time,
+        'gender': np.where(rng.random(n_rows) < 0.55, 'M', 'F'),
+        'appointment_date_continuous': weather.index[day].strftime('%Y-%m-%d'),
+        'age': age,
+        'under_12_years_old': (known_age <= 12).astype(int),
+        'over_60_years_old': (known_age > 60).astype(int),
+        'patient_needs_companion': (rng.random(n_rows) < 0.6).astype(int),
+        'Hipertension': (rng.random(n_rows) < 0.02 + known_age / 400).astype(int),
+        'Diabetes': (rng.random(n_rows) < 0.01 + known_age / 800).astype(int),
+        'Alcoholism': (rng.random(n_rows) < 0.01).astype(int),
+        'Handcap': (rng.random(n_rows) < 0.02).astype(int),
+        'Scholarship': (rng.random(n_rows) < 0.05).astype(int),
+        'SMS_received': (rng.random(n_rows) < 0.4).astype(int),
+        'disability': _mix(rng, DISABILITY_MIX, n_rows),
+        'place': _mix(rng, PLACE_MIX, n_rows),
+        'appointment_shift': np.where(appointment_time < 12, 'morning', 'afternoon')
+    })
+
+    day_weather = weather.iloc[day].reset_index(drop=True)
+    for col in weather.columns:
+        df[col] = day_weather[col].to_numpy()
+    for col in ['average_temp_day', 'average_rain_day', 'max_temp_day', 'max_rain_day']:
+        df.loc[rng.random(n_rows) < MISSING_WEATHER_RATE, col] = np.nan
+
+    # No-show risk: specialty base rate, raised by rain, lowered by SMS reminders
+    rate = known_specialty.map(SPECIALTY_NOSHOW_RATE).to_numpy(dtype=float)
+    rate = rate + 0.004 * day_weather['average_rain_day'].to_numpy() - 0.05 * df['SMS_received'].to_numpy()
+    df['no_show'] = np.where(rng.random(n_rows) < np.clip(rate, 0.01, 0.99), 'yes', 'no')
+
+    return df[RAW_COLUMNS]
+
+
+# One-hot category dropped by drop_first=True in notebook 02 (all dummies zero)
+DROPPED_CATEGORIES = {
+    'specialty': 'Unknown', 'gender': 'F', 'disability': ' ', 'appointment_shift': 'afternoon',
+    'rain_intensity': 'heavy', 'heat_intensity': 'cold'
+}
+
+# Category columns whose missing values the cleaning step turns into 'Unknown'
+MISSING_CATEGORY = 'Unknown'
+
+# Binary raw columns sampled with a rate per age group
+FLAG_COLS = HEALTH_COLS + ['Scholarship', 'SMS_received', 'patient_needs_companion']
+
+# Groups whose no-show log-odds effects are combined when sampling the outcome
+NOSHOW_GROUPS = ['specialty', 'place', 'disability', 'age_group', 'SMS_received', 'day_of_week']
+
+# Pseudo-count shrinking small groups' no-show rates toward the overall rate
+RATE_PRIOR_WEIGHT = 100
+
+# Resolution of the per-specialty age distributions
+AGE_QUANTILES = 101
+
+# Rows generated and written per chunk when streaming (bounds memory use)
+DEFAULT_CHUNK_ROWS = 250_000
+
+
+def _logit(p):
+    p = np.clip(p, 1e-6, 1 - 1e-6)
+    return np.log(p / (1 - p))
+
+
+def _age_groups(age):
+    """AGE_LABELS index per age (missing ages count as the median child)"""
+    age = np.nan_to_num(np.asarray(age, dtype=float), nan=12)
+    return np.clip(np.searchsorted(AGE_BINS, age, side='left') - 1, 0, len(AGE_LABELS) - 1)
+
+
+def _sample_rows(rng, cumulative, parents):
+    """Inverse-CDF draw from per-parent cumulative probability rows"""
+    u = rng.random(len(parents))
+    return (u[:, np.newaxis] >= cumulative[parents]).sum(axis=1).clip(max=cumulative.shape[1] - 1)
+
+
+def decode_processed(X, y, label_encoders):
+    """
+    Rebuild raw-schema appointments from notebook 02's processed classification data
+
+    Args:
+        X: X_train_classification.csv (or X_test) as a DataFrame
+        y: matching y_*_classification.csv values (1 = no-show)
+        label_encoders: dict from label_encoders.pkl
+
+    Returns:
+        DataFrame with RAW_COLUMNS; ages and weather are the imputed values
+    """
+    X = X.reset_index(drop=True)
+    raw = pd.DataFrame(index=X.index)
+
+    for col, dropped in DROPPED_CATEGORIES.items():
+        dummies = [c for c in X.columns if c.startswith(col + '_') and c not in LABEL_ENCODED_COLS
+                   and not c.endswith(('_encoded', '_noshow_rate'))]
+        values = np.array([c[len(col) + 1:] for c in dummies] + [dropped], dtype=object)
+        hot = X[dummies].to_numpy(dtype=bool)
+        raw[col] = values[np.where(hot.any(axis=1), hot.argmax(axis=1), len(dummies))]
+
+    raw['place'] = label_encoders['place'].inverse_transform(X['place'].astype(int))
+    for col in ['specialty', 'place', 'disability']:
+        raw[col] = raw[col].where(raw[col] != MISSING_CATEGORY)
+
+    date = pd.to_datetime(pd.DataFrame({'year': X['year'], 'month': X['month'], 'day': X['day_of_month']}))
+    raw['appointment_date_continuous'] = date.dt.strftime('%Y-%m-%d')
+
+    for col in RAW_COLUMNS:
+        if col not in raw.columns and col in X.columns:
+            raw[col] = X[col].to_numpy()
+    raw['no_show'] = np.where(np.asarray(y).ravel() == 1, 'yes', 'no')
+
+    return raw[RAW_COLUMNS]
+
+
+class AppointmentProfile:
+    """
+    Appointment distributions learned from historical data
+
+    Holds the joint specialty/place mix, age quantiles per specialty,
+    disability per specialty, appointment hours, health/SMS flag rates per age
+    group, observed daily weather by calendar day, daily volume by weekday and
+    month, and smoothed no-show log-odds per group. Only aggregates are kept,
+    so a profile can be shipped to test machines instead of patient data.
+    """
+
+    def __init__(self, pairs, specialties, age_quantiles, age_missing, disabilities,
+                 disability_cumulative, genders, times, flag_rates, weather, weather_missing,
+                 weekday_volume, month_volume, noshow_intercept, noshow_effects):
+        self.pairs = pairs
+        self.specialties = specialties
+        self.age_quantiles = age_quantiles
+        self.age_missing = age_missing
+        self.disabilities = disabilities
+        self.disability_cumulative = disability_cumulative
+        self.genders = genders
+        self.times = times
+        self.flag_rates = flag_rates
+        self.weather = weather
+        self.weather_missing = weather_missing
+        self.weekday_volume = weekday_volume
+        self.month_volume = month_volume
+        self.noshow_intercept = noshow_intercept
+        self.noshow_effects = noshow_effects
+
+    @classmethod
+    def fit(cls, raw_df):
+        """
+        Learn a profile from raw-schema appointments
+
+        Args:
+            raw_df: DataFrame with RAW_COLUMNS, e.g. the raw CSV or decode_processed output
+
+        Returns:
+            AppointmentProfile
+        """
+        df = raw_df.copy()
+        for col in ['specialty', 'place', 'disability']:
+            df[col] = df[col].fillna(MISSING_CATEGORY).astype(str)
+        date = pd.to_datetime(df['appointment_date_continuous'])
+        df['day_of_week'] = date.dt.dayofweek
+        df['age_group'] = np.asarray(AGE_LABELS)[_age_groups(df['age'])]
+
+        # Specialty/place mix and the conditionals that hang off specialty
+        pairs = df.groupby(['specialty', 'place']).size().rename('p').reset_index()
+        pairs['p'] /= pairs['p'].sum()
+        specialties = np.sort(pairs['specialty'].unique())
+        pairs['specialty_code'] = np.searchsorted(specialties, pairs['specialty'])
+
+        levels = np.linspace(0, 1, AGE_QUANTILES)
+        overall_age = np.nanquantile(df['age'], levels) if df['age'].notna().any() else np.full(AGE_QUANTILES, 12.0)
+        age_quantiles = np.vstack([
+            np.nanquantile(ages, levels) if np.isfinite(ages).any() else overall_age
+            for ages in (df.loc[df['specialty'] == s, 'age'].to_numpy(dtype=float) for s in specialties)
+        ])
+
+        disability_mix = pd.crosstab(df['specialty'], df['disability'], normalize='index').reindex(specialties)
+        disability_cumulative = disability_mix.cumsum(axis=1).to_numpy()
+
+        genders = df['gender'].value_counts(normalize=True)
+        times = df.groupby(['appointment_time', 'appointment_shift']).size().rename('p').reset_index()
+        times['p'] /= times['p'].sum()
+
+        flag_rates = df.groupby('age_group')[FLAG_COLS].mean().reindex(AGE_LABELS)
+        flag_rates = flag_rates.fillna(df[FLAG_COLS].mean())
+
+        # Weather and volume by date
+        by_date = df.assign(date=date).groupby('date')
+        weather = by_date[WEATHER_COLS].mean().join(
+            by_date[['rainy_day_before', 'storm_day_before']].max()
+        ).join(by_date[['rain_intensity', 'heat_intensity']].first()).sort_index()
+        weather[WEATHER_COLS] = weather[WEATHER_COLS].ffill().bfill()
+        weather_missing = df[WEATHER_COLS].isna().mean().to_dict()
+
+        counts = by_date.size().reindex(pd.date_range(date.min(), date.max()), fill_value=0)
+        weekday_volume = counts.groupby(counts.index.dayofweek).mean().reindex(range(7), fill_value=0)
+        month_volume = counts.groupby(counts.index.month).mean().reindex(range(1, 13))
+        month_volume = (month_volume / month_volume.mean()).fillna(1.0)
+
+        # No-show: smoothed per-group log-odds, intercept recalibrated to the overall rate
+        target = (df['no_show'] == 'yes').astype(float)
+        overall = target.mean()
+        effects = {}
+        offsets = np.zeros(len(df))
+        for group in NOSHOW_GROUPS:
+            stats = target.groupby(df[group]).agg(['sum', 'count'])
+            rate = (stats['sum'] + RATE_PRIOR_WEIGHT * overall) / (stats['count'] + RATE_PRIOR_WEIGHT)
+            effects[group] = pd.Series(_logit(rate.to_numpy()) - _logit(overall), index=rate.index)
+            offsets += df[group].map(effects[group]).to_numpy(dtype=float)
+
+        intercept = _logit(overall)
+        for _ in range(25):
+            p = 1 / (1 + np.exp(-(intercept + offsets)))
+            intercept -= (p.mean() - overall) / max((p * (1 - p)).mean(), 1e-9)
+
+        return cls(pairs, specialties, age_quantiles, float(df['age'].isna().mean()),
+                   disability_mix.columns.to_numpy(dtype=object), disability_cumulative, genders, times,
+                   flag_rates, weather, weather_missing, weekday_volume.to_numpy(dtype=float),
+                   month_volume.to_numpy(dtype=float), float(intercept), effects)
+
+    def save(self, path):
+        joblib.dump(self, path)
+
+    @classmethod
+    def load(cls, path):
+        return joblib.load(path)
+
+    def weather_rows(self, dates):
+        """Observed weather row for each date, matched on calendar day (nearest day if unseen)"""
+        observed = self.weather.index.dayofyear.to_numpy()
+        positions = np.empty(len(dates), dtype=np.int64)
+        for i, (day, year) in enumerate(zip(dates.dayofyear, dates.year)):
+            distance = np.abs(observed - day)
+            distance = np.minimum(distance, 366 - distance)
+            candidates = np.flatnonzero(distance == distance.min())
+            positions[i] = candidates[year % len(candidates)]
+        return positions
+
+    def sample(self, n_rows, rng, dates, weather_rows=None):
+        """
+        Draw appointments from the learned distributions
+
+        Args:
+            n_rows: number of appointments
+            rng: numpy Generator
+            dates: DatetimeIndex of the days appointments fall on
+            weather_rows: precomputed weather_rows(dates), optional
+
+        Returns:
+            DataFrame with RAW_COLUMNS
+        """
+        if weather_rows is None:
+            weather_rows = self.weather_rows(dates)
+
+        day_weights = self.weekday_volume[dates.dayofweek] * self.month_volume[dates.month - 1]
+        day = rng.choice(len(dates), size=n_rows, p=day_weights / day_weights.sum())
+
+        pair = rng.choice(len(self.pairs), size=n_rows, p=self.pairs['p'].to_numpy())
+        specialty = self.pairs['specialty'].to_numpy(dtype=object)[pair]
+        place = self.pairs['place'].to_numpy(dtype=object)[pair]
+        specialty_code = self.pairs['specialty_code'].to_numpy()[pair]
+
+        position = rng.random(n_rows) * (AGE_QUANTILES - 1)
+        low = position.astype(np.int64).clip(max=AGE_QUANTILES - 2)
+        quantiles = self.age_quantiles[specialty_code]
+        rows = np.arange(n_rows)
+        age = quantiles[rows, low] + (position - low) * (quantiles[rows, low + 1] - quantiles[rows, low])
+        age = np.round(age)
+        age_group = _age_groups(age)
+        age[rng.random(n_rows) < self.age_missing] = np.nan
+
+        disability = self.disabilities[_sample_rows(rng, self.disability_cumulative, specialty_code)]
+        time_slot = rng.choice(len(self.times), size=n_rows, p=self.times['p'].to_numpy())
+        flags = rng.random((n_rows, len(FLAG_COLS))) < self.flag_rates.to_numpy()[age_group]
+        known_age = np.nan_to_num(age, nan=12)
+
+        df = pd.DataFrame({
+            'specialty': specialty,
+            'appointment_time': self.times['appointment_time'].to_numpy()[time_slot],
+            'gender': rng.choice(self.genders.index.to_numpy(dtype=object), size=n_rows,
+                                 p=self.genders.to_numpy()),
+            'appointment_date_continuous': dates.strftime('%Y-%m-%d').to_numpy(dtype=object)[day],
+            'age': age,
+            'under_12_years_old': (known_age <= 12).astype(int),
+            'over_60_years_old': (known_age > 60).astype(int),
+            'disability': disability,
+            'place': place,
+            'appointment_shift': self.times['appointment_shift'].to_numpy(dtype=object)[time_slot]
+        })
+        for i, col in enumerate(FLAG_COLS):
+            df[col] = flags[:, i].astype(int)
+
+        weather = self.weather.iloc[weather_rows[day]]
+        for col in weather.columns:
+            df[col] = weather[col].to_numpy()
+        for col, rate in self.weather_missing.items():
+            if rate > 0:
+                df.loc[rng.random(n_rows) < rate, col] = np.nan
+
+        # Outcome from the sampled groups, before the missing categories are blanked
+        groups = {
+            'specialty': specialty, 'place': place, 'disability': disability,
+            'age_group': np.asarray(AGE_LABELS)[age_group], 'SMS_received': df['SMS_received'].to_numpy(),
+            'day_of_week': dates.dayofweek.to_numpy()[day]
+        }
+        logit = np.full(n_rows, self.noshow_intercept)
+        for group, effects in self.noshow_effects.items():
+            logit += pd.Series(groups[group]).map(effects).fillna(0).to_numpy(dtype=float)
+        df['no_show'] = np.where(rng.random(n_rows) < 1 / (1 + np.exp(-logit)), 'yes', 'no')
+
+        for col in ['specialty', 'place', 'disability']:
+            df[col] = df[col].where(df[col] != MISSING_CATEGORY)
+
+        return df[RAW_COLUMNS]
+
+
+def default_profile(seed=42, n_rows=200_000):
+    """Profile of the built-in generator, for machines without any fitted profile"""
+    return AppointmentProfile.fit(generate_appointments(n_rows, seed=seed))
+
+
+def stream_appointments(n_rows, profile=None, chunk_rows=DEFAULT_CHUNK_ROWS, seed=42,
+                        start_date=DATA_START_DATE, n_days=DEFAULT_DAYS):
+    """
+    Yield synthetic appointments chunk by chunk
+
+    Each chunk has its own random stream, so output is reproducible for a seed
+    and chunk size and memory stays bounded by chunk_rows.
+
+    Args:
+        n_rows: total number of appointments
+        profile: AppointmentProfile (default: default_profile())
+        chunk_rows: rows per chunk
+        seed: random seed
+        start_date: first appointment date
+        n_days: number of days the appointments are spread over
+
+    Yields:
+        DataFrames with RAW_COLUMNS and a running RangeIndex
+    """
+    profile = profile or default_profile(seed)
+    dates = pd.date_range(start_date, periods=n_days, freq='D')
+    weather_rows = profile.weather_rows(dates)
+
+    for chunk, start in enumerate(range(0, n_rows, chunk_rows)):
+        size = min(chunk_rows, n_rows - start)
+        df = profile.sample(size, np.random.default_rng([seed, chunk]), dates, weather_rows)
+        df.index = pd.RangeIndex(start, start + size)
+        yield df
+
+
+def write_appointments(path, n_rows, profile=None, chunk_rows=DEFAULT_CHUNK_ROWS, seed=42,
+                       start_date=DATA_START_DATE, n_days=DEFAULT_DAYS):
+    """
+    Stream synthetic appointments to a Parquet (one row group per chunk) or CSV file
+
+    Args:
+        path: output file; '.parquet'/'.pq' writes Parquet, anything else CSV
+        n_rows, profile, chunk_rows, seed, start_date, n_days: see stream_appointments
+
+    Returns:
+        number of rows written
+    """
+    parquet = path.endswith(('.parquet', '.pq'))
+    if parquet:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    written = 0
+    writer = None
+    try:
+        for df in stream_appointments(n_rows, profile, chunk_rows, seed, start_date, n_days):
+            if parquet:
+                if writer is None:
+                    table = pa.Table.from_pandas(df, preserve_index=False)
+                    writer = pq.ParquetWriter(path, table.schema)
+                else:
+                    table = pa.Table.from_pandas(df, schema=writer.schema, preserve_index=False)
+                writer.write_table(table)
+            else:
+                df.to_csv(path, mode='a' if written else 'w', header=not written, index=False)
+            written += len(df)
+    finally:
+        if writer is not None:
+            writer.close()
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit appointment profiles and generate synthetic data")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    fit = commands.add_parser('fit', help='learn a profile from processed or raw appointments')
+    fit.add_argument('--processed-dir', default=os.path.join('data', 'processed'),
+                     help='directory with X/y_train_classification.csv and label_encoders.pkl')
+    fit.add_argument('--raw', help='raw-schema CSV to fit from instead of the processed data')
+    fit.add_argument('--out', default=os.path.join('data', 'synthetic', 'profile.joblib'))
+
+    generate = commands.add_parser('generate', help='write synthetic raw-schema appointments')
+    generate.add_argument('--rows', type=int, required=True)
+    generate.add_argument('--out', required=True, help='.parquet or .csv output path')
+    generate.add_argument('--profile', help='fitted profile (default: built-in distributions)')
+    generate.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS)
+    generate.add_argument('--seed', type=int, default=42)
+    generate.add_argument('--days', type=int, default=DEFAULT_DAYS)
+    args = parser.parse_args()
+
+    if args.command == 'fit':
+        if args.raw:
+            raw = pd.read_csv(args.raw)
+        else:
+            raw = decode_processed(
+                pd.read_csv(os.path.join(args.processed_dir, 'X_train_classification.csv')),
+                pd.read_csv(os.path.join(args.processed_dir, 'y_train_classification.csv')).to_numpy(),
+                joblib.load(os.path.join(args.processed_dir, 'label_encoders.pkl'))
+            )
+        os.makedirs(os.path.dirname(args.out) or '.', exist_ok=True)
+        AppointmentProfile.fit(raw).save(args.out)
+        print(f"Fitted profile on {len(raw):,} appointments -> {args.out}")
+    else:
+        profile = AppointmentProfile.load(args.profile) if args.profile else None
+        rows = write_appointments(args.out, args.rows, profile, args.chunk_rows, args.seed, n_days=args.days)
+        print(f"Wrote {rows:,} appointments -> {args.out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,530 @@
+"""
+Training Utilities
+Distillation into compact students and incremental refreshes from new outcomes, with accuracy guardrails
+
+Usage:
+    python -m utils.training distill [--student gbm|forest|logistic] [--activate]
+    python -m utils.training append outcomes.csv
+    python -m utils.training refresh [--add-trees 20]
+
+distill reads notebook 03's train/test split from data/processed, distills the
+active classifier and publishes the student as a new model version if it passes
+the guardrails. append adds attended/missed appointments (raw schema with
+no_show) to the outcome store; refresh updates the active model from the
+outcomes it has not seen yet and publishes it if holdout metrics hold.
+"""
+
+import os
+import copy
+import time
+import pickle
+import argparse
+import warnings
+
+import numpy as np
+import pandas as pd
+from sklearn.base import BaseEstimator, ClassifierMixin
+from sklearn.ensemble import HistGradientBoostingRegressor, RandomForestRegressor
+from sklearn.linear_model import Ridge
+from sklearn.metrics import f1_score, roc_auc_score
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import KBinsDiscretizer
+
+from utils.backfill import PARTITION_COL
+from utils.model_loader import ModelLoader, ThreadBudget, publish_version
+from utils.preprocessing import DEFAULT_NOSHOW_RATE, PATIENT_ID_COL, RATE_GROUPS, prepare_classifier_input
+
+# Largest acceptable loss against the teacher on the test set
+DEFAULT_MAX_F1_DROP = 0.02
+DEFAULT_MAX_AUC_DROP = 0.01
+
+# Probabilities are clipped away from 0/1 before taking the logit
+LOGIT_EPS = 1e-4
+
+LATENCY_BATCH_ROWS = 10_000
+
+# Parquet outcome store, partitioned by appointment month
+DEFAULT_OUTCOMES_DIR = os.path.join('data', 'outcomes')
+
+# Incremental refresh: trees added per refresh, cap on the forest size (the
+# oldest trees are dropped first) and the newest share of unseen outcomes
+# held out to check the refreshed model against the current one
+DEFAULT_ADD_TREES = 20
+DEFAULT_MAX_TREES = 500
+DEFAULT_HOLDOUT_FRACTION = 0.2
+
+# Weight, in appointments, given to a group's notebook rate when there are no
+# outcome counts for it yet
+RATE_PRIOR_ROWS = 200
+
+
+def student_regressor(kind, random_state=42):
+    """
+    Untrained regressor for a student kind
+
+    'gbm' is a shallow histogram gradient-boosting model, 'forest' a small
+    pruned random forest and 'logistic' a ridge model on quantile-binned
+    features fitted in logit space (i.e. a logistic model on bins).
+    """
+    if kind == 'gbm':
+        return HistGradientBoostingRegressor(max_depth=4, max_iter=150, learning_rate=0.1,
+                                             min_samples_leaf=50, random_state=random_state)
+    if kind == 'forest':
+        return RandomForestRegressor(n_estimators=20, max_depth=8, min_samples_leaf=20, max_features=0.5,
+                                     random_state=random_state, n_jobs=1)
+    if kind == 'logistic':
+        return make_pipeline(KBinsDiscretizer(n_bins=10, encode='onehot', strategy='quantile',
+                                              quantile_method='averaged_inverted_cdf'),
+                             Ridge(alpha=1.0))
+    raise ValueError(f"Unknown student kind: {kind}")
+
+
+class DistilledClassifier(ClassifierMixin, BaseEstimator):
+    """
+    Binary classifier that reproduces a teacher's no-show probability
+
+    The regressor is fitted to the teacher's soft probabilities (to their
+    logit when link='logit'), so the student learns the teacher's ranking
+    rather than the noisy 0/1 labels. predict_proba has the usual
+    (n_rows, 2) layout, so ModelLoader serves it like the forest.
+    """
+
+    def __init__(self, regressor=None, link='identity'):
+        self.regressor = regressor
+        self.link = link
+
+    def fit(self, X, soft_labels):
+        """Fit to the teacher's positive-class probabilities"""
+        target = np.asarray(soft_labels, dtype=float)
+        if self.link == 'logit':
+            target = np.clip(target, LOGIT_EPS, 1 - LOGIT_EPS)
+            target = np.log(target / (1 - target))
+        with warnings.catch_warnings():
+            # Binary flags give quantile binning fewer distinct edges than bins
+            warnings.filterwarnings('ignore', message='Bins whose width are too small')
+            self.regressor.fit(X, target)
+        self.classes_ = np.array([0, 1])
+        self.n_features_in_ = np.shape(X)[1]
+        if isinstance(X, pd.DataFrame):
+            self.feature_names_in_ = np.asarray(X.columns, dtype=object)
+        return self
+
+    def predict_proba(self, X):
+        raw = np.asarray(self.regressor.predict(X), dtype=float)
+        proba = 1 / (1 + np.exp(-raw)) if self.link == 'logit' else np.clip(raw, 0.0, 1.0)
+        return np.column_stack([1 - proba, proba])
+
+    def predict(self, X):
+        return (self.predict_proba(X)[:, 1] > 0.5).astype(int)
+
+
+def distill(teacher, X_train, student='gbm', random_state=42):
+    """
+    Train a student on the teacher's soft probabilities
+
+    Args:
+        teacher: fitted classifier with predict_proba (class 1 = no-show)
+        X_train: training features, aligned to the teacher's features
+        student: 'gbm', 'forest' or 'logistic'
+        random_state: seed for the student
+
+    Returns:
+        fitted DistilledClassifier
+    """
+    soft_labels = teacher.predict_proba(X_train)[:, 1]
+    link = 'logit' if student == 'logistic' else 'identity'
+    return DistilledClassifier(student_regressor(student, random_state), link=link).fit(X_train, soft_labels)
+
+
+def _median_seconds(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return float(np.median(times))
+
+
+def model_profile(model, X_test, y_test, threshold=0.5, repeat=20):
+    """Size, latency and accuracy of one model on the test set"""
+    with warnings.catch_warnings():
+        warnings.filterwarnings('ignore', message='X does not have valid feature names')
+        proba = model.predict_proba(X_test)[:, 1]
+        single = X_test.iloc[:1]
+        batch = X_test.iloc[:LATENCY_BATCH_ROWS]
+        model.predict_proba(single)
+        single_s = _median_seconds(lambda: model.predict_proba(single), repeat)
+        batch_s = _median_seconds(lambda: model.predict_proba(batch), max(3, repeat // 5))
+    return proba, {
+        'size_mb': len(pickle.dumps(model)) / 1e6,
+        'single_row_ms': single_s * 1000,
+        'batch_10k_ms': batch_s * 1000 * LATENCY_BATCH_ROWS / len(batch),
+        'f1': f1_score(y_test, (proba > threshold).astype(int)),
+        'roc_auc': roc_auc_score(y_test, proba)
+    }
+
+
+def distillation_report(teacher, student, X_test, y_test, threshold=0.5):
+    """
+    Compare a student with its teacher on held-out data
+
+    Returns:
+        DataFrame indexed by teacher/student/delta with size_mb,
+        single_row_ms, batch_10k_ms, f1 and roc_auc; the student row also has
+        the mean absolute difference from the teacher's probabilities
+    """
+    y_test = np.asarray(y_test).ravel()
+    teacher_proba, teacher_row = model_profile(teacher, X_test, y_test, threshold)
+    student_proba, student_row = model_profile(student, X_test, y_test, threshold)
+    student_row['proba_mae'] = float(np.mean(np.abs(student_proba - teacher_proba)))
+
+    report = pd.DataFrame([teacher_row, student_row], index=['teacher', 'student'])
+    report.loc['delta'] = report.loc['student'] - report.loc['teacher']
+    return report
+
+
+def guardrail_violations(report, max_f1_drop=DEFAULT_MAX_F1_DROP, max_auc_drop=DEFAULT_MAX_AUC_DROP):
+    """Human-readable reasons the student may not replace the teacher (empty if none)"""
+    delta = report.loc['delta']
+    violations = []
+    if delta['f1'] < -max_f1_drop:
+        violations.append(f"F1 drops by {-delta['f1']:.4f} (limit {max_f1_drop})")
+    if delta['roc_auc'] < -max_auc_drop:
+        violations.append(f"ROC-AUC drops by {-delta['roc_auc']:.4f} (limit {max_auc_drop})")
+    return violations
+
+
+def distill_and_publish(models_dir, X_train, X_test, y_test, student='gbm', activate=False,
+                        max_f1_drop=DEFAULT_MAX_F1_DROP, max_auc_drop=DEFAULT_MAX_AUC_DROP,
+                        force=False, random_state=42):
+    """
+    Distill the active classifier and publish the student as a model version
+
+    The student keeps the teacher's features and artifacts (no-show rates,
+    drift reference), so ModelLoader serves it with the same preprocessing.
+    By default it is published without being activated; load it with
+    load_classifier(version) or make it current with activate=True.
+
+    Returns:
+        (version, report)
+
+    Raises:
+        ValueError: if the student fails the guardrails (unless force)
+    """
+    loader = ModelLoader(models_dir)
+    if not loader.load_classifier():
+        raise ValueError(f"No classifier to distill in {models_dir}")
+    teacher = loader.pinned()
+    X_train = X_train[teacher.classifier_features]
+    X_test = X_test[teacher.classifier_features]
+
+    model = distill(teacher.classifier, X_train, student, random_state)
+    report = distillation_report(teacher.classifier, model, X_test, y_test)
+    violations = guardrail_violations(report, max_f1_drop, max_auc_drop)
+    if violations and not force:
+        raise ValueError("Student failed the guardrails: " + "; ".join(violations))
+
+    student_metrics = report.loc['student']
+    metadata = dict(teacher.classifier_metadata or {})
+    metadata.update({
+        'model_name': f"Distilled {student} (from {metadata.get('model_name', 'classifier')})",
+        'distilled_from': teacher.version,
+        'student': student,
+        'f1_score': float(student_metrics['f1']),
+        'roc_auc': float(student_metrics['roc_auc']),
+        'teacher_f1_score': float(report.loc['teacher', 'f1']),
+        'teacher_roc_auc': float(report.loc['teacher', 'roc_auc']),
+        'training_date': pd.Timestamp.now().isoformat()
+    })
+    # No-show rates and the drift reference describe the training data, not the model
+    artifacts = dict(teacher._classifier_bundle.artifacts)
+    version = publish_version(models_dir, version=time.strftime('%Y%m%dT%H%M%S', time.gmtime()) + f'-{student}',
+                              classifier={'model': model, 'features': teacher.classifier_features,
+                                          'metadata': metadata, 'artifacts': artifacts},
+                              activate=activate)
+    return version, report
+
+
+def append_outcomes(raw_data, store_dir=DEFAULT_OUTCOMES_DIR):
+    """
+    Add labelled appointments to the outcome store
+
+    Args:
+        raw_data: DataFrame in the raw schema with no_show ('yes'/'no')
+        store_dir: root of the Parquet store
+
+    Returns:
+        number of rows appended
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if 'no_show' not in raw_data:
+        raise ValueError("Outcomes need a no_show column ('yes'/'no')")
+    dates = pd.to_datetime(raw_data['appointment_date_continuous'], errors='coerce')
+    labelled = raw_data[dates.notna() & raw_data['no_show'].isin(['yes', 'no'])]
+    months = dates[labelled.index].dt.strftime('%Y-%m')
+
+    name = f"part-{time.strftime('%Y%m%dT%H%M%S', time.gmtime())}-{os.getpid()}"
+    for month, part in labelled.groupby(months.to_numpy(), sort=True):
+        partition_dir = os.path.join(store_dir, f'{PARTITION_COL}={month}')
+        os.makedirs(partition_dir, exist_ok=True)
+        # Written under a temporary name and renamed, so readers never see a partial file
+        tmp_path = os.path.join(partition_dir, f'.{name}.parquet.tmp')
+        pq.write_table(pa.Table.from_pandas(part, preserve_index=False), tmp_path)
+        os.replace(tmp_path, os.path.join(partition_dir, f'{name}.parquet'))
+    return len(labelled)
+
+
+def read_outcomes(store_dir=DEFAULT_OUTCOMES_DIR, after=None):
+    """Outcomes with an appointment date after `after` (all if None), oldest first"""
+    if not os.path.isdir(store_dir):
+        return pd.DataFrame()
+    filters = None
+    if after is not None:
+        # Skips whole months before `after` without opening their files
+        filters = [(PARTITION_COL, '>=', pd.Timestamp(after).strftime('%Y-%m'))]
+    outcomes = pd.read_parquet(store_dir, filters=filters).drop(columns=[PARTITION_COL])
+    dates = pd.to_datetime(outcomes['appointment_date_continuous'])
+    if after is not None:
+        outcomes, dates = outcomes[dates > pd.Timestamp(after)], dates[dates > pd.Timestamp(after)]
+    return outcomes.iloc[np.argsort(dates.to_numpy(), kind='stable')].reset_index(drop=True)
+
+
+def update_outcome_counts(counts, outcomes, noshow_rates=None):
+    """
+    Add outcomes to per-group appointment and no-show counts
+
+    Args:
+        counts: earlier output of this function, or None to start from
+            noshow_rates (each rate counts as RATE_PRIOR_ROWS appointments)
+        outcomes: labelled raw appointments
+        noshow_rates: the model's current rates, used when counts is None
+
+    Returns:
+        (counts, rates): counts for the next update and the refreshed rates
+        in fit_noshow_rates' layout
+    """
+    if counts is None:
+        rates = noshow_rates or {}
+        overall = rates.get('overall', DEFAULT_NOSHOW_RATE)
+        counts = {col: {value: [RATE_PRIOR_ROWS, RATE_PRIOR_ROWS * rate]
+                        for value, rate in rates.get(col, {}).items()} for col in RATE_GROUPS}
+        counts['overall'] = [RATE_PRIOR_ROWS, RATE_PRIOR_ROWS * overall]
+    else:
+        counts = copy.deepcopy(counts)
+
+    target = (outcomes['no_show'] == 'yes').astype(int)
+    for col in RATE_GROUPS:
+        grouped = target.groupby(outcomes[col].fillna('Unknown')).agg(['count', 'sum'])
+        for value, (n, noshow) in grouped.iterrows():
+            total = counts[col].setdefault(value, [0, 0])
+            total[0] += int(n)
+            total[1] += int(noshow)
+    counts['overall'][0] += len(target)
+    counts['overall'][1] += int(target.sum())
+
+    rates = {col: {value: noshow / n for value, (n, noshow) in counts[col].items() if n}
+             for col in RATE_GROUPS}
+    rates['overall'] = counts['overall'][1] / counts['overall'][0]
+    return counts, rates
+
+
+def refresh_model(model, X, y, add_trees=DEFAULT_ADD_TREES, max_trees=DEFAULT_MAX_TREES):
+    """
+    Copy of a fitted classifier updated with new labelled rows
+
+    Forests get add_trees new trees fitted on the new rows (warm start) and
+    keep at most max_trees, dropping the oldest; boosted models get add_trees
+    more boosting iterations; models with partial_fit are updated in place
+    on the copy. Everything else (e.g. distilled students) raises ValueError.
+    """
+    model = copy.deepcopy(model)
+    params = model.get_params() if hasattr(model, 'get_params') else {}
+    with warnings.catch_warnings():
+        warnings.filterwarnings('ignore', message='Warm-start fitting without increasing n_estimators')
+        if hasattr(model, 'partial_fit'):
+            model.partial_fit(X, y, classes=np.array([0, 1]))
+        elif hasattr(model, 'estimators_') and 'bootstrap' in params:
+            # Bagged forest: new trees see only the new rows; old and new trees are averaged
+            model.set_params(warm_start=True, n_estimators=len(model.estimators_) + add_trees)
+            model.fit(X, y)
+            if len(model.estimators_) > max_trees:
+                del model.estimators_[:len(model.estimators_) - max_trees]
+                model.n_estimators = len(model.estimators_)
+            model.set_params(warm_start=False)
+        elif 'max_iter' in params and 'warm_start' in params:
+            model.set_params(warm_start=True, max_iter=model.n_iter_ + add_trees, early_stopping=False)
+            model.fit(X, y)
+        elif 'n_estimators' in params and 'warm_start' in params:
+            model.set_params(warm_start=True, n_estimators=params['n_estimators'] + add_trees)
+            model.fit(X, y)
+        else:
+            raise ValueError(f"{type(model).__name__} cannot be refreshed incrementally; retrain or distill it")
+    return model
+
+
+def holdout_report(current, candidate, X_current, X_candidate, y, threshold=0.5):
+    """F1 and ROC-AUC of the current and refreshed models on the same held-out outcomes"""
+    rows = {}
+    with warnings.catch_warnings():
+        warnings.filterwarnings('ignore', message='X does not have valid feature names')
+        for name, model, X in (('current', current, X_current), ('candidate', candidate, X_candidate)):
+            proba = model.predict_proba(X)[:, 1]
+            rows[name] = {'f1': f1_score(y, (proba > threshold).astype(int)), 'roc_auc': roc_auc_score(y, proba)}
+    report = pd.DataFrame.from_dict(rows, orient='index')
+    report.loc['delta'] = report.loc['candidate'] - report.loc['current']
+    return report
+
+
+def refresh_and_publish(models_dir, encoders_path, outcomes_dir=DEFAULT_OUTCOMES_DIR,
+                        add_trees=DEFAULT_ADD_TREES, max_trees=DEFAULT_MAX_TREES,
+                        holdout_fraction=DEFAULT_HOLDOUT_FRACTION, activate=True,
+                        max_f1_drop=DEFAULT_MAX_F1_DROP, max_auc_drop=DEFAULT_MAX_AUC_DROP, force=False):
+    """
+    Update the active classifier from outcomes it has not been trained on
+
+    Outcomes after the model's 'trained_through' date are split by date: the
+    newest holdout_fraction is held out, the rest refreshes the no-show rate
+    counts and the model. The refreshed model is published as a new version
+    only if its holdout F1 and ROC-AUC are within the guardrails of the
+    current model's. Held-out outcomes are trained on by the next refresh.
+
+    Returns:
+        (version, report)
+
+    Raises:
+        ValueError: if there are too few new outcomes, the model cannot be
+            refreshed, or the guardrails fail (unless force)
+    """
+    # Offline job: the model keeps its own n_jobs instead of the serving thread budget
+    loader = ModelLoader(models_dir, encoders_path, thread_budget=ThreadBudget(threads_per_call=None))
+    if not (loader.load_classifier() and loader.load_preprocessing()):
+        raise ValueError(f"No classifier and label encoders to refresh in {models_dir}")
+    current = loader.pinned()
+    bundle = current._classifier_bundle
+    metadata = dict(bundle.metadata or {})
+
+    outcomes = read_outcomes(outcomes_dir, after=metadata.get('trained_through'))
+    dates = pd.to_datetime(outcomes['appointment_date_continuous']) if len(outcomes) else None
+    if dates is None or dates.nunique() < 2:
+        raise ValueError(f"Not enough new outcomes in {outcomes_dir} (need at least two days)")
+    cutoff = dates.quantile(1 - holdout_fraction)
+    train, holdout = outcomes[dates < cutoff], outcomes[dates >= cutoff]
+    if train['no_show'].nunique() < 2 or holdout['no_show'].nunique() < 2:
+        raise ValueError("New outcomes must include both shows and no-shows on each side of the holdout split")
+
+    counts, rates = update_outcome_counts(bundle.artifacts.get('outcome_counts'), train, current.noshow_rates)
+
+    def features(raw, noshow_rates):
+        return prepare_classifier_input(raw, bundle.features, current.label_encoders, noshow_rates)
+
+    y_train = (train['no_show'] == 'yes').astype(int).to_numpy()
+    y_holdout = (holdout['no_show'] == 'yes').astype(int).to_numpy()
+    model = refresh_model(bundle.model, features(train, rates), y_train, add_trees, max_trees)
+    report = holdout_report(bundle.model, model, features(holdout, current.noshow_rates),
+                            features(holdout, rates), y_holdout)
+    violations = guardrail_violations(report, max_f1_drop, max_auc_drop)
+    if violations and not force:
+        raise ValueError("Refreshed model failed the guardrails: " + "; ".join(violations))
+
+    metadata.update({
+        'refreshed_from': bundle.version,
+        'trained_through': pd.Timestamp(dates[dates < cutoff].max()).strftime('%Y-%m-%d'),
+        'refresh_rows': len(train),
+        'holdout_f1_score': float(report.loc['candidate', 'f1']),
+        'holdout_roc_auc': float(report.loc['candidate', 'roc_auc']),
+        'training_date': pd.Timestamp.now().isoformat()
+    })
+    artifacts = {**bundle.artifacts, 'noshow_rates': rates, 'outcome_counts': counts}
+    version = publish_version(models_dir, version=time.strftime('%Y%m%dT%H%M%S', time.gmtime()) + '-refresh',
+                              classifier={'model': model, 'features': bundle.features,
+                                          'metadata': metadata, 'artifacts': artifacts},
+                              activate=activate)
+    return version, report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Distill or incrementally refresh the no-show classifier")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    distill_parser = commands.add_parser('distill', help='train, compare and publish a student model')
+    distill_parser.add_argument('--student', choices=['gbm', 'forest', 'logistic'], default='gbm')
+    distill_parser.add_argument('--models-dir', default='models')
+    distill_parser.add_argument('--processed-dir', default=os.path.join('data', 'processed'),
+                                help='directory with notebook 03 X/y_train/test_classification.csv')
+    distill_parser.add_argument('--max-f1-drop', type=float, default=DEFAULT_MAX_F1_DROP)
+    distill_parser.add_argument('--max-auc-drop', type=float, default=DEFAULT_MAX_AUC_DROP)
+    distill_parser.add_argument('--activate', action='store_true', help='make the student the active model')
+    distill_parser.add_argument('--force', action='store_true', help='publish even if the guardrails fail')
+
+    append_parser = commands.add_parser('append', help='add labelled appointments to the outcome store')
+    append_parser.add_argument('input', help='CSV or Parquet appointments in the raw schema, with no_show')
+    append_parser.add_argument('--outcomes-dir', default=DEFAULT_OUTCOMES_DIR)
+    append_parser.add_argument('--feature-store', default=os.path.join('data', 'feature_store.sqlite'),
+                               help='per-patient history store, updated when outcomes have patient_id')
+
+    refresh_parser = commands.add_parser('refresh', help='update the active classifier from new outcomes')
+    refresh_parser.add_argument('--models-dir', default='models')
+    refresh_parser.add_argument('--encoders', default=os.path.join('data', 'processed', 'label_encoders.pkl'))
+    refresh_parser.add_argument('--outcomes-dir', default=DEFAULT_OUTCOMES_DIR)
+    refresh_parser.add_argument('--add-trees', type=int, default=DEFAULT_ADD_TREES)
+    refresh_parser.add_argument('--max-trees', type=int, default=DEFAULT_MAX_TREES)
+    refresh_parser.add_argument('--holdout-fraction', type=float, default=DEFAULT_HOLDOUT_FRACTION)
+    refresh_parser.add_argument('--max-f1-drop', type=float, default=DEFAULT_MAX_F1_DROP)
+    refresh_parser.add_argument('--max-auc-drop', type=float, default=DEFAULT_MAX_AUC_DROP)
+    refresh_parser.add_argument('--no-activate', action='store_true', help='publish without activating')
+    refresh_parser.add_argument('--force', action='store_true', help='publish even if the guardrails fail')
+    args = parser.parse_args()
+
+    # Run through the package module, so pickled models refer to utils.training
+    # classes rather than __main__
+    from utils import training
+
+    if args.command == 'append':
+        reader = pd.read_parquet if args.input.endswith(('.parquet', '.pq')) else pd.read_csv
+        outcomes = reader(args.input)
+        rows = training.append_outcomes(outcomes, args.outcomes_dir)
+        print(f"Appended {rows:,} outcomes to {args.outcomes_dir}")
+        if PATIENT_ID_COL in outcomes:
+            from utils.feature_store import PatientFeatureStore
+
+            store = PatientFeatureStore(args.feature_store)
+            print(f"Updated history of {store.update(outcomes):,} patients in {args.feature_store}")
+            store.close()
+        return
+
+    if args.command == 'refresh':
+        start = time.perf_counter()
+        try:
+            version, report = training.refresh_and_publish(
+                args.models_dir, args.encoders, args.outcomes_dir, args.add_trees, args.max_trees,
+                args.holdout_fraction, activate=not args.no_activate, max_f1_drop=args.max_f1_drop,
+                max_auc_drop=args.max_auc_drop, force=args.force
+            )
+        except ValueError as e:
+            print(f"Error refreshing classifier: {e}")
+            raise SystemExit(1)
+        print(report.round(4).to_string())
+        print(f"\nPublished version {version}" + ("" if args.no_activate else " (active)")
+              + f" in {time.perf_counter() - start:.1f}s")
+        return
+
+    def read(name):
+        return pd.read_csv(os.path.join(args.processed_dir, f'{name}_classification.csv'))
+
+    try:
+        version, report = training.distill_and_publish(
+            args.models_dir, read('X_train'), read('X_test'), read('y_test').to_numpy().ravel(),
+            student=args.student, activate=args.activate, max_f1_drop=args.max_f1_drop,
+            max_auc_drop=args.max_auc_drop, force=args.force
+        )
+    except ValueError as e:
+        print(f"Error distilling classifier: {e}")
+        raise SystemExit(1)
+    print(report.round(4).to_string())
+    print(f"\nPublished version {version}" + (" (active)" if args.activate else ""))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+"""
+Warm-up Utilities
+Background model pre-loading and a readiness endpoint for load balancers
+
+Usage:
+    python -m utils.warmup [streamlit run options]
+
+starts warm-up and the readiness endpoint, then runs app.py in the same process.
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from utils import metrics
+from utils.model_loader import ModelLoader, ModelWatcher
+
+# Serve GET /ready (200 once warm, else 503) and GET /live on this port
+READINESS_PORT_ENV = 'READINESS_PORT'
+
+# Opened when present, for models trained with per-patient history features
+FEATURE_STORE_PATH = os.path.join('data', 'feature_store.sqlite')
+
+# Opened when present: daily weather for appointments and forecasts without it
+WEATHER_PATH = os.path.join('data', 'weather.csv')
+
+# Synthetic appointments pushed through each model; enough to touch every code
+# path (thread pools, explainer and leaf-value caches), small enough to stay quick
+WARMUP_ROWS = 256
+
+_loader_lock = threading.Lock()
+_start_lock = threading.Lock()
+_loader = None
+_thread = None
+_ready = threading.Event()
+_status = {'state': 'idle', 'seconds': None, 'error': None, 'version': None}
+
+
+def shared_loader():
+    """
+    Process-wide ModelLoader with both models and the label encoders loaded
+
+    Loaded once per process (by the warm-up thread or the first page that
+    asks) and kept current by a ModelWatcher unless MODEL_RELOAD_INTERVAL=0.
+    Models that fail to load are left as None; callers check the attributes.
+    Metrics exporters (METRICS_PORT / METRICS_TEXTFILE) are started here, once
+    per app process.
+    """
+    global _loader
+    with _loader_lock:
+        if _loader is None:
+            metrics.enable_from_env()
+            loader = ModelLoader()
+            loaded = [loader.load_classifier(), loader.load_forecaster()]
+            loader.load_preprocessing()
+            if os.path.exists(FEATURE_STORE_PATH):
+                loader.load_feature_store(FEATURE_STORE_PATH)
+            if os.path.exists(WEATHER_PATH):
+                loader.load_weather(WEATHER_PATH)
+
+            # Pick up newly published model versions without restarting the worker
+            reload_interval = float(os.environ.get('MODEL_RELOAD_INTERVAL', 30))
+            if reload_interval > 0 and any(loaded):
+                ModelWatcher(loader, interval=reload_interval).start()
+            _loader = loader
+        return _loader
+
+
+def warm(loader):
+    """Run a synthetic batch and a single row through each loaded model"""
+    from utils.preprocessing import build_daily_series
+    from utils.synthetic_data import generate_appointments
+
+    raw = generate_appointments(WARMUP_ROWS, seed=0)
+    if loader.classifier is not None and loader.label_encoders is not None:
+        features = loader.prepare_classifier_input(raw)
+        loader.score_noshow(features)
+        loader.predict_noshow(features.iloc[:1])
+        loader.explain_noshow(features.iloc[:1])
+    if loader.forecaster is not None:
+        series = build_daily_series(raw).reindex(columns=loader.forecaster_features).ffill().fillna(0)
+        loader.forecast_horizon(series)
+        loader.forecast_demand(series.iloc[-1:])
+
+
+def _run():
+    start = time.perf_counter()
+    _status['state'] = 'warming'
+    try:
+        loader = shared_loader()
+        if loader.classifier is None and loader.forecaster is None:
+            raise RuntimeError("no model could be loaded")
+        warm(loader)
+        _status.update(state='ready', version=loader.version)
+        _ready.set()
+    except Exception as e:
+        print(f"Error warming up models: {e}")
+        _status.update(state='failed', error=str(e))
+    _status['seconds'] = round(time.perf_counter() - start, 3)
+
+
+def start():
+    """
+    Start warm-up in a background thread (idempotent, process-wide)
+
+    Also starts the readiness endpoint when READINESS_PORT is set.
+
+    Returns:
+        the warm-up thread
+    """
+    global _thread
+    with _start_lock:
+        if _thread is None:
+            _thread = threading.Thread(target=_run, name='model-warmup', daemon=True)
+            _thread.start()
+            port = os.environ.get(READINESS_PORT_ENV)
+            if port:
+                serve_readiness(int(port))
+        return _thread
+
+
+def is_ready():
+    return _ready.is_set()
+
+
+def wait_ready(timeout=None):
+    """Block until warm-up finished successfully; False on timeout"""
+    return _ready.wait(timeout)
+
+
+def status():
+    """Copy of the warm-up state: idle, warming, ready or failed"""
+    return dict(_status, ready=_ready.is_set())
+
+
+class _ReadinessHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip('/') == '/live':
+            code = 200
+        elif self.path.rstrip('/') == '/ready':
+            code = 200 if is_ready() else 503
+        else:
+            self.send_error(404)
+            return
+        body = json.dumps(status()).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Load balancer polls would otherwise flood the log
+        pass
+
+
+def serve_readiness(port):
+    """Serve /ready and /live on a daemon thread; returns the server"""
+    server = ThreadingHTTPServer(('', port), _ReadinessHandler)
+    threading.Thread(target=server.serve_forever, name='readiness-http', daemon=True).start()
+    return server
+
+
+def main():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.append(root)
+
+    # Streamlit is imported before the warm-up thread starts importing the
+    # scientific stack; both pull in narwhals, whose imports are circular and can
+    # deadlock when two threads import it at once
+    from streamlit.web import cli
+
+    # Started through the package module so pages share this process's loader
+    from utils import warmup
+    warmup.start()
+
+    sys.argv = ['streamlit', 'run', os.path.join(root, 'app.py')] + sys.argv[1:]
+    sys.exit(cli.main())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,308 @@
+"""
+Weather Utilities
+Daily weather by date from a swappable provider, behind a date-keyed cache, for bulk fills of appointments and forecasts
+
+Usage:
+    python -m utils.weather import appointments.csv [--out data/weather.csv]
+
+builds (or extends) the local daily weather file from the weather columns of
+raw appointments: one row per date with the mean temperature and rain and the
+highest daily maxima. Forecast days can be added to the same file, by hand or
+by a feed, with the columns date plus WEATHER_COLS.
+"""
+
+import os
+import time
+import argparse
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from utils.preprocessing import WEATHER_COLS, heat_intensity, rain_intensity, weather_flags
+
+DEFAULT_WEATHER_PATH = os.path.join('data', 'weather.csv')
+
+# Days kept in memory, and seconds before a cached day is asked for again
+# (forecast days are revised as they approach)
+DEFAULT_CACHE_DAYS = 4096
+DEFAULT_TTL = 3600
+
+# Maximum rain (mm) on the day before that sets storm_day_before
+STORM_RAIN_MM = 25
+
+PARQUET_EXTENSIONS = ('.parquet', '.pq')
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def _days(dates):
+    """Day numbers (days since 1970-01-01) of dates"""
+    values = pd.to_datetime(dates if isinstance(dates, (pd.Series, pd.Index)) else pd.Series(dates))
+    return np.asarray(values, dtype='datetime64[D]').astype(np.int64)
+
+
+def _date(day):
+    return pd.Timestamp(np.datetime64(int(day), 'D'))
+
+
+class WeatherProvider:
+    """
+    Source of daily weather
+
+    A provider only answers range queries; caching and filling appointments
+    and forecasts are done by CachedWeather, so a live feed can replace the
+    local file by implementing fetch_range.
+    """
+
+    def fetch_range(self, start, end):
+        """
+        Daily weather for start..end (inclusive)
+
+        Returns:
+            DataFrame indexed by date (normalized DatetimeIndex) with
+            WEATHER_COLS, for the days in the range the provider knows
+        """
+        raise NotImplementedError
+
+
+class LocalWeatherProvider(WeatherProvider):
+    """Daily weather from a CSV or Parquet file (date plus WEATHER_COLS), re-read when the file changes"""
+
+    def __init__(self, path=DEFAULT_WEATHER_PATH):
+        self.path = path
+        self.calls = 0
+        self._daily = None
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        mtime = os.stat(self.path).st_mtime_ns
+        if mtime != self._mtime:
+            self._daily = read_daily_weather(self.path)
+            self._mtime = mtime
+        return self._daily
+
+    def fetch_range(self, start, end):
+        with self._lock:
+            self.calls += 1
+            daily = self._load()
+        return daily.loc[pd.Timestamp(start).normalize():pd.Timestamp(end).normalize()]
+
+
+def read_daily_weather(path):
+    """Daily weather file as a DataFrame indexed by date (last row wins for repeated dates)"""
+    daily = pd.read_parquet(path) if path.endswith(PARQUET_EXTENSIONS) else pd.read_csv(path)
+    daily.index = pd.DatetimeIndex(pd.to_datetime(daily['date']).dt.normalize(), name='date')
+    daily = daily[WEATHER_COLS].astype(float)
+    return daily[~daily.index.duplicated(keep='last')].sort_index()
+
+
+def daily_weather_from_appointments(raw_df):
+    """One row of weather per appointment date, aggregated as in build_daily_series"""
+    df = pd.DataFrame({'date': pd.to_datetime(raw_df['appointment_date_continuous']).dt.normalize().to_numpy()})
+    df[WEATHER_COLS] = raw_df[WEATHER_COLS].to_numpy(dtype=float)
+    return df.groupby('date').agg(
+        average_temp_day=('average_temp_day', 'mean'),
+        average_rain_day=('average_rain_day', 'mean'),
+        max_temp_day=('max_temp_day', 'max'),
+        max_rain_day=('max_rain_day', 'max')
+    ).dropna(how='all')
+
+
+def save_daily_weather(daily, path=DEFAULT_WEATHER_PATH):
+    """Merge daily weather into the file at path (new rows replace existing dates)"""
+    if os.path.exists(path):
+        existing = read_daily_weather(path)
+        daily = pd.concat([existing[~existing.index.isin(daily.index)], daily]).sort_index()
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    out = daily[WEATHER_COLS].round(2).rename_axis('date').reset_index()
+    out['date'] = out['date'].dt.strftime('%Y-%m-%d')
+    tmp_path = path + '.tmp'
+    if path.endswith(PARQUET_EXTENSIONS):
+        out.to_parquet(tmp_path, index=False)
+    else:
+        out.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    return len(daily)
+
+
+class CachedWeather:
+    """
+    Date-keyed cache in front of a WeatherProvider
+
+    Each batch is resolved to its distinct days; days not in the cache are
+    fetched with one provider range call, however many rows and dates the
+    batch has. Days the provider does not know are cached as missing too.
+    Safe to share between threads.
+    """
+
+    def __init__(self, provider, max_days=DEFAULT_CACHE_DAYS, ttl=DEFAULT_TTL):
+        self.provider = provider
+        self.max_days = max_days
+        self.ttl = ttl
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def daily(self, dates):
+        """
+        Weather of each date
+
+        Args:
+            dates: sequence of dates (any order, repeats allowed)
+
+        Returns:
+            DataFrame of WEATHER_COLS, one row per date (indexed like dates
+            when it is a Series); NaN for days the provider has no data for
+        """
+        days = _days(dates)
+        uniques, inverse = np.unique(days, return_inverse=True)
+        values = np.full((len(uniques), len(WEATHER_COLS)), np.nan)
+        now = time.monotonic()
+
+        with self._lock:
+            missing = []
+            for i, day in enumerate(uniques):
+                entry = self._cache.get(day)
+                if entry is None or now - entry[0] > self.ttl:
+                    missing.append(i)
+                else:
+                    self._cache.move_to_end(day)
+                    values[i] = entry[1]
+            self.hits += len(uniques) - len(missing)
+            self.misses += len(missing)
+
+        if missing:
+            missing = np.asarray(missing)
+            wanted = uniques[missing]
+            fetched = self.provider.fetch_range(_date(wanted[0]), _date(wanted[-1]))
+            fetched_days = _days(fetched.index)
+            position = np.searchsorted(fetched_days, wanted)
+            found = position < len(fetched_days)
+            found[found] = fetched_days[position[found]] == wanted[found]
+            values[missing[found]] = fetched[WEATHER_COLS].to_numpy(dtype=float)[position[found]]
+            with self._lock:
+                for i in missing:
+                    self._cache[uniques[i]] = (now, values[i])
+                    self._cache.move_to_end(uniques[i])
+                while len(self._cache) > self.max_days:
+                    self._cache.popitem(last=False)
+
+        index = dates.index if isinstance(dates, pd.Series) else None
+        return pd.DataFrame(values[inverse], columns=WEATHER_COLS, index=index)
+
+    def fill_appointments(self, raw_df):
+        """
+        Fill the weather of raw appointments that have none
+
+        Rows with a missing weather value (or batches without the weather
+        columns) get their day's weather, plus the derived rainy/storm
+        day-before flags and rain/heat intensity bands. Rows whose day the
+        provider does not know are left as they are.
+
+        Returns:
+            filled copy of raw_df (raw_df itself when nothing was missing)
+        """
+        present = [col for col in WEATHER_COLS if col in raw_df]
+        missing_rows = (raw_df[present].isna().any(axis=1).to_numpy() if len(present) == len(WEATHER_COLS)
+                        else np.ones(len(raw_df), dtype=bool))
+        if not missing_rows.any():
+            return raw_df
+
+        dates = pd.to_datetime(raw_df['appointment_date_continuous']).reset_index(drop=True)
+        # The day and the day before, in one fetch
+        both = self.daily(pd.concat([dates, dates - pd.Timedelta(days=1)], ignore_index=True))
+        on_day, day_before = both.iloc[:len(dates)], both.iloc[len(dates):]
+        fill = missing_rows & on_day.notna().all(axis=1).to_numpy()
+
+        filled = raw_df.copy()
+        for col in WEATHER_COLS:
+            current = filled[col].to_numpy(dtype=float) if col in filled else np.full(len(filled), np.nan)
+            filled[col] = np.where(fill, on_day[col].to_numpy(), current)
+
+        derived = {
+            'rainy_day_before': (day_before['average_rain_day'].to_numpy() > 0).astype(int),
+            'storm_day_before': (day_before['max_rain_day'].to_numpy() > STORM_RAIN_MM).astype(int),
+            'rain_intensity': rain_intensity(on_day['average_rain_day'].to_numpy()),
+            'heat_intensity': heat_intensity(on_day['average_temp_day'].to_numpy())
+        }
+        for col, values in derived.items():
+            if col in filled:
+                filled[col] = filled[col].mask(fill, values)
+            else:
+                filled[col] = pd.Series(values, index=filled.index).where(fill)
+        return filled
+
+    def fill_daily(self, ts, date_col=None):
+        """
+        Fill missing weather of a daily series (build_daily_series output or
+        forecaster input rows) and recompute its weather flags
+
+        Args:
+            ts: DataFrame with one row per date
+            date_col: date column (default: appointment_date or date)
+
+        Returns:
+            filled copy of ts (ts itself when nothing was missing)
+        """
+        present = [col for col in WEATHER_COLS if col in ts]
+        missing_rows = (ts[present].isna().any(axis=1).to_numpy() if len(present) == len(WEATHER_COLS)
+                        else np.ones(len(ts), dtype=bool))
+        if not missing_rows.any():
+            return ts
+        date_col = date_col or next((col for col in ('appointment_date', 'date') if col in ts), None)
+        if date_col is None:
+            raise ValueError("Filling daily weather needs an appointment_date or date column")
+
+        weather = self.daily(ts[date_col].reset_index(drop=True))
+        fill = missing_rows & weather.notna().all(axis=1).to_numpy()
+        filled = ts.copy()
+        for col in WEATHER_COLS:
+            current = filled[col].to_numpy(dtype=float) if col in filled else np.full(len(filled), np.nan)
+            filled[col] = np.where(fill, weather[col].to_numpy(), current)
+        for name, flag in weather_flags(filled).items():
+            if name in filled:
+                filled[name] = filled[name].mask(fill, flag)
+        return filled
+
+
+def shared_weather(path=DEFAULT_WEATHER_PATH):
+    """
+    Process-wide CachedWeather over the local weather file at path
+
+    Returns None when the file does not exist.
+    """
+    if not os.path.exists(path):
+        return None
+    with _shared_lock:
+        if path not in _shared:
+            _shared[path] = CachedWeather(LocalWeatherProvider(path))
+        return _shared[path]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the local daily weather file")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = commands.add_parser('import', help='add the daily weather of raw appointments')
+    import_parser.add_argument('input', help='CSV or Parquet appointments in the raw schema')
+    import_parser.add_argument('--out', default=DEFAULT_WEATHER_PATH, help='CSV or Parquet weather file')
+    args = parser.parse_args()
+
+    columns = ['appointment_date_continuous'] + WEATHER_COLS
+    if args.input.endswith(PARQUET_EXTENSIONS):
+        raw = pd.read_parquet(args.input, columns=columns)
+    else:
+        raw = pd.read_csv(args.input, usecols=columns)
+    daily = daily_weather_from_appointments(raw)
+    days = save_daily_weather(daily, args.out)
+    print(f"Imported {len(daily):,} days from {len(raw):,} appointments; {days:,} days in {args.out}")
+
+
+if __name__ == '__main__':
+    main()